@@ -1,16 +1,26 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-# Assuming config.py exists and defines a Config class
-from config import Config
-from waitress import serve
-import jwt 
-import os
-from database import db # Assuming database.py only exports 'db' (SQLAlchemy instance)
-from models.stock_data import StockData # Ensure this is imported for db.create_all
-from services import auth_service, data_services, prediction_service # Assuming these service modules exist
+from services import startup_timing # First, so the import phases below are timed
+
+with startup_timing.phase('web framework'):
+    from flask import Flask, Response, request, jsonify
+    from flask_cors import CORS
+    from waitress import serve
+    import jwt 
+    import os
+    import pandas as pd
+
+with startup_timing.phase('config and models'):
+    # Assuming config.py exists and defines a Config class
+    from config import Config
+    from database import db # Assuming database.py only exports 'db' (SQLAlchemy instance)
+    from models.stock_data import StockData # Ensure this is imported for db.create_all
+    from models.stock_statistics import StockStatistics # Materialized per-symbol statistics
+    from models.backtest_result import BacktestResult # Stored walk-forward backtests (prediction confidence)
+
+with startup_timing.phase('services'):
+    # prediction_service imports TensorFlow/Keras lazily, on the first LSTM prediction or the warm-up below
+    from services import auth_service, data_services, prediction_service, prediction_jobs, batch_ingest, chart_data, response_cache, refresh_coordinator, metrics, indicators, backtest, fast_forecasters # Assuming these service modules exist
 
 from datetime import datetime, timedelta
-import pandas as pd
 from math import ceil # Import ceil for calculating months
 
 app = Flask(__name__)
@@ -32,15 +42,31 @@ CORS(
 # Initialize SQLAlchemy with the Flask app
 db.init_app(app)
 
-# Create database tables if they don't exist
-# This should be done within the application context, preferably once on startup.
-with app.app_context():
-    db.create_all()
+# Spawned pool workers (prediction jobs, backtests, training) re-import this file as __mp_main__ when the
+# server runs as `python app.py`. They only need the imports above, not tables, request hooks or a warm-up.
+if __name__ != '__mp_main__':
+    # Per-route latency histograms, phase timings and a JSON log line per request (scraped at /metrics)
+    metrics.init_app(app, log_requests=os.environ.get('REQUEST_LOG', '1').lower() not in ('0', 'false', 'no'))
+
+    # Create database tables if they don't exist
+    # This should be done within the application context, preferably once on startup.
+    with app.app_context(), startup_timing.phase('create tables'):
+        db.create_all()
+
+    startup_timing.report()
+
+    # Optionally import the ML stack in the background right away, so the first LSTM prediction does not pay for it
+    if os.environ.get('PREDICTION_WARMUP', '').lower() in ('1', 'true', 'yes'):
+        prediction_service.start_warm_up()
 
 @app.route('/')
 def home():
     return "StockWave Backend is running!"
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/signup', methods=['POST'])
 def register():
     data = request.get_json()
@@ -78,8 +104,11 @@ def fetch_and_store_stock_route():
         return jsonify({'success': False, 'message': 'Missing symbol or months'}), 400
 
     try:
-        # Call the orchestrator function from data_services
-        success, message = data_services.fetch_and_store_stock(symbol, months, market)
+        # Incremental sync by default: only the bars missing since the latest stored date are downloaded.
+        # 'full' re-downloads the whole window, 'replace' also wipes stored rows first.
+        mode = data.get('mode') or ('replace' if data.get('replace') else 'incremental')
+        result = data_services.sync_stock(symbol, months, market, mode=mode)
+        success, message = result['success'], result['message']
 
         # After fetching and storing, get the latest statistics to return to the frontend
         # This provides immediate feedback including current price and day's change.
@@ -88,68 +117,177 @@ def fetch_and_store_stock_route():
             statistics = data_services.get_stock_statistics(symbol)
 
         if success:
-            return jsonify({'success': True, 'message': message, 'statistics': statistics}), 200
+            return jsonify({
+                'success': True,
+                'message': message,
+                'inserted': result['inserted'],
+                'updated': result['updated'],
+                'mode': result['mode'],
+                'statistics': statistics
+            }), 200
         else:
             return jsonify({'success': False, 'message': message}), 500
     except Exception as e:
         print(f"--- app.py: Unhandled Error fetching/storing stock data for {symbol}: {e} ---")
         return jsonify({'success': False, 'message': f'Server error during data fetch: {str(e)}'}), 500
 
+@app.route('/stock/fetch/batch', methods=['POST'])
+def fetch_and_store_batch_route():
+    data = request.get_json() or {}
+    symbols = data.get('symbols')
+    if not symbols or not isinstance(symbols, list):
+        return jsonify({'success': False, 'message': 'Missing symbols list'}), 400
+
+    # Never let a single request open more download threads than the configured pool size
+    max_workers = min(int(data.get('max_workers') or batch_ingest.INGEST_MAX_WORKERS), batch_ingest.INGEST_MAX_WORKERS)
+    try:
+        report = batch_ingest.ingest_batch(
+            symbols,
+            market=data.get('market', 'US'),
+            months=int(data.get('months', 18)),
+            mode=data.get('mode', 'incremental'),
+            max_workers=max_workers
+        )
+        return jsonify({'success': report['failed'] == 0, 'report': report}), 200
+    except Exception as e:
+        print(f"--- app.py: Unhandled Error in batch fetch: {e} ---")
+        return jsonify({'success': False, 'message': f'Server error during batch fetch: {str(e)}'}), 500
+
 @app.route('/stock/data/<symbol>', methods=['GET'])
 def get_stock_data(symbol):
     market = request.args.get('market', 'US')
     formatted_symbol = data_services.format_symbol(symbol, market)
     limit = int(request.args.get('limit', 365)) # Max records to return
     days = int(request.args.get('days', limit)) # Duration for historical fetch if needed, and for stats
-
-    # 1. Try to get data from DB first
-    # get_stored_stock_data typically orders by date descending.
-    # We want enough data for charting for 'limit' days.
-    records = data_services.get_stored_stock_data(company_symbol=formatted_symbol, limit=limit)
-    # Ensure chronological order for charts (oldest to newest)
-    records = sorted(records, key=lambda r: r.date)
+    chart_format = request.args.get('format', 'records') # 'records' (list of row objects) or 'columnar' (parallel arrays)
+    date_format = request.args.get('date_format', 'iso') # 'iso' or 'epoch_day' (days since 1970-01-01)
+    if chart_format not in chart_data.CHART_FORMATS or date_format not in chart_data.DATE_FORMATS:
+        return jsonify({'success': False, 'message': f"format must be one of: {', '.join(chart_data.CHART_FORMATS)}; date_format one of: {', '.join(chart_data.DATE_FORMATS)}."}), 400
+    max_points = request.args.get('max_points', type=int) # Downsample long ranges to at most this many points
+    sampling = request.args.get('sampling', 'candles') # 'candles' (weekly/monthly OHLCV) or 'lttb' (daily bars for line charts)
+    if sampling not in chart_data.SAMPLING_METHODS or (max_points is not None and max_points < 3):
+        return jsonify({'success': False, 'message': f"sampling must be one of: {', '.join(chart_data.SAMPLING_METHODS)}; max_points at least 3."}), 400
+
+    # 0. Serve repeat views from the response cache: a 304 for a current ETag, else the cached body,
+    # both without touching the database while the symbol's data watermark is cached
+    cache_key = f"{formatted_symbol}|{limit}|{days}|{chart_format}|{date_format}|{max_points}|{sampling}"
+    watermark = response_cache.get_data_watermark(formatted_symbol)
+    etag, last_modified = response_cache.validators(cache_key, watermark)
+    if response_cache.is_not_modified(request, etag, last_modified):
+        return response_cache.not_modified_response(request, etag, last_modified)
+    cached = response_cache.lookup(cache_key, watermark)
+    if cached is not None:
+        return response_cache.make_response(request, cached)
+
+    # 1. Try to get data from DB first: one column query for the newest 'limit' bars, oldest first for charts
+    ohlcv = chart_data.load_chart_ohlcv(formatted_symbol, limit=limit)
 
     # 2. If DB data is insufficient, fetch from YFinance and store
     # Consider "insufficient" if we have significantly less data than requested by 'limit'
-    if not records or len(records) < limit * 0.9:
-        print(f"[GET_STOCK_DATA] Insufficient DB records for {formatted_symbol} ({len(records)}/{limit}). Attempting to fetch and store.")
+    if not ohlcv or chart_data.bar_count(ohlcv) < limit * 0.9:
+        print(f"[GET_STOCK_DATA] Insufficient DB records for {formatted_symbol} ({chart_data.bar_count(ohlcv)}/{limit}). Attempting to fetch and store.")
         # Fetch enough data to cover the requested 'days' (duration) for the chart, plus some buffer.
         # Convert days to months for fetch_and_store_stock if 'days' is substantial.
         months_to_fetch = ceil(days / 30) + 1 if days > 0 else 1 # Fetch at least 1 month, or enough for 'days' + buffer
-        success, message = data_services.fetch_and_store_stock(formatted_symbol, months=months_to_fetch, market=market)
+        # Concurrent cold requests for the symbol share one fetch and one write
+        sync_result = refresh_coordinator.refresh_stock(
+            formatted_symbol, months=months_to_fetch, market=market,
+            still_needed=lambda: chart_data.bar_count(chart_data.load_chart_ohlcv(formatted_symbol, limit=limit)) < limit * 0.9
+        )
+        success, message = sync_result['success'], sync_result['message']
         if success:
             print(f"[GET_STOCK_DATA] Successfully fetched and stored new data for {formatted_symbol}.")
             # Re-fetch from DB after storing
-            records = data_services.get_stored_stock_data(company_symbol=formatted_symbol, limit=limit)
-            records = sorted(records, key=lambda r: r.date)
+            ohlcv = chart_data.load_chart_ohlcv(formatted_symbol, limit=limit)
         else:
             print(f"[GET_STOCK_DATA_ERROR] Failed to fetch and store data: {message}")
             return jsonify({'success': False, 'message': f"Failed to get historical data for {symbol}: {message}"}), 500 # Return 500 if fetch failed
 
-    if not records: # After attempting to fetch and store, if still no records
+    if not ohlcv: # After attempting to fetch and store, if still no records
         return jsonify({'success': False, 'message': f"No historical data available for {symbol}."}), 404
 
-    # Prepare data for frontend
-    processed_records = [{
-        'date': r.date.strftime('%Y-%m-%d'),
-        'open': float(r.open_price),
-        'high': float(r.high_price),
-        'low': float(r.low_price),
-        'close': float(r.close_price),
-        'volume': int(r.volume),
-    } for r in records]
-
     # Get statistics using the function that handles DB/YFinance fallback
     # Use the 'days' parameter from the frontend for statistics
     stats = data_services.get_stock_statistics(formatted_symbol, days=days)
 
-    return jsonify({
-        'success': True,
-        'data': {
-            'records': processed_records,
-            'statistics': stats
-        }
-    }), 200
+    # Prepare data for frontend
+    with metrics.phase(metrics.SERIALIZATION):
+        sampled = ohlcv if not max_points else chart_data.downsample(ohlcv, max_points, sampling)
+        if sampled is not ohlcv:
+            print(f"[GET_STOCK_DATA] Downsampled {formatted_symbol} from {chart_data.bar_count(ohlcv)} to {chart_data.bar_count(sampled)} points ({sampling}).")
+        ohlcv = sampled
+
+        if chart_format == 'columnar':
+            chart = {'format': 'columnar', 'date_format': date_format, 'columns': chart_data.to_columnar(ohlcv, date_format)}
+        else:
+            chart = {'records': chart_data.to_records(ohlcv, date_format)}
+
+        response = jsonify({
+            'success': True,
+            'data': {
+                **chart,
+                'statistics': stats
+            }
+        })
+
+    # Keyed on the watermark after any sync above, so the body matches what is stored now
+    entry = response_cache.store(cache_key, response_cache.get_data_watermark(formatted_symbol), response.get_data())
+    if entry is None:
+        return response, 200
+    return response_cache.make_response(request, entry)
+
+# Technical indicators for the chart, computed over the whole stored history and cached per symbol.
+# ?indicators=sma_20,ema_50,rsi_14,macd,bb_20,atr_14,vwap_20 (default set when omitted); columnar output.
+@app.route('/stock/indicators/<symbol>', methods=['GET'])
+def get_stock_indicators(symbol):
+    market = request.args.get('market', 'US')
+    formatted_symbol = data_services.format_symbol(symbol, market)
+    limit = int(request.args.get('limit', 365)) # Newest bars to return
+    date_format = request.args.get('date_format', 'iso')
+    if date_format not in chart_data.DATE_FORMATS:
+        return jsonify({'success': False, 'message': f"date_format must be one of: {', '.join(chart_data.DATE_FORMATS)}."}), 400
+    specs, error = indicators.parse_indicators(request.args.get('indicators'))
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+
+    cache_key = f"indicators|{formatted_symbol}|{limit}|{date_format}|{','.join(specs)}"
+    watermark = response_cache.get_data_watermark(formatted_symbol)
+    etag, last_modified = response_cache.validators(cache_key, watermark)
+    if response_cache.is_not_modified(request, etag, last_modified):
+        return response_cache.not_modified_response(request, etag, last_modified)
+    cached = response_cache.lookup(cache_key, watermark)
+    if cached is not None:
+        return response_cache.make_response(request, cached)
+
+    ohlcv, columns = indicators.get_indicators(formatted_symbol, specs, limit=limit)
+    if not ohlcv or chart_data.bar_count(ohlcv) < limit * 0.9:
+        print(f"[INDICATORS] Insufficient DB records for {formatted_symbol} ({chart_data.bar_count(ohlcv)}/{limit}). Attempting to fetch and store.")
+        sync_result = refresh_coordinator.refresh_stock(
+            formatted_symbol, months=ceil(limit / 30) + 1, market=market,
+            still_needed=lambda: chart_data.bar_count(chart_data.load_chart_ohlcv(formatted_symbol, limit=limit)) < limit * 0.9
+        )
+        if not sync_result['success']:
+            return jsonify({'success': False, 'message': f"Failed to get historical data for {symbol}: {sync_result['message']}"}), 500
+        ohlcv, columns = indicators.get_indicators(formatted_symbol, specs, limit=limit)
+
+    if not ohlcv:
+        return jsonify({'success': False, 'message': f"No historical data available for {symbol}."}), 404
+
+    with metrics.phase(metrics.SERIALIZATION):
+        response = jsonify({
+            'success': True,
+            'data': {
+                'symbol': formatted_symbol,
+                'indicators': specs,
+                'date_format': date_format,
+                'columns': indicators.to_columnar(ohlcv, columns, date_format),
+            }
+        })
+
+    entry = response_cache.store(cache_key, response_cache.get_data_watermark(formatted_symbol), response.get_data())
+    if entry is None:
+        return response, 200
+    return response_cache.make_response(request, entry)
 
 # NEW: API route for fetching real-time stock info (for ticker and dashboard preview)
 @app.route('/api/stock_info/<symbol>', methods=['GET'])
@@ -159,47 +297,151 @@ def api_stock_info(symbol):
         return jsonify({"success": True, "data": info})
     return jsonify({"success": False, "message": "Could not retrieve company info."}), 404
 
+# API route for fetching company info for a whole watchlist in one request.
+# Accepts GET ?symbols=AAPL,MSFT or POST {"symbols": [...]}; failures are reported per symbol.
+@app.route('/api/stock_info/batch', methods=['GET', 'POST'])
+def api_stock_info_batch():
+    if request.method == 'POST':
+        data = request.get_json() or {}
+        symbols = data.get('symbols') or []
+        market = data.get('market', 'US')
+    else:
+        symbols = request.args.get('symbols', '').split(',')
+        market = request.args.get('market', 'US')
+
+    if not isinstance(symbols, list):
+        return jsonify({"success": False, "message": "symbols must be a list."}), 400
+
+    results = data_services.get_company_info_batch(symbols, market=market)
+    if not results:
+        return jsonify({"success": False, "message": "Missing symbols."}), 400
+    return jsonify({"success": True, "data": results})
+
 # NEW: API route for fetching stock statistics (for dashboard preview details)
 @app.route('/api/stock_statistics/<symbol>', methods=['GET'])
 def api_stock_statistics(symbol):
+    # Optional ?windows=1,7,30,365 returns stats for several trailing windows computed in one pass
+    windows = request.args.get('windows')
+    if windows:
+        try:
+            window_list = [int(w) for w in windows.split(',') if w.strip()]
+        except ValueError:
+            return jsonify({"success": False, "message": "windows must be a comma-separated list of day counts."}), 400
+        stats_by_window = data_services.get_stock_statistics_windows(symbol, windows=window_list) if window_list else None
+        if stats_by_window:
+            return jsonify({"success": True, "data": {str(w): s for w, s in stats_by_window.items()}})
+        return jsonify({"success": False, "message": "Could not retrieve stock statistics."}), 404
+
     stats = data_services.get_stock_statistics(symbol, days=1) # Get today's stats for current, open, high, volume
     if stats:
         return jsonify({"success": True, "data": stats})
     return jsonify({"success": False, "message": "Could not retrieve stock statistics."}), 404
 
-@app.route('/stock/predict/<symbol>', methods=['GET'])
-def predict_stock(symbol):
-    horizon = request.args.get('horizon', 'month') # Default to 'month' for 30-day prediction
-    market = request.args.get('market', 'US')
-    formatted_symbol = data_services.format_symbol(symbol, market)
-
+def _ensure_prediction_history(formatted_symbol, market, min_bars=None, months=18):
+    """
+    Make sure enough bars are stored to train on. Returns an error message, or None when ready.
+    `min_bars` (exact) and `months` override the prediction defaults, e.g. for backtests.
+    """
     # Ensure sufficient data is in DB for prediction.
     # The LSTM model typically needs a good amount of historical data (e.g., 240-360 days)
     # Check if we have at least 400 days (approx. 13-14 months) for robust prediction.
-    min_prediction_data_days = 400
+    min_prediction_data_days = min_bars or 400
+    required = min_bars or min_prediction_data_days * 0.9 # If significantly less data
     db_records_for_pred = data_services.get_stored_stock_data(company_symbol=formatted_symbol, limit=min_prediction_data_days)
 
-    if not db_records_for_pred or len(db_records_for_pred) < min_prediction_data_days * 0.9: # If significantly less data
-        print(f"[PREDICT_PREP] Insufficient DB data ({len(db_records_for_pred)} records) for prediction for {formatted_symbol}. Attempting to fetch and store ~18 months.")
+    if not db_records_for_pred or len(db_records_for_pred) < required:
+        print(f"[PREDICT_PREP] Insufficient DB data ({len(db_records_for_pred)} records) for prediction for {formatted_symbol}. Attempting to fetch and store ~{months} months.")
         # Fetching ~18 months should generally provide enough data for prediction's lookback_days (e.g., 240+120=360 days)
-        success, fetch_message = data_services.fetch_and_store_stock(formatted_symbol, months=18, market=market)
-        if not success:
-            return jsonify({'success': False, 'message': f"Prediction failed due to insufficient historical data: {fetch_message}"}), 500
+        sync_result = refresh_coordinator.refresh_stock(
+            formatted_symbol, months=months, market=market,
+            still_needed=lambda: len(data_services.get_stored_stock_data(company_symbol=formatted_symbol, limit=min_prediction_data_days)) < required
+        )
+        if not sync_result['success']:
+            return f"Prediction failed due to insufficient historical data: {sync_result['message']}"
         print(f"[PREDICT_PREP] Successfully fetched and stored additional data for {formatted_symbol}.")
         # No need to re-fetch db_records_for_pred here, as prediction_service.lstm_predict_multiple
         # will internally call get_data_from_db which will get the newly stored data.
+    return None
+
+@app.route('/stock/predict/<symbol>', methods=['GET'])
+def predict_stock(symbol):
+    horizon = request.args.get('horizon', 'month') # Default to 'month' for 30-day prediction
+    market = request.args.get('market', 'US')
+    model_type = request.args.get('model', 'lstm') # 'lstm' (recursive) or 'lstm_direct' (whole horizon in one pass)
+    if model_type not in prediction_service.MODEL_TYPES: # Before any upstream fetch
+        return jsonify({'success': False, 'message': f"Unknown model type '{model_type}'. Choose one of: {', '.join(prediction_service.MODEL_TYPES)}."}), 400
+    formatted_symbol = data_services.format_symbol(symbol, market)
+
+    prep_error = _ensure_prediction_history(formatted_symbol, market)
+    if prep_error:
+        return jsonify({'success': False, 'message': prep_error}), 500
 
-    predictions_data, error_message = prediction_service.lstm_predict_multiple(formatted_symbol, horizon=horizon)
+    predictions_data, error_message = prediction_service.lstm_predict_multiple(formatted_symbol, horizon=horizon, model_type=model_type)
 
     if error_message:
         print(f"Prediction Error for {formatted_symbol}: {error_message}")
         return jsonify({"success": False, "message": error_message}), 400
 
     if predictions_data:
-        return jsonify({"success": True, "prediction": predictions_data})
+        with metrics.phase(metrics.SERIALIZATION):
+            return jsonify({"success": True, "prediction": predictions_data})
 
     return jsonify({"success": False, "message": "Prediction could not be generated."}), 500
 
+# Walk-forward backtest of one fast forecaster over the symbol's stored history: error metrics, strategy
+# statistics and equity curves. GET only reports; POST also stores the result, whose hit rate becomes the
+# prediction confidence. LSTM backtests train dozens of models, so they run from `python -m services.backtest`.
+@app.route('/stock/backtest/<symbol>', methods=['GET', 'POST'])
+def backtest_stock(symbol):
+    horizon = request.args.get('horizon', 'week')
+    market = request.args.get('market', 'US')
+    model_type = request.args.get('model', 'ridge')
+    include_curves = request.args.get('curves', '1') != '0'
+    if model_type not in fast_forecasters.FORECASTERS or horizon.lower() not in prediction_service.HORIZON_STEPS:
+        return jsonify({'success': False, 'message': f"model must be one of: {', '.join(fast_forecasters.FORECASTERS)} (LSTM backtests run with `python -m services.backtest`); horizon one of: {', '.join(prediction_service.HORIZON_STEPS)}."}), 400
+    formatted_symbol = data_services.format_symbol(symbol, market)
+
+    # Enough bars for the indicator warm-up, the training window and BACKTEST_MIN_ORIGINS forecasts
+    min_bars, months = backtest.required_history(prediction_service.HORIZON_STEPS[horizon.lower()])
+    prep_error = _ensure_prediction_history(formatted_symbol, market, min_bars=min_bars, months=months)
+    if prep_error:
+        return jsonify({'success': False, 'message': prep_error}), 500
+
+    result = backtest.backtest_batch([symbol], market=market, model_type=model_type, horizon=horizon,
+                                     save=request.method == 'POST')[0]
+    if not result.get('success'):
+        return jsonify({'success': False, 'message': result.get('message', "Backtest could not be run.")}), 400
+    if not include_curves:
+        result.pop('equity_curves', None)
+    with metrics.phase(metrics.SERIALIZATION):
+        return jsonify({'success': True, 'backtest': result})
+
+# Asynchronous predictions: submit returns a job id immediately, training runs on a background process pool
+@app.route('/stock/predict/<symbol>/jobs', methods=['POST'])
+def submit_prediction_job(symbol):
+    data = request.get_json(silent=True) or {}
+    horizon = data.get('horizon', request.args.get('horizon', 'month'))
+    market = data.get('market', request.args.get('market', 'US'))
+    model_type = data.get('model', request.args.get('model', 'lstm'))
+    if model_type not in prediction_service.MODEL_TYPES:
+        return jsonify({'success': False, 'message': f"Unknown model type '{model_type}'."}), 400
+    formatted_symbol = data_services.format_symbol(symbol, market)
+
+    prep_error = _ensure_prediction_history(formatted_symbol, market)
+    if prep_error:
+        return jsonify({'success': False, 'message': prep_error}), 500
+
+    df = prediction_service.load_prediction_frame(formatted_symbol)
+    job, created = prediction_jobs.get_job_manager().submit(formatted_symbol, horizon, df, model_type=model_type)
+    return jsonify({'success': True, 'created': created, 'job': job}), 202
+
+@app.route('/stock/predict/jobs/<job_id>', methods=['GET'])
+def get_prediction_job(job_id):
+    job = prediction_jobs.get_job_manager().get(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Unknown or expired job id.'}), 404
+    return jsonify({'success': True, 'job': job}), 200
+
 
 if __name__ == "__main__":
     with app.app_context():
@@ -0,0 +1,278 @@
+"""
+Reproducible benchmarks for the backend's hot paths, with no network access.
+
+Runs against a throwaway SQLite database and the synthetic LocalProvider (deterministic per symbol),
+and prints one JSON document so runs can be diffed across commits:
+
+    cd backend
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --quick --skip-training
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SYMBOLS = ('BENCHA', 'BENCHB', 'BENCHC', 'BENCHD')
+INGEST_MONTHS = (12, 60)
+QUERY_LIMITS = (30, 365, 1250, 2500)
+STAT_WINDOWS = (1, 7, 30, 365, 45) # 45 is not materialized, so it exercises the compute path
+WINDOW_FRAME_SIZES = (360, 2500)
+HORIZONS = ('day', 'week', 'month', '3month')
+FAST_MODELS = ('ridge', 'ets', 'drift')
+
+def _summary(samples):
+    """Latency summary in milliseconds."""
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        'runs': len(ms),
+        'min_ms': round(ms[0], 3),
+        'median_ms': round(statistics.median(ms), 3),
+        'mean_ms': round(statistics.fmean(ms), 3),
+        'p95_ms': round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        'max_ms': round(ms[-1], 3),
+    }
+
+def _measure(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return _summary(samples), result
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+# --- Benchmarks ---
+def bench_ingestion(data_services, repeat):
+    """fetch_and_store_stock: first load into an empty table, then a re-upsert of the same window."""
+    results = {}
+    for months in INGEST_MONTHS:
+        cold, warm = [], []
+        bars = 0
+        for i in range(repeat):
+            symbol = f"ING{months}X{i}"
+            df = data_services.get_historical_data(symbol, months=months)
+            bars = len(df)
+            started = time.perf_counter()
+            data_services.fetch_and_store_stock(symbol, months=months)
+            cold.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            data_services.fetch_and_store_stock(symbol, months=months)
+            warm.append(time.perf_counter() - started)
+        results[f"{months}mo"] = {
+            'bars': bars,
+            'insert': _summary(cold),
+            'reupsert': _summary(warm),
+            'insert_bars_per_sec': round(bars / statistics.median(cold), 1),
+        }
+    return results
+
+def bench_queries(data_services, chart_data, symbol, repeat):
+    """get_stored_stock_data (ORM rows) vs chart_data.load_chart_ohlcv (column query) per history size."""
+    results = {}
+    for limit in QUERY_LIMITS:
+        orm, rows = _measure(lambda: data_services.get_stored_stock_data(symbol, limit=limit), repeat)
+        columns, _ = _measure(lambda: chart_data.load_chart_ohlcv(symbol, limit=limit), repeat)
+        results[str(limit)] = {'rows': len(rows), 'get_stored_stock_data': orm, 'load_chart_ohlcv': columns}
+    return results
+
+def bench_statistics(data_services, symbol, repeat):
+    results = {}
+    for days in STAT_WINDOWS:
+        summary, _ = _measure(lambda: data_services.get_stock_statistics(symbol, days=days), repeat)
+        summary['calls_per_sec'] = round(1000 / summary['median_ms'], 1) if summary['median_ms'] else None
+        results[f"{days}d"] = summary
+    summary, _ = _measure(lambda: data_services.get_stock_statistics_windows(symbol), repeat)
+    results['windows_1_7_30_365'] = summary
+    return results
+
+def bench_indicators(indicators, chart_data, symbol, repeat):
+    """Default indicator set: full computation over the stored history vs a cached feature-set read."""
+    ohlcv = chart_data.load_chart_ohlcv(symbol)
+    specs = list(indicators.DEFAULT_INDICATORS)
+    compute, _ = _measure(lambda: indicators.compute(ohlcv, specs), repeat)
+    indicators.get_indicators(symbol, specs) # Populate the feature set
+    cached, _ = _measure(lambda: indicators.get_indicators(symbol, specs, limit=365), repeat)
+    return {'bars': chart_data.bar_count(ohlcv), 'indicators': specs, 'compute': compute, 'cached_365': cached}
+
+def _feature_frame(prediction_service, symbol, size):
+    """The newest `size` stored bars with the same engineered features a prediction trains on."""
+    return prediction_service.add_prediction_features(prediction_service.get_data_from_db(symbol, size))
+
+def bench_windowing(prediction_service, symbol, repeat):
+    features = ['open', 'high', 'low', 'close', 'volume'] + list(prediction_service.PREDICTION_FEATURES)
+    results = {}
+    # Untimed first call so the lazy sklearn import is not counted in the first sample
+    prediction_service.prepare_data_multi_feature(_feature_frame(prediction_service, symbol, 360), features, window_size=60)
+    for size in WINDOW_FRAME_SIZES:
+        df = _feature_frame(prediction_service, symbol, size)
+        for horizon in (1, 30):
+            summary, prepared = _measure(
+                lambda: prediction_service.prepare_data_multi_feature(df, features, window_size=60, horizon=horizon), repeat
+            )
+            summary['train_windows'] = len(prepared[1])
+            results[f"{len(df)}bars_h{horizon}"] = summary
+    return results
+
+def bench_prediction(prediction_service, symbol, repeat, skip_training):
+    """lstm_predict_multiple per horizon: training on an empty registry, then registry reuse (inference only)."""
+    results = {'fast': {}, 'lstm': {}, 'lstm_direct': {}}
+    for model_type in FAST_MODELS:
+        for horizon in HORIZONS:
+            summary, _ = _measure(lambda: prediction_service.lstm_predict_multiple(symbol, horizon=horizon, model_type=model_type), repeat)
+            results['fast'][f"{model_type}_{horizon}"] = summary
+
+    if skip_training:
+        return results
+
+    for model_type in ('lstm', 'lstm_direct'):
+        for horizon in HORIZONS:
+            started = time.perf_counter()
+            result, error = prediction_service.lstm_predict_multiple(symbol, horizon=horizon, model_type=model_type)
+            first = time.perf_counter() - started
+            reuse, _ = _measure(lambda: prediction_service.lstm_predict_multiple(symbol, horizon=horizon, model_type=model_type), repeat)
+            results[model_type][horizon] = {
+                'error': error,
+                'first_call_ms': round(first * 1000, 3), # Trains unless an earlier horizon already registered the model
+                'reuse': reuse,
+                'metrics': result and result.get('metrics'),
+            }
+    return results
+
+def bench_routes(client, symbol, repeat):
+    results = {}
+
+    def get(url, **headers):
+        response = client.get(url, headers=headers)
+        assert response.status_code in (200, 304), (url, response.status_code)
+        return response
+
+    routes = {
+        'home': '/',
+        'stock_data_365': f'/stock/data/{symbol}?limit=365',
+        'stock_data_2500_columnar': f'/stock/data/{symbol}?limit=2500&format=columnar',
+        'stock_data_2500_max500': f'/stock/data/{symbol}?limit=2500&max_points=500',
+        'stock_indicators_365': f'/stock/indicators/{symbol}?limit=365',
+        'stock_statistics': f'/api/stock_statistics/{symbol}',
+        'stock_info': f'/api/stock_info/{symbol}',
+        'predict_ridge_month': f'/stock/predict/{symbol}?horizon=month&model=ridge',
+        'metrics': '/metrics',
+    }
+    for name, url in routes.items():
+        first, response = _measure(lambda: get(url), 1)
+        repeat_summary, _ = _measure(lambda: get(url), repeat)
+        results[name] = {'first': first, 'repeat': repeat_summary, 'bytes': len(response.data)}
+
+    etag = get(routes['stock_data_365']).headers.get('ETag')
+    results['stock_data_365_if_none_match'], _ = _measure(lambda: get(routes['stock_data_365'], **{'If-None-Match': etag}), repeat)
+    results['stock_data_365_gzip'], _ = _measure(lambda: get(routes['stock_data_365'], **{'Accept-Encoding': 'gzip'}), repeat)
+    return results
+
+# --- Runner ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, queries, stats, windowing, prediction and routes offline.")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--quick', action='store_true', help="Fewer repetitions")
+    parser.add_argument('--repeat', type=int, default=None, help="Repetitions per measurement (default 20, 5 with --quick)")
+    parser.add_argument('--skip-training', action='store_true', help="Skip the LSTM training/inference benchmarks")
+    parser.add_argument('--epochs', type=int, default=3, help="Max LSTM epochs per training run")
+    parser.add_argument('--seed', type=int, default=0, help="Synthetic market data seed")
+    parser.add_argument('--end-date', default=date.today().isoformat(),
+                        help="Last synthetic trading day (default today; pass the same date to compare runs)")
+    parser.add_argument('--keep', action='store_true', help="Keep the temporary database and model directory")
+    args = parser.parse_args(argv)
+    repeat = args.repeat or (5 if args.quick else 20)
+
+    workdir = tempfile.mkdtemp(prefix='stockwave-bench-')
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'MARKET_DATA_PROVIDER': 'local',
+        'MARKET_DATA_SEED': str(args.seed),
+        'MARKET_DATA_END_DATE': args.end_date,
+        'MODEL_REGISTRY_DIR': os.path.join(workdir, 'models'),
+        'REQUEST_LOG': '0',
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    report = {
+        'meta': {
+            'started_at': datetime.utcnow().isoformat(),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': repeat,
+            'epochs': args.epochs,
+            'seed': args.seed,
+            'end_date': args.end_date,
+        },
+        'results': {},
+    }
+
+    try:
+        # The services log with print(); stdout is kept for the JSON report
+        with contextlib.redirect_stdout(sys.stderr):
+            _run(report, args, repeat)
+    finally:
+        if args.keep:
+            print(f"[BENCHMARK] Kept {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report['meta']['finished_at'] = datetime.utcnow().isoformat()
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+        print(f"[BENCHMARK] Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return 0
+
+def _run(report, args, repeat):
+    started = time.perf_counter()
+    from app import app # After the environment above, so it binds to the benchmark database
+    report['meta']['app_import_seconds'] = round(time.perf_counter() - started, 3)
+
+    from services import chart_data, data_services, indicators, prediction_service
+    prediction_service.TRAINING_EPOCHS = args.epochs
+    symbol = SYMBOLS[0]
+
+    with app.app_context():
+        for s in SYMBOLS:
+            data_services.fetch_and_store_stock(s, months=120) # ~2500 bars each
+        phases = (
+            ('ingestion', lambda: bench_ingestion(data_services, max(2, repeat // 5))),
+            ('stored_data_queries', lambda: bench_queries(data_services, chart_data, symbol, repeat)),
+            ('statistics', lambda: bench_statistics(data_services, symbol, repeat)),
+            ('indicators', lambda: bench_indicators(indicators, chart_data, symbol, repeat)),
+            ('windowing', lambda: bench_windowing(prediction_service, symbol, repeat)),
+            ('prediction', lambda: bench_prediction(prediction_service, SYMBOLS[1], max(2, repeat // 5), args.skip_training)),
+        )
+        for name, run in phases:
+            phase_started = time.perf_counter()
+            report['results'][name] = run()
+            print(f"[BENCHMARK] {name} done in {time.perf_counter() - phase_started:.2f}s", file=sys.stderr)
+
+    phase_started = time.perf_counter()
+    report['results']['routes'] = bench_routes(app.test_client(), SYMBOLS[2], repeat)
+    print(f"[BENCHMARK] routes done in {time.perf_counter() - phase_started:.2f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,25 @@
+from database import db
+from datetime import datetime
+
+class BacktestResult(db.Model):
+    """Latest walk-forward backtest of one forecaster for a symbol and horizon (services/backtest.py)."""
+    __tablename__ = 'backtest_results'
+
+    id = db.Column(db.Integer, primary_key=True)
+    company_symbol = db.Column(db.String(20), nullable=False, index=True)
+    model_type = db.Column(db.String(20), nullable=False)
+    horizon_steps = db.Column(db.Integer, nullable=False)
+    origins = db.Column(db.Integer, nullable=False) # Forecasts scored
+    mape = db.Column(db.Float)
+    rmse = db.Column(db.Float)
+    hit_rate = db.Column(db.Float) # Share of forecasts ending within the confidence tolerance; the prediction confidence
+    data_through = db.Column(db.Date) # Latest bar the backtest saw
+    summary = db.Column(db.JSON) # Error metrics and strategy statistics (no equity curves)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('company_symbol', 'model_type', 'horizon_steps', name='uq_symbol_model_horizon'),
+    )
+
+    def __repr__(self):
+        return f"<BacktestResult {self.company_symbol} {self.model_type} {self.horizon_steps}d>"
@@ -0,0 +1,21 @@
+from database import db
+from datetime import datetime
+
+class StockStatistics(db.Model):
+    """Precomputed get_stock_statistics() output per symbol and trailing window, refreshed on ingest."""
+    __tablename__ = 'stock_statistics'
+
+    id = db.Column(db.Integer, primary_key=True)
+    company_symbol = db.Column(db.String(20), nullable=False, index=True)
+    window_days = db.Column(db.Integer, nullable=False)
+    as_of = db.Column(db.Date, nullable=False) # Day the trailing window ends on
+    data_through = db.Column(db.Date) # Latest StockData bar included
+    stats = db.Column(db.JSON) # None when no stored bars fall inside the window
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('company_symbol', 'window_days', name='uq_symbol_window'),
+    )
+
+    def __repr__(self):
+        return f"<StockStatistics {self.company_symbol} {self.window_days}d as of {self.as_of}>"
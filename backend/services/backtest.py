@@ -0,0 +1,334 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from database import db
+from models.backtest_result import BacktestResult
+from services import batch_ingest, fast_forecasters, indicators, prediction_service, training_scheduler
+from services import metrics as perf_metrics
+
+# Walk-forward backtests over stored bars. A forecast is made at every BACKTEST_ORIGIN_STEP-th bar
+# ("origin") from the BACKTEST_TRAIN_WINDOW bars before it and scored against the bars that followed.
+# Fast models are refitted at every origin. LSTM models are trained on the bars before the first origin
+# and fine-tuned every few origins, like the live model as bars arrive. The forecasts, plus a few indicator signal
+# strategies, are also traded bar by bar into equity curves. Symbols run in parallel on a process pool.
+BACKTEST_LOOKBACK_DAYS = int(os.environ.get('BACKTEST_LOOKBACK_DAYS', 1000)) # Newest stored bars per symbol
+BACKTEST_TRAIN_WINDOW = 360 # Bars behind each origin; the same history a live prediction trains on
+BACKTEST_ORIGIN_STEP = 5 # Bars between origins (and how long a forecast's position is held)
+TRANSACTION_COST = 0.0005 # Per unit of position change (5 bps)
+TRADING_DAYS = 252
+RSI_ENTRY, RSI_EXIT = 30, 70
+STRATEGY_INDICATORS = ['sma_20', 'sma_50', 'rsi_14', 'macd']
+WINDOW_SIZE = 60 # LSTM input window, as in forecast_from_frame
+BACKTEST_LSTM_REFIT_ORIGINS = int(os.environ.get('BACKTEST_LSTM_REFIT_ORIGINS', 4)) # Origins between LSTM fine-tunes
+BACKTEST_MIN_ORIGINS = int(os.environ.get('BACKTEST_MIN_ORIGINS', 50)) # Origins the HTTP route makes sure history exists for
+WARMUP_BARS = 49 # Leading bars load_backtest_frame drops: sma_50, the longest STRATEGY_INDICATORS window, is undefined there
+TRADING_DAYS_PER_MONTH = 21
+
+def load_backtest_frame(symbol, lookback_days=BACKTEST_LOOKBACK_DAYS):
+    """Newest stored bars with the prediction features and the strategy indicators, from the feature store."""
+    features = prediction_service.PREDICTION_FEATURES
+    df = indicators.feature_frame(symbol, list(features.values()) + STRATEGY_INDICATORS, limit=lookback_days)
+    if df is None:
+        return None
+    df = df.rename(columns={spec: feature for feature, spec in features.items()})
+    return df.dropna().reset_index(drop=True)
+
+def forecast_origins(n_bars, steps, train_window=BACKTEST_TRAIN_WINDOW, origin_step=BACKTEST_ORIGIN_STEP):
+    """Bars a forecast is made at: each has `train_window` bars before it and `steps` bars after it."""
+    return np.arange(train_window, n_bars - steps + 1, origin_step)
+
+def required_history(steps, min_origins=BACKTEST_MIN_ORIGINS, train_window=BACKTEST_TRAIN_WINDOW,
+                     origin_step=BACKTEST_ORIGIN_STEP):
+    """(stored bars, months to fetch) for a backtest with at least `min_origins` origins."""
+    bars = WARMUP_BARS + train_window + steps + (min_origins - 1) * origin_step
+    return bars, -(-bars // TRADING_DAYS_PER_MONTH) + 1 # A spare month for holidays
+
+# --- Walk-forward forecasts ---
+def _fast_walk_forward(df, model_type, origins, steps, train_window):
+    forecaster = fast_forecasters.FORECASTERS[model_type]
+    split_idx = int(train_window * fast_forecasters.FAST_TRAIN_SPLIT)
+    return np.vstack([forecaster(df.iloc[o - train_window:o], steps, split_idx)[0] for o in origins])
+
+def _lstm_fit(model, X, y, epochs, patience):
+    with perf_metrics.phase(perf_metrics.TRAINING):
+        model.fit(X, y, epochs=epochs, batch_size=16, verbose=0, validation_split=0.1,
+                  callbacks=[prediction_service._early_stopping(patience)])
+
+def _lstm_walk_forward(df, model_type, origins, steps, train_window):
+    """
+    Follow the live model's lifecycle: a full training on the bars before the first origin, then a
+    warm-start fine-tune every BACKTEST_LSTM_REFIT_ORIGINS origins on the windows that arrived since
+    the last fit, and a full retrain after MAX_WARM_STARTS fine-tunes in a row. Each block of origins
+    is forecast in one batch with the model as it was at the block's first origin.
+    """
+    from keras.optimizers import Adam
+
+    features = ['open', 'high', 'low', 'close', 'volume'] + list(prediction_service.PREDICTION_FEATURES)
+    close_feature_idx = features.index('close')
+    direct = model_type == 'lstm_direct'
+    horizon = steps if direct else 1
+    data = df[features].values
+    input_shape = (WINDOW_SIZE, len(features))
+
+    model, scaler, fitted_through, warm_starts = None, None, 0, 0
+    predicted = []
+    for block in range(0, len(origins), BACKTEST_LSTM_REFIT_ORIGINS):
+        block_origins = origins[block:block + BACKTEST_LSTM_REFIT_ORIGINS]
+        known = int(block_origins[0]) # Only bars before the block's first origin are used for fitting
+
+        if model is None or warm_starts >= prediction_service.MAX_WARM_STARTS:
+            X, y, _, _, scaler, _, _ = prediction_service.prepare_data_multi_feature(
+                df.iloc[:known], features, window_size=WINDOW_SIZE, train_test_split_ratio=1.0, horizon=horizon
+            )
+            model = prediction_service.build_model_direct(input_shape, steps) if direct else prediction_service.build_model_improved(input_shape)
+            _lstm_fit(model, X, y, prediction_service.TRAINING_EPOCHS, prediction_service.EARLY_STOPPING_PATIENCE)
+            warm_starts = 0
+        else:
+            # As in warm_start_model: keep the scaling, widened only for out-of-range bars
+            if (data[:known].min(axis=0) < scaler.data_min_).any() or (data[:known].max(axis=0) > scaler.data_max_).any():
+                scaler.partial_fit(data[:known])
+            X, y = prediction_service.build_windows(scaler.transform(data[:known]), WINDOW_SIZE, close_feature_idx, horizon)
+            n_tune = min(max(known - fitted_through, prediction_service.FINE_TUNE_MIN_WINDOWS), len(y))
+            model.compile(optimizer=Adam(learning_rate=prediction_service.FINE_TUNE_LEARNING_RATE), loss='mean_squared_error')
+            _lstm_fit(model, X[-n_tune:], y[-n_tune:], prediction_service.FINE_TUNE_EPOCHS, prediction_service.FINE_TUNE_PATIENCE)
+            warm_starts += 1
+        fitted_through = known
+
+        scaled = scaler.transform(data[:int(block_origins[-1])])
+        windows = sliding_window_view(scaled, WINDOW_SIZE, axis=0)[block_origins - WINDOW_SIZE].transpose(0, 2, 1) # (origins, window, features)
+        if direct:
+            block_predicted = prediction_service.predict_direct_multi_feature(model, windows, scaler, len(features), close_feature_idx)
+        else:
+            block_predicted = prediction_service.predict_multiple_steps_multi_feature(model, windows, scaler, steps, len(features), close_feature_idx)
+        predicted.append(np.atleast_2d(block_predicted)) # A single origin comes back as one series
+    return np.vstack(predicted)
+
+def walk_forward(df, model_type, steps, train_window=BACKTEST_TRAIN_WINDOW, origin_step=BACKTEST_ORIGIN_STEP):
+    """(origins, predicted closes (origins, steps), actual closes (origins, steps))."""
+    closes = df['close'].to_numpy(dtype=float)
+    origins = forecast_origins(len(closes), steps, train_window, origin_step)
+    if model_type in fast_forecasters.FORECASTERS:
+        with perf_metrics.phase(perf_metrics.INFERENCE):
+            predicted = _fast_walk_forward(df, model_type, origins, steps, train_window)
+    else:
+        predicted = _lstm_walk_forward(df, model_type, origins, steps, train_window)
+    actual = sliding_window_view(closes, steps)[origins]
+    return origins, predicted, actual
+
+def forecast_errors(predicted, actual, last_closes):
+    """Error metrics over every origin at once; `last_closes` is the close before each origin."""
+    errors = predicted - actual
+    pct = np.abs(errors) / np.abs(actual)
+    final_move = actual[:, -1] - last_closes
+    return {
+        'origins': len(predicted),
+        'mape': float(pct.mean() * 100),
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'mae': float(np.mean(np.abs(errors))),
+        'final_step_mape': float(pct[:, -1].mean() * 100),
+        'mape_by_step': np.round(pct.mean(axis=0) * 100, 4).tolist(),
+        'directional_accuracy': float(np.mean(np.sign(predicted[:, -1] - last_closes) == np.sign(final_move))),
+        'hit_rate': float(np.mean(pct[:, -1] <= prediction_service.CONFIDENCE_TOLERANCE)),
+    }
+
+# --- Strategies ---
+def strategy_positions(df, predicted, origins, steps, origin_step, model_type):
+    """
+    Position (0 = flat, 1 = long) held over each bar's return, decided at the previous bar's close.
+    The forecast strategy goes long from an origin for `origin_step` bars when the forecast for the
+    end of that holding period is above the last close.
+    """
+    n = len(df)
+    closes = df['close'].to_numpy(dtype=float)
+
+    forecast = np.zeros(n)
+    up = predicted[:, min(origin_step, steps) - 1] > closes[origins - 1]
+    held = origins[:, None] + np.arange(origin_step)
+    inside = held < n
+    forecast[held[inside]] = np.broadcast_to(up[:, None], held.shape)[inside]
+
+    rsi = df['rsi_14'].to_numpy(dtype=float)
+    signals = {
+        'buy_and_hold': np.ones(n),
+        'sma_20_50_crossover': (df['sma_20'] > df['sma_50']).to_numpy(dtype=float),
+        'macd_signal_crossover': (df['macd'] > df['macd_signal']).to_numpy(dtype=float),
+        # Enter below RSI_ENTRY, stay long until above RSI_EXIT
+        'rsi_reversion': pd.Series(np.where(rsi < RSI_ENTRY, 1.0, np.where(rsi > RSI_EXIT, 0.0, np.nan))).ffill().fillna(0).to_numpy(),
+    }
+    positions = {name: np.concatenate(([0.0], signal[:-1])) for name, signal in signals.items()} # Trade on the next bar
+    positions[f'forecast_{model_type}'] = forecast
+    return positions
+
+def equity_curve(closes, position, start):
+    """Equity (starting at 1) from bar `start` on, net of TRANSACTION_COST, with its summary statistics."""
+    returns = closes[start:] / closes[start - 1:-1] - 1
+    held = position[start:]
+    turnover = np.abs(np.diff(held, prepend=0.0))
+    strategy_returns = held * returns - TRANSACTION_COST * turnover
+    equity = np.cumprod(1 + strategy_returns)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    years = len(strategy_returns) / TRADING_DAYS
+    volatility = strategy_returns.std()
+    return equity, {
+        'total_return': float(equity[-1] - 1),
+        'cagr': float(equity[-1] ** (1 / years) - 1) if years > 0 and equity[-1] > 0 else None,
+        'sharpe': float(strategy_returns.mean() / volatility * np.sqrt(TRADING_DAYS)) if volatility > 0 else 0.0,
+        'max_drawdown': float(drawdown.min()),
+        'exposure': float(held.mean()),
+        'trades': int(np.count_nonzero(turnover)),
+    }
+
+# --- Per symbol (runs in pool processes; no database access) ---
+def run_backtest(symbol, df, model_type='ridge', horizon='week', train_window=BACKTEST_TRAIN_WINDOW,
+                 origin_step=BACKTEST_ORIGIN_STEP):
+    """Walk-forward errors and strategy equity curves for one symbol's backtest frame."""
+    started = time.perf_counter()
+    steps = prediction_service.HORIZON_STEPS.get(horizon.lower(), 1)
+    summary = {'symbol': symbol, 'success': False, 'model_type': model_type, 'horizon': horizon, 'steps': steps}
+    if model_type not in prediction_service.MODEL_TYPES:
+        summary['message'] = f"Unknown model type '{model_type}'. Choose one of: {', '.join(prediction_service.MODEL_TYPES)}."
+        return summary
+    if df is None or len(forecast_origins(len(df), steps, train_window, origin_step)) == 0:
+        summary['message'] = f"Not enough stored history: need more than {train_window + steps} bars."
+        return summary
+
+    origins, predicted, actual = walk_forward(df, model_type, steps, train_window, origin_step)
+    closes = df['close'].to_numpy(dtype=float)
+    errors = forecast_errors(predicted, actual, closes[origins - 1])
+
+    start = int(origins[0])
+    curves = {}
+    strategies = {}
+    for name, position in strategy_positions(df, predicted, origins, steps, origin_step, model_type).items():
+        curves[name], strategies[name] = equity_curve(closes, position, start)
+
+    summary.update(
+        success=True,
+        seconds=round(time.perf_counter() - started, 3),
+        data_through=df['date'].iloc[-1].date().isoformat(),
+        metrics=errors,
+        strategies=strategies,
+        equity_curves={
+            'dates': df['date'].iloc[start:].dt.strftime('%Y-%m-%d').tolist(),
+            **{name: np.round(curve, 4).tolist() for name, curve in curves.items()},
+        },
+    )
+    return summary
+
+# --- Storage ---
+def save_result(result):
+    """Upsert the symbol's BacktestResult row (its hit rate becomes the prediction confidence)."""
+    if not result.get('success'):
+        return
+    try:
+        row = BacktestResult.query.filter_by(company_symbol=result['symbol'], model_type=result['model_type'],
+                                             horizon_steps=result['steps']).first()
+        if row is None:
+            row = BacktestResult(company_symbol=result['symbol'], model_type=result['model_type'], horizon_steps=result['steps'])
+            db.session.add(row)
+        errors = result['metrics']
+        row.origins = errors['origins']
+        row.mape = errors['mape']
+        row.rmse = errors['rmse']
+        row.hit_rate = errors['hit_rate']
+        row.data_through = datetime.strptime(result['data_through'], '%Y-%m-%d').date()
+        row.summary = {'metrics': errors, 'strategies': result['strategies']}
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"[DB WRITE ERROR] Could not store backtest for {result['symbol']}: {e}")
+
+# --- Batch ---
+def backtest_batch(symbols, market='US', model_type='ridge', horizon='week', max_workers=None,
+                   lookback_days=BACKTEST_LOOKBACK_DAYS, save=True):
+    """
+    Backtest many symbols on a process pool. Frames are loaded (and results stored) on the calling
+    thread, which must be inside an app context. Returns one result per symbol in input order.
+    """
+    if model_type not in prediction_service.MODEL_TYPES:
+        raise ValueError(f"Unknown model type '{model_type}'. Choose one of: {', '.join(prediction_service.MODEL_TYPES)}.")
+
+    batch_started = time.perf_counter()
+    lstm = model_type not in fast_forecasters.FORECASTERS
+    targets = batch_ingest._normalize_targets(symbols, market)
+    results = {}
+
+    frames = []
+    for symbol, _ in targets:
+        df = load_backtest_frame(symbol, lookback_days)
+        if df is None or df.empty:
+            results[symbol] = {'symbol': symbol, 'success': False, 'message': "No stored history; sync the symbol first."}
+            continue
+        frames.append((symbol, df))
+
+    if max_workers is None:
+        max_workers = training_scheduler.default_worker_count() if lstm else (os.cpu_count() or 1)
+    if len(frames) == 1 or max_workers <= 1:
+        for symbol, df in frames:
+            results[symbol] = run_backtest(symbol, df, model_type, horizon)
+    elif frames:
+        # spawn, and the training thread budget for LSTMs, as in the training scheduler
+        context = multiprocessing.get_context('spawn')
+        pool_options = {'initializer': training_scheduler._init_worker,
+                        'initargs': (training_scheduler.TRAINING_THREADS_PER_WORKER,)} if lstm else {}
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(frames)), mp_context=context, **pool_options) as pool:
+            futures = {pool.submit(run_backtest, symbol, df, model_type, horizon): symbol for symbol, df in frames}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    print(f"[BACKTEST ERROR] Backtest failed for {symbol}: {e}")
+                    results[symbol] = {'symbol': symbol, 'success': False, 'message': f"Backtest failed: {e}"}
+
+    ordered = [results[symbol] for symbol, _ in targets if symbol in results]
+    if save:
+        for result in ordered:
+            save_result(result)
+    succeeded = sum(1 for r in ordered if r.get('success'))
+    print(f"[BACKTEST] {succeeded}/{len(ordered)} symbols backtested ({model_type}, {horizon}) in {time.perf_counter() - batch_started:.2f}s.")
+    return ordered
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward backtest forecasters and signal strategies over stored bars.")
+    parser.add_argument('symbols', nargs='*', help="Ticker symbols, e.g. AAPL MSFT or RELIANCE TCS with --market IN")
+    parser.add_argument('--file', help="Text file with one symbol per line (optionally 'SYMBOL,MARKET')")
+    parser.add_argument('--market', default='US', help="Default market for symbols without one (US or IN)")
+    parser.add_argument('--model', default='ridge', help=f"Forecaster: {', '.join(prediction_service.MODEL_TYPES)}")
+    parser.add_argument('--horizon', default='week', help=f"Forecast horizon: {', '.join(prediction_service.HORIZON_STEPS)}")
+    parser.add_argument('--days', type=int, default=BACKTEST_LOOKBACK_DAYS, help="Newest stored bars to backtest over")
+    parser.add_argument('--workers', type=int, default=None, help="Processes (default: all cores; cores // threads for LSTMs)")
+    parser.add_argument('--no-curves', action='store_true', help="Leave the equity curves out of the printed report")
+    args = parser.parse_args(argv)
+
+    symbols = list(args.symbols)
+    if args.file:
+        with open(args.file) as fh:
+            for line in fh:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    symbols.append(tuple(part.strip() for part in line.split(',')))
+    if not symbols:
+        parser.error("No symbols given.")
+
+    from app import app # Imported lazily so the module can be used without creating the Flask app
+    with app.app_context():
+        results = backtest_batch(symbols, market=args.market, model_type=args.model, horizon=args.horizon,
+                                 max_workers=args.workers, lookback_days=args.days)
+    if args.no_curves:
+        for result in results:
+            result.pop('equity_curves', None)
+    print(json.dumps(results, indent=2, default=str))
+    return 0 if all(r.get('success') for r in results) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from services import data_services
+
+# Upper bound on concurrent yfinance downloads; storage always happens on the calling thread.
+INGEST_MAX_WORKERS = int(os.environ.get('INGEST_MAX_WORKERS', 8))
+
+def _normalize_targets(symbols, market='US'):
+    """Accept 'AAPL', ('TCS', 'IN') or {'symbol': 'TCS', 'market': 'IN'} entries; drop duplicates."""
+    targets = []
+    seen = set()
+    for entry in symbols or []:
+        if isinstance(entry, dict):
+            symbol, symbol_market = entry.get('symbol'), entry.get('market') or market
+        elif isinstance(entry, (list, tuple)):
+            symbol, symbol_market = entry[0], (entry[1] if len(entry) > 1 else market)
+        else:
+            symbol, symbol_market = entry, market
+
+        if not symbol or not str(symbol).strip():
+            continue
+        formatted = data_services.format_symbol(str(symbol).strip(), symbol_market)
+        if formatted in seen:
+            continue
+        seen.add(formatted)
+        targets.append((formatted, symbol_market))
+    return targets
+
+def _timed_fetch(plan):
+    started = time.perf_counter()
+    df = data_services.fetch_for_plan(plan)
+    return df, time.perf_counter() - started
+
+def ingest_batch(symbols, market='US', months=18, mode='incremental', max_workers=None):
+    """
+    Sync many symbols at once. Downloads run concurrently in a bounded thread pool and each
+    frame is written as soon as it arrives. Must be called inside an app context.
+    Returns a report with per-symbol success/failure, row counts and timings.
+    """
+    batch_started = time.perf_counter()
+    max_workers = max(1, max_workers or INGEST_MAX_WORKERS)
+    targets = _normalize_targets(symbols, market)
+    results = {}
+
+    # 1. Plan every symbol (DB reads only) on the calling thread
+    plans = []
+    for symbol, symbol_market in targets:
+        try:
+            plans.append(data_services.plan_sync(symbol, months=months, market=symbol_market, mode=mode))
+        except Exception as e:
+            print(f"[BATCH INGEST ERROR] Planning failed for {symbol}: {e}")
+            results[symbol] = {'symbol': symbol, 'success': False, 'message': f"Planning failed: {e}"}
+
+    # 2. Download concurrently, 3. store each frame as it completes
+    if plans:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(plans))) as pool:
+            futures = {pool.submit(_timed_fetch, plan): plan for plan in plans}
+            for future in as_completed(futures):
+                plan = futures[future]
+                symbol = plan['symbol']
+                try:
+                    df, fetch_seconds = future.result()
+                except Exception as e:
+                    print(f"[BATCH INGEST ERROR] Download failed for {symbol}: {e}")
+                    results[symbol] = {'symbol': symbol, 'success': False, 'message': f"Download failed: {e}"}
+                    continue
+
+                store_started = time.perf_counter()
+                result = data_services.store_for_plan(plan, df)
+                result.update(
+                    rows_fetched=0 if df is None else len(df),
+                    fetch_seconds=round(fetch_seconds, 3),
+                    store_seconds=round(time.perf_counter() - store_started, 3)
+                )
+                results[symbol] = result
+
+    ordered = [results[symbol] for symbol, _ in targets if symbol in results]
+    succeeded = sum(1 for r in ordered if r.get('success'))
+    elapsed = time.perf_counter() - batch_started
+    print(f"[BATCH INGEST] {succeeded}/{len(ordered)} symbols synced in {elapsed:.2f}s with {max_workers} workers.")
+
+    return {
+        'requested': len(targets),
+        'succeeded': succeeded,
+        'failed': len(ordered) - succeeded,
+        'max_workers': max_workers,
+        'elapsed_seconds': round(elapsed, 3),
+        'results': ordered
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm the StockData table for many symbols at once.")
+    parser.add_argument('symbols', nargs='*', help="Ticker symbols, e.g. AAPL MSFT or RELIANCE TCS with --market IN")
+    parser.add_argument('--file', help="Text file with one symbol per line (optionally 'SYMBOL,MARKET')")
+    parser.add_argument('--market', default='US', help="Default market for symbols without one (US or IN)")
+    parser.add_argument('--months', type=int, default=18, help="History window to keep in sync")
+    parser.add_argument('--mode', default='incremental', choices=['incremental', 'full', 'replace'])
+    parser.add_argument('--workers', type=int, default=INGEST_MAX_WORKERS, help="Concurrent downloads")
+    args = parser.parse_args(argv)
+
+    symbols = list(args.symbols)
+    if args.file:
+        with open(args.file) as fh:
+            for line in fh:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    symbols.append(tuple(part.strip() for part in line.split(',')))
+    if not symbols:
+        parser.error("No symbols given.")
+
+    from app import app # Imported lazily so the module can be used without creating the Flask app
+    with app.app_context():
+        report = ingest_batch(symbols, market=args.market, months=args.months, mode=args.mode, max_workers=args.workers)
+    print(json.dumps(report, indent=2, default=str))
+    return 0 if report['failed'] == 0 else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,151 @@
+import itertools
+
+import numpy as np
+
+from database import db
+from models.stock_data import StockData
+from services import metrics, stats_engine
+
+# Chart payloads for /stock/data, built from one column query into an OHLCV bundle (no ORM objects).
+# 'records' is the original row-per-object layout; 'columnar' returns parallel arrays, roughly half the size.
+CHART_FORMATS = ('records', 'columnar')
+DATE_FORMATS = ('iso', 'epoch_day') # epoch_day: integer days since 1970-01-01
+
+@metrics.timed(metrics.DB_READ)
+def load_chart_ohlcv(company_symbol, limit=None, since=None):
+    """The newest `limit` stored bars (oldest first, from `since` on if given) as an OHLCV bundle, or None if there are none."""
+    try:
+        query = db.session.query(
+            StockData.date, StockData.open_price, StockData.high_price,
+            StockData.low_price, StockData.close_price, StockData.volume
+        ).filter(StockData.company_symbol == company_symbol)
+        if since is not None:
+            query = query.filter(StockData.date >= since)
+        query = query.order_by(StockData.date.desc())
+
+        if limit:
+            query = query.limit(limit)
+        return stats_engine.ohlcv_from_rows(query.all()[::-1])
+    except Exception as e:
+        print(f"[DB READ ERROR] {company_symbol}: {e}")
+        return None
+
+def bar_count(ohlcv):
+    return 0 if ohlcv is None else len(ohlcv['close'])
+
+def _encode_dates(dates, date_format):
+    if date_format == 'epoch_day':
+        return dates.astype('int64').tolist()
+    return np.datetime_as_string(dates, unit='D').tolist()
+
+def _price_column(values):
+    """Float list with missing prices as None (NaN is not valid JSON)."""
+    if np.isnan(values).any():
+        return [None if np.isnan(v) else v for v in values.tolist()]
+    return values.tolist()
+
+def to_columnar(ohlcv, date_format='iso'):
+    return {
+        'dates': _encode_dates(ohlcv['date'], date_format),
+        'open': _price_column(ohlcv['open']),
+        'high': _price_column(ohlcv['high']),
+        'low': _price_column(ohlcv['low']),
+        'close': _price_column(ohlcv['close']),
+        'volume': ohlcv['volume'].astype('int64').tolist(),
+    }
+
+def to_records(ohlcv, date_format='iso'):
+    """Row-per-object layout: [{'date', 'open', 'high', 'low', 'close', 'volume'}, ...]."""
+    columns = to_columnar(ohlcv, date_format)
+    return [
+        {'date': d, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+        for d, o, h, l, c, v in zip(
+            columns['dates'], columns['open'], columns['high'], columns['low'], columns['close'], columns['volume']
+        )
+    ]
+
+# --- Downsampling (max_points) ---
+SAMPLING_METHODS = ('candles', 'lttb') # candles: weekly/monthly OHLCV bars; lttb: subset of daily bars for line charts
+
+def _take(ohlcv, idx):
+    return {key: values[idx] for key, values in ohlcv.items()}
+
+def _period_keys(dates, period):
+    """Integer bucket per bar: ISO week (Monday start) or a run of `period` calendar months."""
+    if period == 'week':
+        return (dates.astype('int64') + 3) // 7 # 1970-01-01 was a Thursday
+    return dates.astype('datetime64[M]').astype('int64') // period
+
+def aggregate_candles(ohlcv, max_points):
+    """
+    Merge daily bars into weekly candles, or monthly (then multi-month, then multi-year) candles when
+    weeks are still too many, so there are never more than `max_points`. Each candle is dated by its
+    first bar and keeps first open, last close, high/low extremes and total volume.
+    """
+    n = bar_count(ohlcv)
+    if n <= max_points:
+        return ohlcv
+
+    for period in itertools.chain(('week', 1, 2, 3, 6), itertools.count(12, 12)):
+        keys = _period_keys(ohlcv['date'], period)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+        if len(starts) <= max(max_points, 1):
+            break
+    ends = np.append(starts[1:], n) - 1
+
+    return {
+        'date': ohlcv['date'][starts],
+        'open': ohlcv['open'][starts],
+        'high': np.fmax.reduceat(ohlcv['high'], starts),
+        'low': np.fmin.reduceat(ohlcv['low'], starts),
+        'close': ohlcv['close'][ends],
+        'volume': np.add.reduceat(ohlcv['volume'], starts),
+    }
+
+def lttb_indices(values, max_points):
+    """
+    Largest-Triangle-Three-Buckets selection over a series: the first and last points plus one point per
+    bucket in between, chosen to maximize the triangle with the previous pick and the next bucket's mean.
+    """
+    n = len(values)
+    if n <= max_points or max_points < 3:
+        return np.arange(n) if n <= max_points else np.array([0, n - 1])
+
+    x = np.arange(n, dtype=float)
+    y = np.nan_to_num(values, nan=np.nanmean(values))
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int) # max_points - 2 interior buckets
+
+    # Each bucket's successor mean, computed up front with cumulative sums (the last one is the final point)
+    sums = np.concatenate(([0.0], np.cumsum(y)))
+    next_lo, next_hi = edges[1:], np.append(edges[2:], n)
+    next_y = (sums[next_hi] - sums[next_lo]) / (next_hi - next_lo)
+    next_x = (next_lo + next_hi - 1) / 2
+    next_y[-1], next_x[-1] = y[-1], x[-1]
+
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for b in range(max_points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        area = np.abs((x[prev] - next_x[b]) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (next_y[b] - y[prev]))
+        prev = lo + int(np.argmax(area))
+        selected[b + 1] = prev
+    return selected
+
+def select_points(ohlcv, max_points):
+    """
+    At most `max_points` daily bars picked by LTTB on the close, always including the first, last, highest
+    and lowest bars (only the highest when `max_points` is 3, too few for all four).
+    """
+    n = bar_count(ohlcv)
+    if n <= max_points:
+        return ohlcv
+
+    extremes = [int(np.nanargmax(ohlcv['high'])), int(np.nanargmin(ohlcv['low']))][:max(max_points - 2, 0)]
+    idx = np.union1d(lttb_indices(ohlcv['close'], max(max_points - len(extremes), 2)), extremes)
+    return _take(ohlcv, idx)
+
+def downsample(ohlcv, max_points, method='candles'):
+    if method == 'lttb':
+        return select_points(ohlcv, max_points)
+    return aggregate_candles(ohlcv, max_points)
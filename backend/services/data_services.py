@@ -1,9 +1,16 @@
-import yfinance as yf
 from models.stock_data import StockData
+from models.stock_statistics import StockStatistics
 from database import db
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
 import pandas as pd
 from math import ceil
+import os
+from concurrent.futures import ThreadPoolExecutor
+from services.cache import TTLCache
+from services import indicators, metrics, response_cache, stats_engine
+from services.market_data import get_provider
 
 # --- Symbol Formatting ---
 def format_symbol(symbol, market='US'):
@@ -16,28 +23,34 @@ def format_symbol(symbol, market='US'):
 def validate_stock_symbol(company_symbol, market='US'):
     try:
         symbol = format_symbol(company_symbol, market)
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period='5d')
-        return not hist.empty
+        with metrics.phase(metrics.UPSTREAM):
+            hist = get_provider().get_history(symbol, period='5d')
+        return hist is not None and not hist.empty
     except Exception as e:
         print(f"[VALIDATION ERROR] {symbol}: {e}")
         return False
 
 
-def get_historical_data(company_symbol, months=None, days=None, period_type='months', market='US'):
+def get_historical_data(company_symbol, months=None, days=None, period_type='months', market='US', start=None):
     try:
         symbol = format_symbol(company_symbol, market)
-        ticker = yf.Ticker(symbol)
+        provider = get_provider()
 
         period_str = "1mo" # Default period
         if period_type == 'days' and days is not None:
             period_str = f"{max(days, 5)}d" 
         elif months is not None:
             period_str = f"{months}mo"
-        
-        hist = ticker.history(period=period_str, interval="1d") 
 
-        if hist.empty:
+        with metrics.phase(metrics.UPSTREAM):
+            if start is not None:
+                # Delta fetch: everything from `start` (inclusive) up to today
+                period_str = f"from {start}"
+                hist = provider.get_history(symbol, start=start, interval="1d")
+            else:
+                hist = provider.get_history(symbol, period=period_str, interval="1d")
+
+        if hist is None or hist.empty:
             print(f"[YFINANCE] No historical data found for {symbol} for period {period_str}.")
             return None
         return hist
@@ -45,6 +58,7 @@ def get_historical_data(company_symbol, months=None, days=None, period_type='mon
         print(f"[YFINANCE ERROR] {symbol}: {e}")
         return None
 
+@metrics.timed(metrics.DB_READ)
 def get_stored_stock_data(company_symbol, start_date=None, end_date=None, limit=None):
     try:
         query = StockData.query.filter_by(company_symbol=company_symbol)
@@ -66,204 +80,445 @@ def get_stored_stock_data(company_symbol, start_date=None, end_date=None, limit=
         print(f"[DB READ ERROR] {company_symbol}: {e}")
         return []
 
-def fetch_and_store_stock(company_symbol, months=18, market='US'):
-    symbol = format_symbol(company_symbol, market)
+# --- Bulk Upsert Ingestion ---
+UPSERT_CHUNK_SIZE = 1000 # Rows per INSERT statement (keeps Postgres bind params well under 65535)
+
+def _frame_to_rows(symbol, df):
+    """Build StockData row mappings column-wise from a yfinance OHLCV DataFrame."""
+    frame = df.dropna(subset=['Close'])
+    if frame.empty:
+        return []
+
+    dates = pd.DatetimeIndex(frame.index).date # Local trading date of each bar
+    duplicated = pd.Index(dates).duplicated(keep='last')
+    if duplicated.any():
+        # yfinance can repeat today's bar; one statement must not touch the same (symbol, date) twice
+        frame, dates = frame[~duplicated], dates[~duplicated]
+    opens = frame['Open'].astype(float).tolist()
+    highs = frame['High'].astype(float).tolist()
+    lows = frame['Low'].astype(float).tolist()
+    closes = frame['Close'].astype(float).tolist()
+    volumes = frame['Volume'].fillna(0).astype('int64').tolist()
+    now = datetime.utcnow()
+
+    return [{
+        'company_symbol': symbol,
+        'date': d,
+        'open_price': o,
+        'high_price': h,
+        'low_price': l,
+        'close_price': c,
+        'volume': v,
+        'created_at': now,
+        'updated_at': now,
+    } for d, o, h, l, c, v in zip(dates, opens, highs, lows, closes, volumes)]
+
+def _upsert_statement(dialect_name, rows):
+    """Multi-row INSERT ... ON CONFLICT (company_symbol, date) DO UPDATE, or None if unsupported."""
+    table = StockData.__table__
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(rows)
+        conflict_target = {'constraint': 'uq_symbol_date'}
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(rows)
+        conflict_target = {'index_elements': ['company_symbol', 'date']}
+    else:
+        return None
+
+    return stmt.on_conflict_do_update(
+        set_={
+            'open_price': stmt.excluded.open_price,
+            'high_price': stmt.excluded.high_price,
+            'low_price': stmt.excluded.low_price,
+            'close_price': stmt.excluded.close_price,
+            'volume': stmt.excluded.volume,
+            'updated_at': stmt.excluded.updated_at,
+        },
+        **conflict_target
+    )
+
+def upsert_stock_data(symbol, df):
+    """
+    Write a yfinance OHLCV DataFrame for `symbol` in bulk, keyed on uq_symbol_date.
+    Returns (inserted, updated) row counts. The caller owns the commit.
+    """
+    rows = _frame_to_rows(symbol, df)
+    if not rows:
+        return 0, 0
+
+    dates = [row['date'] for row in rows]
+    existing_dates = {
+        d for (d,) in db.session.query(StockData.date)
+        .filter(StockData.company_symbol == symbol)
+        .filter(StockData.date.between(min(dates), max(dates)))
+        .all()
+    }
+    updated = sum(1 for d in dates if d in existing_dates)
+    inserted = len(rows) - updated
+
+    dialect_name = db.session.get_bind().dialect.name
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[i:i + UPSERT_CHUNK_SIZE]
+        stmt = _upsert_statement(dialect_name, chunk)
+        if stmt is not None:
+            db.session.execute(stmt)
+        else:
+            # Generic fallback for dialects without ON CONFLICT: replace the overlapping dates, then bulk insert.
+            chunk_dates = [row['date'] for row in chunk]
+            StockData.query.filter(
+                StockData.company_symbol == symbol,
+                StockData.date.in_(chunk_dates)
+            ).delete(synchronize_session=False)
+            db.session.execute(StockData.__table__.insert(), chunk)
+
+    return inserted, updated
+
+def store_stock_frame(symbol, df, replace=False, overlap_checked=False):
+    """
+    Bulk upsert an already-fetched OHLCV DataFrame for `symbol` and commit.
+    With replace=True every stored row for the symbol is deleted first (legacy full refresh).
+    overlap_checked=True means the already stored bars in `df` were compared against the DB and only the
+    newest of them can differ (an incremental sync), so cached indicators are extended rather than rebuilt.
+    Returns a result dict with success, message, inserted and updated counts.
+    """
+    result = {'symbol': symbol, 'success': False, 'message': '', 'inserted': 0, 'updated': 0}
+    if df is None or df.empty:
+        result['message'] = f"No data found for {symbol} from yfinance."
+        return result
+
     try:
-        df = get_historical_data(company_symbol, months=months, period_type='months', market=market)
-        if df is None or df.empty:
-            return False, f"No data found for {symbol} from yfinance."
+        with metrics.phase(metrics.DB_WRITE):
+            if replace:
+                StockData.query.filter_by(company_symbol=symbol).delete()
+                print(f"[DB CLEANUP] Deleted existing records for {symbol}.")
 
-        StockData.query.filter_by(company_symbol=symbol).delete()
-        db.session.commit()
-        print(f"[DB CLEANUP] Deleted existing records for {symbol}.")
-
-
-        for index, row in df.iterrows():
-            date = index.date() # Convert pandas timestamp to Python date
-            
-            # Check if record for this date already exists to avoid duplicates
-            existing_record = StockData.query.filter_by(company_symbol=symbol, date=date).first()
-            if existing_record:
-                # Update existing record
-                existing_record.open_price = row['Open']
-                existing_record.high_price = row['High']
-                existing_record.low_price = row['Low']
-                existing_record.close_price = row['Close']
-                existing_record.volume = row['Volume']
-            else:
-                # Add new record
-                stock_data = StockData(
-                    company_symbol=symbol,
-                    date=date,
-                     open_price=float(row['Open']),
-                    high_price=float(row['High']),
-                    low_price=float(row['Low']),
-                    close_price=float(row['Close']),
-                    volume=int(row['Volume']),
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow()
-                )
-                db.session.add(stock_data)
-        
-        db.session.commit()
-        print(f"[DB WRITE] Successfully fetched and stored {len(df)} records for {symbol}.")
-        return True, f"Successfully fetched and stored data for {symbol}."
+            inserted, updated = upsert_stock_data(symbol, df)
+            db.session.commit()
+        print(f"[DB WRITE] Upserted {len(df)} records for {symbol} ({inserted} inserted, {updated} updated).")
+
+        response_cache.invalidate_watermark(symbol) # Cached /stock/data bodies for the symbol are now stale
+        if replace or (updated > 1 and not overlap_checked):
+            indicators.invalidate(symbol) # Older bars were rewritten, so cached indicators cannot just be extended
+        changed_through = None if replace else pd.DatetimeIndex(df.index).max().date()
+        refresh_materialized_statistics(symbol, changed_through=changed_through)
+
+        result.update(
+            success=True,
+            message=f"Successfully fetched and stored data for {symbol}.",
+            inserted=inserted,
+            updated=updated
+        )
+        return result
     except Exception as e:
-        db.session.rollback() 
+        db.session.rollback()
         print(f"[STORAGE ERROR] {symbol}: {e}")
-        return False, f"Failed to fetch and store data for {symbol}: {e}"
+        result['message'] = f"Failed to fetch and store data for {symbol}: {e}"
+        return result
+
+def ingest_stock(company_symbol, months=18, market='US', replace=False):
+    """Fetch `months` of history from yfinance and bulk upsert it into StockData."""
+    symbol = format_symbol(company_symbol, market)
+    df = get_historical_data(company_symbol, months=months, period_type='months', market=market)
+    return store_stock_frame(symbol, df, replace=replace)
+
+def fetch_and_store_stock(company_symbol, months=18, market='US', replace=False):
+    result = ingest_stock(company_symbol, months=months, market=market, replace=replace)
+    return result['success'], result['message']
+
+# --- Incremental Sync ---
+SYNC_OVERLAP_DAYS = 5 # Stored trading days re-requested to detect revised (split/dividend adjusted) history; the newest is only refreshed
+SYNC_REVISION_TOLERANCE = 1e-4 # Relative close-price difference that counts as a history revision
+SYNC_COVERAGE_SLACK_DAYS = 7 # Weekends/holidays allowed between the requested window start and the first stored bar
+
+@metrics.timed(metrics.DB_READ)
+def get_stored_date_range(company_symbol):
+    """Return (first_date, latest_date) stored for the symbol, or (None, None)."""
+    return db.session.query(
+        func.min(StockData.date), func.max(StockData.date)
+    ).filter(StockData.company_symbol == company_symbol).one()
+
+def plan_sync(company_symbol, months=18, market='US', mode='incremental'):
+    """
+    Decide how much history a sync needs. `mode` is 'incremental', 'full' or 'replace'.
+    An incremental plan starts SYNC_OVERLAP_DAYS stored bars before the latest stored date;
+    it degrades to a full fetch when nothing is stored or the stored history doesn't reach
+    back far enough to cover `months`.
+    """
+    symbol = format_symbol(company_symbol, market)
+    plan = {'symbol': symbol, 'market': market, 'months': months, 'mode': 'full', 'start': None, 'overlap': {}}
+
+    if mode == 'replace':
+        plan['mode'] = 'replace'
+        return plan
+    if mode != 'incremental':
+        return plan
+
+    first_date, latest_date = get_stored_date_range(symbol)
+    if latest_date is None:
+        return plan
+
+    window_start = datetime.now().date() - timedelta(days=int(months * 30.44))
+    if first_date > window_start + timedelta(days=SYNC_COVERAGE_SLACK_DAYS):
+        print(f"[SYNC] Stored history for {symbol} starts {first_date}, need {window_start}. Falling back to full fetch.")
+        return plan
+
+    overlap_rows = (
+        db.session.query(StockData.date, StockData.close_price)
+        .filter(StockData.company_symbol == symbol)
+        .order_by(StockData.date.desc())
+        .limit(SYNC_OVERLAP_DAYS)
+        .all()
+    )
+    plan['mode'] = 'incremental'
+    plan['overlap'] = {d: close for d, close in overlap_rows}
+    plan['start'] = min(plan['overlap'])
+    return plan
+
+def fetch_for_plan(plan):
+    """Download the history a sync plan asks for (network only, no DB access)."""
+    if plan['mode'] == 'incremental':
+        return get_historical_data(plan['symbol'], market=plan['market'], start=plan['start'])
+    return get_historical_data(plan['symbol'], months=plan['months'], period_type='months', market=plan['market'])
+
+def _history_revised(plan, df):
+    """
+    True if the overlap bars fetched again differ from what is stored (corporate-action adjustment).
+    The newest stored bar is left out: it is often a partial intraday bar, and the upsert updates it anyway.
+    """
+    fetched = dict(zip(pd.DatetimeIndex(df.index).date, df['Close'].astype(float)))
+    newest = max(plan['overlap'])
+    for d, stored_close in plan['overlap'].items():
+        if d == newest:
+            continue
+        fetched_close = fetched.get(d)
+        if fetched_close is None or stored_close is None:
+            return True
+        if abs(fetched_close - stored_close) > SYNC_REVISION_TOLERANCE * max(abs(stored_close), 1e-9):
+            return True
+    return False
+
+def store_for_plan(plan, df):
+    """Persist the frame fetched for a sync plan; re-fetches the full window if history was revised."""
+    symbol = plan['symbol']
+    if plan['mode'] == 'incremental' and df is not None and not df.empty and _history_revised(plan, df):
+        print(f"[SYNC] Overlap for {symbol} changed since last sync. Re-fetching full history.")
+        result = ingest_stock(symbol, months=plan['months'], market=plan['market'], replace=True)
+        result['mode'] = 'full_after_revision'
+        return result
+
+    # An incremental overlap that reached this point matched what is stored (see _history_revised)
+    result = store_stock_frame(symbol, df, replace=plan['mode'] == 'replace', overlap_checked=plan['mode'] == 'incremental')
+    result['mode'] = plan['mode']
+    return result
+
+def sync_stock(company_symbol, months=18, market='US', mode='incremental'):
+    """
+    Bring stored history for a symbol up to date, downloading only the missing bars when possible.
+    Returns the same result dict as ingest_stock plus the sync `mode` that was used.
+    """
+    plan = plan_sync(company_symbol, months=months, market=market, mode=mode)
+    if plan['mode'] == 'incremental':
+        print(f"[SYNC] Incremental fetch for {plan['symbol']} from {plan['start']}.")
+    df = fetch_for_plan(plan)
+    return store_for_plan(plan, df)
 
 # --- Get Stock Statistics ---
+@metrics.timed(metrics.DB_READ)
+def get_stored_ohlcv(company_symbol, start_date=None, end_date=None):
+    """Column-oriented read of stored bars (oldest first) as an OHLCV bundle, or None if there are none."""
+    try:
+        query = db.session.query(
+            StockData.date, StockData.open_price, StockData.high_price,
+            StockData.low_price, StockData.close_price, StockData.volume
+        ).filter(StockData.company_symbol == company_symbol)
+
+        if start_date:
+            query = query.filter(StockData.date >= start_date)
+        if end_date:
+            query = query.filter(StockData.date <= end_date)
+
+        return stats_engine.ohlcv_from_rows(query.order_by(StockData.date.asc()).all())
+    except Exception as e:
+        print(f"[DB READ ERROR] {company_symbol}: {e}")
+        return None
+
+def _load_statistics_ohlcv(company_symbol, symbol, days, market):
+    """Bars for the last `days` calendar days from the DB, falling back to live yfinance history."""
+    end_date = datetime.now().date()
+    ohlcv = get_stored_ohlcv(symbol, start_date=end_date - timedelta(days=days), end_date=end_date)
+    if ohlcv is not None:
+        return ohlcv, end_date
+
+    # If no recent records in DB, fetch live historical data from yfinance for the period
+    print(f"[NO DB DATA FOR STATS] Fetching live historical data for {symbol} for {days} days from YFinance.")
+    ohlcv = stats_engine.ohlcv_from_frame(
+        get_historical_data(company_symbol, days=days, period_type='days', market=market)
+    )
+    if ohlcv is None:
+        print(f"[NO DATA FOR STATS] No historical data found for {symbol} from DB or YFinance for last {days} days.")
+    return ohlcv, end_date
+
+# --- Materialized Statistics ---
+STANDARD_STAT_WINDOWS = (1, 7, 30, 90, 180, 365) # Windows kept precomputed in the stock_statistics table
+
+def refresh_materialized_statistics(symbol, end_date=None, changed_through=None):
+    """
+    Bring the standard windows for a symbol up to date and persist them. Called from the ingest/sync
+    path after each write to StockData. `changed_through` is the newest bar date that was written:
+    windows already current for `end_date` that start after it hold none of the written bars and are
+    kept. Without it (replace, first load) every window is recomputed.
+    Returns {days: stats} for the recomputed windows.
+    """
+    end_date = end_date or datetime.now().date()
+    try:
+        rows = {r.window_days: r for r in StockStatistics.query.filter_by(company_symbol=symbol).all()}
+        windows = [
+            w for w in STANDARD_STAT_WINDOWS
+            if w not in rows or rows[w].as_of != end_date or changed_through is None
+            or changed_through >= end_date - timedelta(days=w)
+        ]
+        if not windows:
+            return {}
+
+        # Windows are sorted, so the longest affected one bounds the read
+        ohlcv = get_stored_ohlcv(symbol, start_date=end_date - timedelta(days=windows[-1]), end_date=end_date)
+        with metrics.phase(metrics.STATS):
+            computed = stats_engine.compute_window_statistics(ohlcv, windows, end_date)
+        data_through = ohlcv['date'][-1].item() if ohlcv is not None else None
+
+        for window, stats in computed.items():
+            row = rows.get(window)
+            if row is None:
+                row = StockStatistics(company_symbol=symbol, window_days=window)
+                db.session.add(row)
+            row.as_of = end_date
+            row.data_through = data_through
+            row.stats = stats
+        db.session.commit()
+        return computed
+    except IntegrityError:
+        # A concurrent refresh created the rows first; its values are just as current
+        db.session.rollback()
+        return None
+    except Exception as e:
+        db.session.rollback()
+        print(f"[STATS REFRESH ERROR] {symbol}: {e}")
+        return None
+
+@metrics.timed(metrics.DB_READ)
+def get_materialized_statistics(symbol, days):
+    """
+    O(1) read-only lookup of a precomputed standard window. Returns (found, stats). found is False when
+    the row is missing or from an earlier day (trailing windows move with the calendar), and stats is
+    None when no stored bars fall inside the window; either way the caller computes from stored bars.
+    """
+    row = StockStatistics.query.filter_by(company_symbol=symbol, window_days=days).first()
+    if row is None or row.as_of != datetime.now().date():
+        return False, None
+    return True, row.stats
+
 def get_stock_statistics(company_symbol, days=1, market='US'):
     try:
         symbol = format_symbol(company_symbol, market)
-        
-        records_to_process = []
-        source_tag = "N/A"
+        if days in STANDARD_STAT_WINDOWS:
+            found, stats = get_materialized_statistics(symbol, days)
+            if found and stats is not None:
+                return stats
 
-        # 1. Try to get data from DB first for the specified 'days'
-        end_date_for_db_query = datetime.now().date()
-        start_date_for_db_query = end_date_for_db_query - timedelta(days=days)
-        
-        # get_stored_stock_data returns records sorted by date DESCENDING.
-        # We need them chronological for daily_changes calculation.
-        db_records = get_stored_stock_data(company_symbol=symbol, start_date=start_date_for_db_query, end_date=end_date_for_db_query)
-        db_records_chronological = sorted(db_records, key=lambda r: r.date) if db_records else []
-
-        if db_records_chronological:
-            records_to_process = db_records_chronological
-            source_tag = "DB"
-        else:
-            # 2. If no recent records in DB, fetch live historical data from yfinance for the period
-            print(f"[NO DB DATA FOR STATS] Fetching live historical data for {symbol} for {days} days from YFinance.")
-            
-            yfinance_df = get_historical_data(company_symbol, days=days, period_type='days', market=market)
-            
-            if yfinance_df is not None and not yfinance_df.empty:
-                # Convert DataFrame rows to a list of dicts that our stat calculation can use
-                for index, row in yfinance_df.iterrows():
-                    records_to_process.append({
-                        'date': index.date(), # Convert timestamp to date object
-                        'open_price': row['Open'],
-                        'close_price': row['Close'],
-                        'high_price': row['High'],
-                        'low_price': row['Low'],
-                        'volume': row['Volume']
-                    })
-                # Ensure chronological order for yfinance data if not already (DataFrame index usually is)
-                records_to_process = sorted(records_to_process, key=lambda r: r['date'])
-                source_tag = "YFINANCE_LIVE"
-            else:
-                print(f"[NO DATA FOR STATS] No historical data found for {symbol} from DB or YFinance for last {days} days.")
-                return None # Still no data, return None
-
-        if not records_to_process:
-            return None # Safeguard if processing leads to empty list
-
-        # Ensure that data access is compatible with both StockData objects and dictionaries
-        prices = []
-        opening_prices = []
-        volumes = []
-        high_prices = []
-        low_prices = []
-
-        for r in records_to_process:
-            if isinstance(r, StockData):
-                prices.append(r.close_price)
-                opening_prices.append(r.open_price)
-                volumes.append(r.volume)
-                high_prices.append(r.high_price)
-                low_prices.append(r.low_price)
-            else: # Must be a dictionary from yfinance
-                prices.append(r['close_price'])
-                opening_prices.append(r['open_price'])
-                volumes.append(r['volume'])
-                high_prices.append(r['high_price'])
-                low_prices.append(r['low_price'])
-
-        # Get latest day's specific values for current_price and opening_price
-        latest_record = records_to_process[-1] # Last element is the most recent due to chronological sort
-        
-        if isinstance(latest_record, StockData):
-            current_price = latest_record.close_price
-            opening_price = latest_record.open_price
-        else: # Must be a dictionary from yfinance
-            current_price = latest_record.get('close_price')
-            opening_price = latest_record.get('open_price')
-
-
-        # Calculate daily changes based on daily close price
-        daily_changes = []
-        for i in range(1, len(prices)):
-            if prices[i-1] != 0:
-                daily_change = (prices[i] - prices[i-1]) / prices[i-1] * 100
-                daily_changes.append(daily_change)
-            else:
-                daily_changes.append(0)
+        ohlcv, _ = _load_statistics_ohlcv(company_symbol, symbol, days, market)
+        if ohlcv is None:
+            return None
 
-        # Ensure that prices list is not empty before attempting max/min
-        highest_price_period = max(high_prices) if high_prices else None
-        lowest_price_period = min(low_prices) if low_prices else None
+        with metrics.phase(metrics.STATS):
+            return stats_engine.compute_statistics(ohlcv)
+    except Exception as e:
+        print(f"[STATS ERROR] {company_symbol}: {e}")
+        return None
 
-        stats = {
-            'period_days': len(records_to_process), # Actual number of days for which stats are calculated
-            'current_price': current_price,
-            'opening_price': opening_price,
-            'price_stats': {
-                'open': opening_price,
-                'current': current_price,
-                'highest': highest_price_period,
-                'lowest': lowest_price_period,
-                'change_value': round(current_price - opening_price, 2) if current_price is not None and opening_price is not None else 0,
-                'change_percent': round(((current_price - opening_price) / opening_price) * 100, 2) if current_price is not None and opening_price is not None and opening_price != 0 else 0
-            } if current_price is not None else {}, # Ensure this dict is only created if current_price exists
-            'volume_stats': {
-                'average': int(sum(volumes) / len(volumes)) if volumes else 0,
-                'highest': max(volumes) if volumes else 0,
-                'total': sum(volumes) if volumes else 0
-            },
-            'performance_stats': {
-                'positive_days': sum(1 for x in daily_changes if x > 0),
-                'negative_days': sum(1 for x in daily_changes if x < 0),
-                'positive_ratio': round(sum(1 for x in daily_changes if x > 0) / len(daily_changes) * 100, 1) if daily_changes else 0,
-                'avg_daily_change': round(sum(daily_changes) / len(daily_changes), 2) if daily_changes else 0
-            }
-        }
-        return stats
+def get_stock_statistics_windows(company_symbol, windows=(1, 7, 30, 365), market='US'):
+    """Statistics for several trailing windows from a single read of the longest one. Returns {days: stats}."""
+    try:
+        symbol = format_symbol(company_symbol, market)
+        windows = sorted(set(int(w) for w in windows))
+
+        if all(w in STANDARD_STAT_WINDOWS for w in windows):
+            materialized = [get_materialized_statistics(symbol, w) for w in windows]
+            if all(found and stats is not None for found, stats in materialized):
+                return {w: stats for w, (_, stats) in zip(windows, materialized)}
+
+        ohlcv, end_date = _load_statistics_ohlcv(company_symbol, symbol, windows[-1], market)
+        with metrics.phase(metrics.STATS):
+            return stats_engine.compute_window_statistics(ohlcv, windows, end_date)
     except Exception as e:
         print(f"[STATS ERROR] {company_symbol}: {e}")
         return None
 
 # --- Get Company Info (basic) ---
+# Static profile fields (sector, website, ...) change rarely; price fields go stale within seconds.
+COMPANY_PROFILE_TTL = int(os.environ.get('COMPANY_PROFILE_TTL', 6 * 60 * 60))
+QUOTE_TTL = int(os.environ.get('QUOTE_TTL', 30))
+_profile_cache = TTLCache('company_profile', maxsize=2048, ttl=COMPANY_PROFILE_TTL)
+_quote_cache = TTLCache('quote', maxsize=2048, ttl=QUOTE_TTL)
+
+@metrics.timed(metrics.UPSTREAM)
+def _load_company_profile(symbol):
+    """Slow `info` lookup, cached for COMPANY_PROFILE_TTL."""
+    return dict(get_provider().get_info(symbol) or {})
+
+def get_company_profile(symbol):
+    return _profile_cache.get_or_load(symbol, lambda: _load_company_profile(symbol))
+
+@metrics.timed(metrics.UPSTREAM)
+def _load_quote(symbol):
+    """Price fields from fast_info, falling back to recent history; cached for QUOTE_TTL."""
+    provider = get_provider()
+    fast_info = provider.get_fast_info(symbol) or {}
+
+    # Current price and day's change from fast_info if available, otherwise fetch explicitly
+    current_price = fast_info.get('lastPrice')
+    previous_close = fast_info.get('previousClose')
+
+    if current_price is None or previous_close is None:
+        # If fast_info doesn't have it, try fetching a small history
+        hist = provider.get_history(symbol, period="1d", interval="1m") # Fetch 1-minute interval for current day
+        if hist is not None and not hist.empty:
+            current_price = hist['Close'].iloc[-1]
+            # Try to get previous close from 2-day history
+            hist_2d = provider.get_history(symbol, period="2d", interval="1d")
+            if hist_2d is not None and len(hist_2d) > 1:
+                previous_close = hist_2d['Close'].iloc[-2] # Second to last closing price
+        else:
+            # As a last resort, use info.currentPrice or info.previousClose
+            info = get_company_profile(symbol)
+            current_price = info.get('currentPrice')
+            previous_close = info.get('previousClose')
+
+    return {
+        'current_price': float(current_price) if current_price is not None else None,
+        'previous_close': float(previous_close) if previous_close is not None else None,
+        'currency': fast_info.get('currency'),
+        'exchange': fast_info.get('exchange'),
+        'shortName': fast_info.get('shortName'),
+        'longName': fast_info.get('longName'),
+        'market_cap': fast_info.get('marketCap'),
+    }
+
+def get_quote(symbol):
+    return _quote_cache.get_or_load(symbol, lambda: _load_quote(symbol))
+
 def get_company_info(company_symbol, market='US'):
     try:
         symbol = format_symbol(company_symbol, market)
-        ticker = yf.Ticker(symbol)
 
-        # Use info from ticker.fast_info for common fields
-        fast_info = ticker.fast_info or {}
-        
-        # Fallback to info for more details if fast_info is insufficient
-        info = ticker.info or {} 
-
-        # Current price and day's change from fast_info if available, otherwise fetch explicitly
-        current_price = fast_info.get('lastPrice')
-        previous_close = fast_info.get('previousClose')
-
-        if current_price is None or previous_close is None:
-            # If fast_info doesn't have it, try fetching a small history
-            hist = ticker.history(period="1d", interval="1m") # Fetch 1-minute interval for current day
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-                # Try to get previous close from 2-day history
-                hist_2d = ticker.history(period="2d", interval="1d")
-                if len(hist_2d) > 1:
-                    previous_close = hist_2d['Close'].iloc[-2] # Second to last closing price
-            else:
-                # As a last resort, use info.currentPrice or info.previousClose
-                current_price = info.get('currentPrice')
-                previous_close = info.get('previousClose')
-        
+        # Quote (short TTL) and profile (long TTL) are cached separately; concurrent misses share one upstream call
+        quote = get_quote(symbol)
+        info = get_company_profile(symbol)
+
+        current_price = quote['current_price']
+        previous_close = quote['previous_close']
+
         day_change = None
         day_change_percent = None
         if current_price is not None and previous_close is not None and previous_close != 0:
@@ -272,15 +527,15 @@ def get_company_info(company_symbol, market='US'):
 
         return {
             'symbol': symbol,
-            'currency': fast_info.get('currency', info.get('currency', 'USD')),
-            'exchange': fast_info.get('exchange', info.get('exchange', 'N/A')),
-            'shortName': fast_info.get('shortName', info.get('shortName', company_symbol)),
-            'longName': info.get('longName', fast_info.get('longName', company_symbol)),
+            'currency': quote['currency'] or info.get('currency', 'USD'),
+            'exchange': quote['exchange'] or info.get('exchange', 'N/A'),
+            'shortName': quote['shortName'] or info.get('shortName', company_symbol),
+            'longName': info.get('longName', quote['longName'] or company_symbol),
             'current_price': current_price,
             'previous_close': previous_close,
             'day_change': day_change,
             'day_change_percent': day_change_percent,
-            'market_cap': fast_info.get('marketCap', info.get('marketCap')),
+            'market_cap': quote['market_cap'] if quote['market_cap'] is not None else info.get('marketCap'),
             'sector': info.get('sector'),
             'industry': info.get('industry'),
             'website': info.get('website'),
@@ -288,4 +543,35 @@ def get_company_info(company_symbol, market='US'):
         }
     except Exception as e:
         print(f"[GET COMPANY INFO ERROR] {company_symbol}: {e}")
-        return None
\ No newline at end of file
+        return None
+
+# --- Batch Company Info (watchlists) ---
+QUOTE_BATCH_MAX_WORKERS = int(os.environ.get('QUOTE_BATCH_MAX_WORKERS', 8))
+QUOTE_BATCH_MAX_SYMBOLS = 100
+
+def get_company_info_batch(symbols, market='US'):
+    """
+    Company info for many symbols at once. Upstream lookups run concurrently and go through the
+    same caches as get_company_info, so duplicates and concurrent requests share work.
+    Returns one {'symbol', 'success', 'data' | 'message'} entry per distinct symbol, in input order.
+    """
+    formatted = []
+    for raw in symbols:
+        if raw and str(raw).strip():
+            symbol = format_symbol(str(raw).strip(), market)
+            if symbol not in formatted:
+                formatted.append(symbol)
+    formatted = formatted[:QUOTE_BATCH_MAX_SYMBOLS]
+    if not formatted:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(QUOTE_BATCH_MAX_WORKERS, len(formatted))) as pool:
+        infos = list(pool.map(get_company_info, formatted))
+
+    results = []
+    for symbol, info in zip(formatted, infos):
+        if info:
+            results.append({'symbol': symbol, 'success': True, 'data': info})
+        else:
+            results.append({'symbol': symbol, 'success': False, 'message': "Could not retrieve company info."})
+    return results
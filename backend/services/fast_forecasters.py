@@ -0,0 +1,135 @@
+import numpy as np
+
+# Cheap close-price forecasters for interactive use. Each one fits in milliseconds on the same
+# processed frame the LSTM trains on (close, SMA_10, EMA_10, Daily_Return, oldest first), is scored
+# one step ahead on the same trailing 20% hold-out, and forecasts `steps` closes recursively.
+FAST_TRAIN_SPLIT = 0.8
+
+RIDGE_LAGS = 10 # Daily returns fed to the autoregression
+RIDGE_ALPHA = 1.0 # L2 penalty on standardized features
+
+ETS_ALPHAS = np.linspace(0.05, 0.95, 19) # Level smoothing grid
+ETS_BETAS = np.array([0.0, 0.01, 0.02, 0.05, 0.1, 0.2]) # Trend smoothing grid
+ETS_DAMPING = 0.98 # Damped trend, so long horizons do not extrapolate a straight line
+
+EMA_SPAN = 10
+SMA_WINDOW = 10
+
+def price_metrics(actual, predicted, scale):
+    """Same keys as prediction_service.evaluate_model; test_loss is the MSE on the [0, 1] scaled close."""
+    errors = actual - predicted
+    mse = float(np.mean(errors ** 2))
+    ss_tot = float(np.sum((actual - actual.mean()) ** 2))
+    return {
+        'test_loss': float(mse / scale ** 2) if scale else 0.0,
+        'rmse': float(np.sqrt(mse)),
+        'mae': float(np.mean(np.abs(errors))),
+        'r2': 1 - float(np.sum(errors ** 2)) / ss_tot if ss_tot else 0.0,
+        'mape': float(np.mean(np.abs(errors / (actual + 1e-10))) * 100),
+    }
+
+# --- Naive drift ---
+def forecast_drift(df, steps, split_idx):
+    """Last close plus the average daily change over the training span."""
+    closes = df['close'].to_numpy(dtype=float)
+
+    def slope(series):
+        return (series[-1] - series[0]) / (len(series) - 1)
+
+    hold_out = closes[split_idx - 1:-1] + slope(closes[:split_idx])
+    forecast = closes[-1] + slope(closes) * np.arange(1, steps + 1)
+    return forecast, hold_out
+
+# --- Exponential smoothing (damped Holt) ---
+def _holt_filter(closes, alphas, betas):
+    """
+    Run damped Holt smoothing for every (alpha, beta) pair at once.
+    Returns one-step-ahead fitted values (len(closes) - 1, n_params) and the final level/trend per pair.
+    """
+    level = np.full(alphas.shape, closes[0])
+    trend = np.full(alphas.shape, closes[1] - closes[0])
+    fitted = np.empty((len(closes) - 1,) + alphas.shape)
+    for t in range(1, len(closes)):
+        fitted[t - 1] = level + ETS_DAMPING * trend
+        new_level = alphas * closes[t] + (1 - alphas) * (level + ETS_DAMPING * trend)
+        trend = betas * (new_level - level) + (1 - betas) * ETS_DAMPING * trend
+        level = new_level
+    return fitted, level, trend
+
+def forecast_ets(df, steps, split_idx):
+    """Damped Holt linear trend with (alpha, beta) picked by one-step SSE on the training span."""
+    closes = df['close'].to_numpy(dtype=float)
+    alphas, betas = (grid.ravel() for grid in np.meshgrid(ETS_ALPHAS, ETS_BETAS))
+
+    fitted, level, trend = _holt_filter(closes, alphas, betas)
+    train_errors = fitted[:split_idx - 1] - closes[1:split_idx, None]
+    best = int(np.argmin(np.sum(train_errors ** 2, axis=0)))
+
+    hold_out = fitted[split_idx - 1:, best] # The filter only ever sees bars before the one it predicts
+    damping = np.cumsum(ETS_DAMPING ** np.arange(1, steps + 1))
+    forecast = level[best] + damping * trend[best]
+    return forecast, hold_out
+
+# --- Ridge autoregression on the engineered features ---
+def _ridge_features(df):
+    """Row t: the last RIDGE_LAGS daily returns and close's distance from SMA_10 / EMA_10; target is return t+1."""
+    closes = df['close'].to_numpy(dtype=float)
+    returns = df['Daily_Return'].to_numpy(dtype=float)
+    lags = np.lib.stride_tricks.sliding_window_view(returns, RIDGE_LAGS)[:, ::-1] # Newest lag first
+    tail = slice(RIDGE_LAGS - 1, None)
+    return np.column_stack([
+        lags,
+        closes[tail] / df['SMA_10'].to_numpy(dtype=float)[tail] - 1,
+        closes[tail] / df['EMA_10'].to_numpy(dtype=float)[tail] - 1,
+    ])
+
+def _fit_ridge(X, y):
+    mean, std = X.mean(axis=0), X.std(axis=0)
+    std[std == 0] = 1
+    Z = (X - mean) / std
+    y_mean = y.mean()
+    weights = np.linalg.solve(Z.T @ Z + RIDGE_ALPHA * np.eye(Z.shape[1]), Z.T @ (y - y_mean))
+    return lambda rows: ((rows - mean) / std) @ weights + y_mean
+
+def forecast_ridge(df, steps, split_idx):
+    """Closed-form ridge regression of next-day return, rolled forward one predicted close at a time."""
+    closes = df['close'].to_numpy(dtype=float)
+    features = _ridge_features(df) # features[i] describes bar i + RIDGE_LAGS - 1
+    first = RIDGE_LAGS - 1
+    X, y = features[:-1], df['Daily_Return'].to_numpy(dtype=float)[first + 1:]
+
+    # Hold-out: fit on targets inside the training span, predict each later bar from the one before it
+    n_train = split_idx - first - 1
+    predict = _fit_ridge(X[:n_train], y[:n_train])
+    hold_out = closes[split_idx - 1:-1] * (1 + predict(X[n_train:]))
+
+    predict = _fit_ridge(X, y)
+    history = list(closes[-SMA_WINDOW:])
+    returns = list(df['Daily_Return'].to_numpy(dtype=float)[-RIDGE_LAGS:])
+    ema = float(df['EMA_10'].iloc[-1])
+    ema_alpha = 2 / (EMA_SPAN + 1) # Matches ewm(span=10, adjust=False)
+
+    forecast = np.empty(steps)
+    for i in range(steps):
+        last = history[-1]
+        row = np.array(returns[::-1] + [last / np.mean(history[-SMA_WINDOW:]) - 1, last / ema - 1])
+        next_close = last * (1 + float(predict(row[None, :])[0]))
+        forecast[i] = next_close
+        history.append(next_close)
+        returns = returns[1:] + [next_close / last - 1]
+        ema = ema_alpha * next_close + (1 - ema_alpha) * ema
+    return forecast, hold_out
+
+FORECASTERS = {
+    'ridge': forecast_ridge,
+    'ets': forecast_ets,
+    'drift': forecast_drift,
+}
+
+def forecast(model_type, df_processed, steps):
+    """Fit `model_type` on a processed frame. Returns (predicted closes for `steps` bars, hold-out metrics)."""
+    closes = df_processed['close'].to_numpy(dtype=float)
+    split_idx = int(len(closes) * FAST_TRAIN_SPLIT)
+    predictions, hold_out = FORECASTERS[model_type](df_processed, steps, split_idx)
+    metrics = price_metrics(closes[split_idx:], hold_out, closes.max() - closes.min())
+    return predictions, metrics
@@ -0,0 +1,263 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from services import chart_data, metrics, response_cache, stats_engine
+from services.cache import TTLCache
+
+# Technical indicators computed column-wise over a symbol's whole stored history and kept per symbol
+# (a "feature set"). When the data watermark moves, only the bars from the last cached date on are loaded
+# and the indicators are extended over them: rolling windows re-read their last `period - 1` bars and the
+# exponential ones continue from their last cached value. The chart endpoint and the prediction features
+# both read from here, so each column is computed once per new bar.
+#
+# Spec names are '<kind>_<period>' (e.g. 'sma_50', 'rsi_14'), '<kind>' for the default period, or
+# 'macd' / 'return' which take none. Output columns starting with '_' are internal smoothing state.
+INDICATOR_CACHE_SIZE = int(os.environ.get('INDICATOR_CACHE_SIZE', 64)) # Symbols kept in memory (LRU)
+INDICATOR_CACHE_TTL = 24 * 60 * 60
+MAX_PERIOD = 500
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_STDDEVS = 2
+DEFAULT_INDICATORS = ('sma_20', 'sma_50', 'ema_12', 'ema_26', 'rsi_14', 'macd', 'bb_20', 'atr_14', 'vwap_20')
+
+_features = TTLCache('indicator_features', maxsize=INDICATOR_CACHE_SIZE, ttl=INDICATOR_CACHE_TTL)
+
+# --- Indicators ---
+# Each takes the full OHLCV bundle, the first bar to compute, the cached columns for the bars before it
+# (None on a full computation) and the period, and returns {column: values for bars start..n-1}.
+def _seed(prev, name, start):
+    """Cached value of `name` at bar start - 1, the point an exponential indicator continues from."""
+    if prev is None or start == 0:
+        return None
+    return prev[name][start - 1]
+
+def _ewm(tail, alpha, seed):
+    """adjust=False exponential smoothing of `tail`, continuing from `seed` when given."""
+    if seed is None:
+        return pd.Series(tail).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    # Prepending the previous smoothed value reproduces the recursion exactly from there on
+    return pd.Series(np.concatenate(([seed], tail))).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+def _rolling(values, start, period):
+    """Rolling window over values[start:], reading the period - 1 bars before start for context."""
+    lo = max(0, start - period + 1)
+    return pd.Series(values[lo:]).rolling(period), start - lo
+
+def _sma(ohlcv, start, prev, period):
+    window, skip = _rolling(ohlcv['close'], start, period)
+    return {f'sma_{period}': window.mean().to_numpy()[skip:]}
+
+def _ema(ohlcv, start, prev, period):
+    name = f'ema_{period}'
+    return {name: _ewm(ohlcv['close'][start:], 2 / (period + 1), _seed(prev, name, start))}
+
+def _previous_close(ohlcv, start):
+    """close[i - 1] for bars start..n-1 (NaN for the first bar)."""
+    closes = ohlcv['close']
+    return np.concatenate(([np.nan], closes[:-1]))[start:]
+
+def _return(ohlcv, start, prev, period):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {'return': ohlcv['close'][start:] / _previous_close(ohlcv, start) - 1}
+
+def _rsi(ohlcv, start, prev, period):
+    """Wilder's RSI: gains and losses smoothed with alpha 1/period; undefined for the first `period` bars."""
+    delta = ohlcv['close'][start:] - _previous_close(ohlcv, start)
+    gain_name, loss_name = f'_rsi_{period}_gain', f'_rsi_{period}_loss'
+    gain = _ewm(np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None)), 1 / period, _seed(prev, gain_name, start))
+    loss = _ewm(np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None)), 1 / period, _seed(prev, loss_name, start))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(loss == 0, np.where(gain == 0, 50.0, 100.0), 100 - 100 / (1 + gain / loss))
+    rsi[np.arange(start, start + len(rsi)) < period] = np.nan
+    return {f'rsi_{period}': rsi, gain_name: gain, loss_name: loss}
+
+def _macd(ohlcv, start, prev, period):
+    closes = ohlcv['close'][start:]
+    fast = _ewm(closes, 2 / (MACD_FAST + 1), _seed(prev, '_macd_fast', start))
+    slow = _ewm(closes, 2 / (MACD_SLOW + 1), _seed(prev, '_macd_slow', start))
+    macd = fast - slow
+    signal = _ewm(macd, 2 / (MACD_SIGNAL + 1), _seed(prev, 'macd_signal', start))
+    return {'macd': macd, 'macd_signal': signal, 'macd_hist': macd - signal, '_macd_fast': fast, '_macd_slow': slow}
+
+def _bollinger(ohlcv, start, prev, period):
+    window, skip = _rolling(ohlcv['close'], start, period)
+    middle = window.mean().to_numpy()[skip:]
+    width = BOLLINGER_STDDEVS * window.std(ddof=0).to_numpy()[skip:]
+    return {f'bb_upper_{period}': middle + width, f'bb_middle_{period}': middle, f'bb_lower_{period}': middle - width}
+
+def _atr(ohlcv, start, prev, period):
+    """Wilder's average true range; undefined for the first period - 1 bars."""
+    high, low = ohlcv['high'][start:], ohlcv['low'][start:]
+    prev_close = _previous_close(ohlcv, start)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close))) # fmax: the first bar has no previous close
+    state = f'_atr_{period}'
+    smoothed = _ewm(true_range, 1 / period, _seed(prev, state, start))
+    atr = smoothed.copy()
+    atr[np.arange(start, start + len(atr)) < period - 1] = np.nan
+    return {f'atr_{period}': atr, state: smoothed}
+
+def _vwap(ohlcv, start, prev, period):
+    """Rolling volume-weighted average of the typical price (high + low + close) / 3 over `period` bars."""
+    typical = (ohlcv['high'] + ohlcv['low'] + ohlcv['close']) / 3
+    traded, skip = _rolling(typical * ohlcv['volume'], start, period)
+    volume, _ = _rolling(ohlcv['volume'], start, period)
+    volume_sum = volume.sum().to_numpy()[skip:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {f'vwap_{period}': np.where(volume_sum > 0, traded.sum().to_numpy()[skip:] / volume_sum, np.nan)}
+
+# kind -> (function, default period or None when it takes none, output columns with {p} for the period)
+INDICATORS = {
+    'sma': (_sma, 20, ('sma_{p}',)),
+    'ema': (_ema, 20, ('ema_{p}',)),
+    'rsi': (_rsi, 14, ('rsi_{p}',)),
+    'macd': (_macd, None, ('macd', 'macd_signal', 'macd_hist')),
+    'bb': (_bollinger, 20, ('bb_upper_{p}', 'bb_middle_{p}', 'bb_lower_{p}')),
+    'atr': (_atr, 14, ('atr_{p}',)),
+    'vwap': (_vwap, 20, ('vwap_{p}',)),
+    'return': (_return, None, ('return',)),
+}
+
+def _split_spec(spec):
+    kind, _, period = spec.partition('_')
+    return kind, int(period) if period else INDICATORS[kind][1]
+
+def parse_indicators(text):
+    """Canonical spec names from a comma-separated list (None/empty: DEFAULT_INDICATORS). Returns (specs, error)."""
+    if not text:
+        return list(DEFAULT_INDICATORS), None
+    specs = []
+    for raw in text.split(','):
+        raw = raw.strip().lower()
+        if not raw:
+            continue
+        kind, _, period = raw.partition('_')
+        if kind not in INDICATORS:
+            return None, f"Unknown indicator '{raw}'. Choose from: {', '.join(INDICATORS)}."
+        default = INDICATORS[kind][1]
+        if default is None:
+            if period:
+                return None, f"Indicator '{kind}' takes no period."
+            spec = kind
+        else:
+            if period and (not period.isdigit() or not 1 <= int(period) <= MAX_PERIOD):
+                return None, f"Indicator period must be a whole number from 1 to {MAX_PERIOD} (got '{raw}')."
+            spec = f"{kind}_{int(period) if period else default}"
+        if spec not in specs:
+            specs.append(spec)
+    return specs, None
+
+def compute(ohlcv, specs, start=0, prev=None):
+    """All columns (internal ones included) of `specs` for bars start..n-1 of an OHLCV bundle."""
+    columns = {}
+    with metrics.phase(metrics.STATS):
+        for spec in specs:
+            kind, period = _split_spec(spec)
+            columns.update(INDICATORS[kind][0](ohlcv, start, prev, period))
+    return columns
+
+def output_columns(specs):
+    """Column names `specs` produce, in order, without the internal state columns."""
+    names = []
+    for spec in specs:
+        kind, period = _split_spec(spec)
+        names.extend(template.format(p=period) for template in INDICATORS[kind][2])
+    return names
+
+# --- Feature store ---
+class FeatureSet:
+    """A symbol's stored bars with every indicator column requested so far, aligned bar for bar."""
+
+    def __init__(self, symbol, ohlcv, watermark):
+        self.symbol = symbol
+        self.ohlcv = ohlcv
+        self.watermark = watermark
+        self.specs = []
+        self.columns = {}
+        self._lock = threading.Lock()
+
+    def _rebuild(self, watermark):
+        self.ohlcv = chart_data.load_chart_ohlcv(self.symbol)
+        self.columns = compute(self.ohlcv, self.specs) if self.ohlcv is not None else {}
+        self.watermark = watermark
+
+    def _extend(self, watermark):
+        """Append bars stored since the last cached date (that bar is reloaded too, it may have been revised)."""
+        n = chart_data.bar_count(self.ohlcv)
+        last_date = self.ohlcv['date'][-1]
+        new = chart_data.load_chart_ohlcv(self.symbol, since=last_date.astype(object))
+        if new is None or new['date'][0] != last_date or n - 1 + chart_data.bar_count(new) != watermark['count']:
+            # Older bars were added or removed as well, so the cached prefix no longer lines up
+            print(f"[INDICATORS] {self.symbol} history changed before {last_date}, recomputing.")
+            self._rebuild(watermark)
+            return
+
+        start = n - 1
+        ohlcv = {key: np.concatenate((values[:start], new[key])) for key, values in self.ohlcv.items()}
+        tail = compute(ohlcv, self.specs, start=start, prev=self.columns)
+        self.columns = {name: np.concatenate((self.columns[name][:start], values)) for name, values in tail.items()}
+        self.ohlcv = ohlcv
+        self.watermark = watermark
+        print(f"[INDICATORS] Extended {self.symbol} by {chart_data.bar_count(new) - 1} bar(s).")
+
+    def snapshot(self, specs, watermark, limit=None):
+        """(ohlcv, columns) for the newest `limit` bars, bringing the set up to `watermark` and `specs` first."""
+        with self._lock:
+            if watermark != self.watermark:
+                if self.ohlcv is None:
+                    self._rebuild(watermark)
+                else:
+                    self._extend(watermark)
+            missing = [spec for spec in specs if spec not in self.specs]
+            if missing and self.ohlcv is not None:
+                self.columns.update(compute(self.ohlcv, missing))
+            self.specs.extend(missing)
+            ohlcv, columns = self.ohlcv, self.columns
+
+        if ohlcv is None:
+            return None, None
+        names = output_columns(specs)
+        lo = max(0, chart_data.bar_count(ohlcv) - limit) if limit else 0
+        return ({key: values[lo:] for key, values in ohlcv.items()},
+                {name: columns[name][lo:] for name in names})
+
+def get_indicators(symbol, specs, limit=None):
+    """
+    (ohlcv, {column: values}) for the newest `limit` stored bars of `symbol`, indicators computed over
+    the whole stored history so they are warmed up from the first returned bar. (None, None) without data.
+    """
+    watermark = response_cache.get_data_watermark(symbol)
+    if watermark is None:
+        return None, None
+    feature_set = _features.get_or_load(symbol, lambda: FeatureSet(symbol, None, None))
+    return feature_set.snapshot(specs, watermark, limit)
+
+def feature_frame(symbol, specs, limit=None):
+    """get_indicators() as a DataFrame: date, open, high, low, close, volume and the indicator columns."""
+    ohlcv, columns = get_indicators(symbol, specs, limit)
+    if ohlcv is None:
+        return None
+    df = pd.DataFrame({key: ohlcv[key] for key in ('date',) + stats_engine.OHLCV_COLUMNS})
+    df['date'] = pd.to_datetime(df['date'])
+    for name, values in columns.items():
+        df[name] = values
+    return df
+
+def invalidate(symbol):
+    _features.invalidate(symbol)
+
+# --- Serialization ---
+def _values(values, decimals=4):
+    """Rounded float list with undefined (warm-up) values as None."""
+    values = np.round(values, decimals)
+    if np.isnan(values).any():
+        return [None if np.isnan(v) else v for v in values.tolist()]
+    return values.tolist()
+
+def to_columnar(ohlcv, columns, date_format='iso'):
+    if date_format == 'epoch_day':
+        dates = ohlcv['date'].astype('int64').tolist()
+    else:
+        dates = np.datetime_as_string(ohlcv['date'], unit='D').tolist()
+    return {'dates': dates, **{name: _values(values) for name, values in columns.items()}}
@@ -0,0 +1,223 @@
+import json
+import os
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+# --- Provider Interface ---
+class MarketDataProvider(ABC):
+    """
+    Source of OHLCV history and company metadata. History frames follow the yfinance layout:
+    a DatetimeIndex of trading days and Open/High/Low/Close/Volume columns.
+    """
+    name = 'base'
+
+    @abstractmethod
+    def get_history(self, symbol, period=None, start=None, interval='1d'):
+        """History for `period` ('5d', '18mo', ...) or from `start`, oldest first."""
+
+    def get_fast_info(self, symbol):
+        """Quote-level fields: lastPrice, previousClose, currency, exchange, marketCap, ..."""
+        return {}
+
+    def get_info(self, symbol):
+        """Static company profile: longName, sector, industry, website, beta, ..."""
+        return {}
+
+# --- yfinance (live) ---
+class YFinanceProvider(MarketDataProvider):
+    name = 'yfinance'
+
+    def get_history(self, symbol, period=None, start=None, interval='1d'):
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            return ticker.history(start=start, interval=interval)
+        return ticker.history(period=period or '1mo', interval=interval)
+
+    def get_fast_info(self, symbol):
+        return yf.Ticker(symbol).fast_info or {}
+
+    def get_info(self, symbol):
+        return yf.Ticker(symbol).info or {}
+
+# --- Local (offline replay / synthetic) ---
+SYNTHETIC_ORIGIN = '2015-01-01' # Synthetic series are anchored here so a given date always has the same bar
+
+def _period_start(period, end):
+    """Translate a yfinance period string ('5d', '18mo', '2y', 'max') into a start timestamp."""
+    period = period.lower()
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return pd.Timestamp(end.year, 1, 1)
+    if period.endswith('mo'):
+        return end - pd.DateOffset(months=int(period[:-2]))
+    if period.endswith('d'):
+        return end - pd.Timedelta(days=int(period[:-1]))
+    if period.endswith('wk'):
+        return end - pd.Timedelta(weeks=int(period[:-2]))
+    if period.endswith('y'):
+        return end - pd.DateOffset(years=int(period[:-1]))
+    raise ValueError(f"Unsupported period '{period}'")
+
+class LocalProvider(MarketDataProvider):
+    """
+    Network-free provider for load tests, benchmarks and CI.
+
+    History is read from `<data_dir>/<SYMBOL>.parquet` or `<SYMBOL>.csv` when present (a yfinance
+    history frame saved with its Date index), and company info from `<SYMBOL>.json`. Symbols
+    without fixtures get a deterministic geometric random walk seeded from the symbol name.
+    """
+    name = 'local'
+
+    def __init__(self, data_dir=None, seed=0, end_date=None):
+        self.data_dir = data_dir
+        self.seed = seed
+        self.end_date = pd.Timestamp(end_date).normalize() if end_date else None
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _end(self):
+        return self.end_date if self.end_date is not None else pd.Timestamp(datetime.now().date())
+
+    def _fixture_path(self, symbol, *extensions):
+        if not self.data_dir:
+            return None
+        for ext in extensions:
+            path = os.path.join(self.data_dir, f"{symbol}{ext}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _load_fixture(self, path):
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, index_col=0)
+        df.index = pd.to_datetime(df.index, utc=True).tz_localize(None).normalize()
+        df.index.name = 'Date'
+        return df.sort_index()
+
+    def _synthetic_frame(self, symbol):
+        # One random stream per series, so a bar never depends on how many days follow it
+        streams = np.random.SeedSequence([zlib.crc32(symbol.encode()), self.seed]).spawn(5)
+        base_rng, return_rng, open_rng, range_rng, volume_rng = (np.random.default_rng(s) for s in streams)
+        dates = pd.bdate_range(SYNTHETIC_ORIGIN, self._end(), name='Date')
+        n = len(dates)
+
+        close = base_rng.uniform(20, 500) * np.exp(np.cumsum(return_rng.normal(0.0003, 0.015, n)))
+        prev_close = np.concatenate(([close[0]], close[:-1]))
+        open_ = prev_close * (1 + open_rng.normal(0, 0.004, n))
+        high_low = np.abs(range_rng.normal(0, 0.006, (n, 2)))
+        high = np.maximum(open_, close) * (1 + high_low[:, 0])
+        low = np.minimum(open_, close) * (1 - high_low[:, 1])
+        volume = volume_rng.lognormal(15, 0.4, n).astype('int64')
+
+        return pd.DataFrame({
+            'Open': open_,
+            'High': high,
+            'Low': low,
+            'Close': close,
+            'Volume': volume,
+            'Dividends': 0.0,
+            'Stock Splits': 0.0,
+        }, index=dates)
+
+    def _frame(self, symbol):
+        with self._lock:
+            frame = self._frames.get(symbol)
+            if frame is None:
+                path = self._fixture_path(symbol, '.parquet', '.csv')
+                frame = self._load_fixture(path) if path else self._synthetic_frame(symbol)
+                self._frames[symbol] = frame
+            return frame
+
+    def get_history(self, symbol, period=None, start=None, interval='1d'):
+        frame = self._frame(symbol)
+        end = self._end()
+        frame = frame[frame.index <= end]
+
+        if interval != '1d':
+            # Intraday is not recorded; the latest daily bar stands in for "today so far"
+            return frame.iloc[-1:].copy()
+
+        lower = pd.Timestamp(start) if start is not None else _period_start(period or '1mo', end)
+        if lower is not None:
+            frame = frame[frame.index >= lower]
+        return frame.copy()
+
+    def get_fast_info(self, symbol):
+        closes = self._frame(symbol)['Close']
+        closes = closes[closes.index <= self._end()]
+        if closes.empty:
+            return {}
+        info = self.get_info(symbol)
+        return {
+            'lastPrice': float(closes.iloc[-1]),
+            'previousClose': float(closes.iloc[-2]) if len(closes) > 1 else None,
+            'currency': info.get('currency'),
+            'exchange': info.get('exchange'),
+            'marketCap': float(closes.iloc[-1]) * 1e9,
+        }
+
+    def get_info(self, symbol):
+        path = self._fixture_path(symbol, '.json')
+        if path:
+            with open(path) as fh:
+                return json.load(fh)
+        return {
+            'shortName': symbol,
+            'longName': f"{symbol} (synthetic)",
+            'currency': 'INR' if symbol.endswith('.NS') else 'USD',
+            'exchange': 'NSI' if symbol.endswith('.NS') else 'LOCAL',
+            'sector': 'Synthetic',
+            'industry': 'Random Walk',
+            'website': None,
+            'beta': 1.0,
+        }
+
+def record_fixtures(symbols, data_dir, period='5y'):
+    """Record live yfinance history and info into `data_dir` for later replay by LocalProvider."""
+    os.makedirs(data_dir, exist_ok=True)
+    live = YFinanceProvider()
+    for symbol in symbols:
+        history = live.get_history(symbol, period=period)
+        if history is None or history.empty:
+            print(f"[RECORD FIXTURES] No history for {symbol}, skipped.")
+            continue
+        history.to_csv(os.path.join(data_dir, f"{symbol}.csv"))
+        with open(os.path.join(data_dir, f"{symbol}.json"), 'w') as fh:
+            json.dump(live.get_info(symbol), fh, default=str)
+        print(f"[RECORD FIXTURES] Saved {len(history)} bars for {symbol}.")
+
+# --- Active Provider ---
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_provider():
+    """Provider selected by MARKET_DATA_PROVIDER ('yfinance' or 'local'); created on first use."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                name = os.environ.get('MARKET_DATA_PROVIDER', 'yfinance').lower()
+                if name == 'local':
+                    _provider = LocalProvider(
+                        data_dir=os.environ.get('MARKET_DATA_DIR'),
+                        seed=int(os.environ.get('MARKET_DATA_SEED', 0)),
+                        end_date=os.environ.get('MARKET_DATA_END_DATE')
+                    )
+                else:
+                    _provider = YFinanceProvider()
+    return _provider
+
+def set_provider(provider):
+    """Swap the active provider (benchmarks, capacity tests)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -0,0 +1,193 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from services import cache
+
+# In-process instrumentation: per-route latency histograms, named hot-path phase timings (also summed
+# per request for the structured request log and Server-Timing header) and cache hit/miss counters,
+# rendered in the Prometheus text format by render_prometheus().
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Phase names used across the services
+UPSTREAM = 'upstream' # Market data provider (yfinance) calls
+DB_READ = 'db_read'
+DB_WRITE = 'db_write'
+STATS = 'stats'
+TRAINING = 'training'
+INFERENCE = 'inference'
+SERIALIZATION = 'serialization'
+
+class Histogram:
+    """Cumulative-bucket latency histogram (seconds), thread-safe."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, seconds)] += 1
+            self.total += seconds
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+_routes = {} # (method, route, status) -> Histogram
+_phases = {} # phase -> Histogram
+_counters = {} # (name, labels tuple) -> value
+_lock = threading.Lock()
+_request = threading.local()
+_nesting = threading.local() # Per-thread stack of open phases
+
+def _histogram(registry, key):
+    histogram = registry.get(key)
+    if histogram is None:
+        with _lock:
+            histogram = registry.setdefault(key, Histogram())
+    return histogram
+
+# --- Recording ---
+def observe_phase(name, seconds):
+    _histogram(_phases, name).observe(seconds)
+    phases = getattr(_request, 'phases', None)
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+@contextmanager
+def phase(name):
+    """
+    Time a block as the named phase. Time spent in phases nested inside it (e.g. a DB read inside a
+    stats refresh) is recorded under their own names only, so the phases of a request add up to at
+    most its total instead of counting the same work twice.
+    """
+    stack = getattr(_nesting, 'stack', None)
+    if stack is None:
+        stack = _nesting.stack = []
+    stack.append(0.0) # Time spent in child phases
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        observe_phase(name, elapsed - children)
+
+def timed(name):
+    """Decorator form of phase()."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def increment(name, amount=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+# --- Flask integration ---
+def init_app(app, log_requests=True):
+    """Time every request, keep per-route histograms and log one JSON line per request."""
+    from flask import request
+
+    @app.before_request
+    def _start_timer():
+        _request.started = time.perf_counter()
+        _request.phases = {}
+
+    @app.after_request
+    def _record(response):
+        started = getattr(_request, 'started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        phases = _request.phases
+        _request.started, _request.phases = None, None
+
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        _histogram(_routes, (request.method, route, response.status_code)).observe(elapsed)
+
+        response.headers['Server-Timing'] = ', '.join(
+            [f"{name};dur={seconds * 1000:.1f}" for name, seconds in phases.items()] + [f"total;dur={elapsed * 1000:.1f}"]
+        )
+        if log_requests and route != '/metrics':
+            print('[REQUEST] ' + json.dumps({
+                'method': request.method,
+                'route': route,
+                'path': request.path,
+                'status': response.status_code,
+                'ms': round(elapsed * 1000, 2),
+                'phases_ms': {name: round(seconds * 1000, 2) for name, seconds in phases.items()},
+            }))
+        return response
+
+# --- Exposition ---
+def _labels(**labels):
+    return ','.join(f'{key}="{str(value)}"' for key, value in labels.items())
+
+def _render_histogram(lines, name, histogram, **labels):
+    counts, total, count = histogram.snapshot()
+    cumulative = 0
+    base = _labels(**labels)
+    sep = ',' if base else ''
+    for bound, bucket_count in zip(list(histogram.buckets) + ['+Inf'], counts):
+        cumulative += bucket_count
+        lines.append(f'{name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_sum{{{base}}} {total}')
+    lines.append(f'{name}_count{{{base}}} {count}')
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = [
+        '# HELP stockwave_request_duration_seconds HTTP request latency by route.',
+        '# TYPE stockwave_request_duration_seconds histogram',
+    ]
+    with _lock:
+        routes = sorted(_routes.items())
+    for (method, route, status), histogram in routes:
+        _render_histogram(lines, 'stockwave_request_duration_seconds', histogram, method=method, route=route, status=status)
+
+    lines += [
+        '# HELP stockwave_phase_duration_seconds Time spent in named hot-path phases.',
+        '# TYPE stockwave_phase_duration_seconds histogram',
+    ]
+    with _lock:
+        phases = sorted(_phases.items())
+    for name, histogram in phases:
+        _render_histogram(lines, 'stockwave_phase_duration_seconds', histogram, phase=name)
+
+    for metric, attr, help_text in (
+        ('stockwave_cache_hits_total', 'hits', 'In-process cache hits.'),
+        ('stockwave_cache_misses_total', 'misses', 'In-process cache misses.'),
+        ('stockwave_cache_evictions_total', 'evictions', 'In-process cache LRU evictions.'),
+    ):
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+        for stats in cache.all_cache_stats():
+            lines.append(f'{metric}{{{_labels(cache=stats["name"])}}} {stats[attr]}')
+    lines += ['# HELP stockwave_cache_entries Entries currently held per cache.', '# TYPE stockwave_cache_entries gauge']
+    for stats in cache.all_cache_stats():
+        lines.append(f'stockwave_cache_entries{{{_labels(cache=stats["name"])}}} {stats["size"]}')
+
+    with _lock:
+        counters = sorted(_counters.items())
+    for name in sorted({name for (name, _), _ in counters}):
+        lines.append(f'# TYPE {name} counter')
+        for (counter_name, labels), value in counters:
+            if counter_name == name:
+                label_text = _labels(**dict(labels))
+                lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+    return '\n'.join(lines) + '\n'
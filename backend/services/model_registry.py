@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+from datetime import datetime
+
+from services.cache import TTLCache
+
+MODEL_REGISTRY_DIR = os.environ.get(
+    'MODEL_REGISTRY_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_store')
+)
+MODEL_MAX_AGE_HOURS = float(os.environ.get('MODEL_MAX_AGE_HOURS', 24)) # Staleness policy, even without new bars
+MODEL_CACHE_SIZE = int(os.environ.get('MODEL_CACHE_SIZE', 16)) # Trained models kept in memory (LRU)
+MODEL_VERSIONS_KEPT = 2
+
+class RegistryEntry:
+    """A trained model with its fitted scaler, evaluation metrics and the data it was trained on."""
+
+    def __init__(self, model, scaler, metrics, watermark, trained_at, path=None):
+        self.model = model
+        self.scaler = scaler
+        self.metrics = metrics or {}
+        self.watermark = watermark # ISO date of the latest bar used for training
+        self.trained_at = trained_at
+        self.path = path
+
+    def age_hours(self):
+        return (datetime.utcnow() - self.trained_at).total_seconds() / 3600
+
+    def is_fresh(self, watermark, max_age_hours=MODEL_MAX_AGE_HOURS):
+        """Reusable as-is: trained on the same latest bar and not older than the staleness limit."""
+        return self.watermark == str(watermark) and self.age_hours() < max_age_hours
+
+class ModelRegistry:
+    """
+    Persists trained prediction models on disk, keyed by symbol, model variant, feature set and window size,
+    with the newest version per key also held in an in-memory LRU.
+
+    Layout: <root>/<SYMBOL>/<variant>_f<feature hash>_w<window>/versions/<timestamp>/{model.keras, scaler.pkl, meta.json}
+    plus a latest.json next to versions/ pointing at the current version (replaced atomically).
+    """
+
+    def __init__(self, root=MODEL_REGISTRY_DIR, cache_size=MODEL_CACHE_SIZE, max_age_hours=MODEL_MAX_AGE_HOURS):
+        self.root = root
+        self.max_age_hours = max_age_hours
+        self._memory = TTLCache('models', maxsize=cache_size, ttl=max_age_hours * 3600)
+        self._write_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(symbol, features, window_size, variant='lstm'):
+        feature_hash = hashlib.sha1(','.join(features).encode()).hexdigest()[:10]
+        return f"{symbol}/{variant}_f{feature_hash}_w{window_size}"
+
+    def _key_dir(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def load(self, symbol, features, window_size, variant='lstm'):
+        """Newest entry for the key (any watermark), or None. Callers decide freshness."""
+        key = self.make_key(symbol, features, window_size, variant)
+        entry = self._memory.get(key)
+        if entry is not None:
+            return entry
+
+        pointer = os.path.join(self._key_dir(key), 'latest.json')
+        if not os.path.exists(pointer):
+            return None
+        try:
+            from keras.models import load_model
+
+            with open(pointer) as fh:
+                version_dir = os.path.join(self._key_dir(key), 'versions', json.load(fh)['version'])
+            with open(os.path.join(version_dir, 'meta.json')) as fh:
+                meta = json.load(fh)
+            with open(os.path.join(version_dir, 'scaler.pkl'), 'rb') as fh:
+                scaler = pickle.load(fh)
+            model = load_model(os.path.join(version_dir, 'model.keras'))
+        except Exception as e:
+            print(f"[MODEL REGISTRY ERROR] Could not load {key}: {e}")
+            return None
+
+        entry = RegistryEntry(
+            model, scaler, meta.get('metrics'), meta.get('watermark'),
+            datetime.fromisoformat(meta['trained_at']), path=version_dir
+        )
+        self._memory.set(key, entry)
+        return entry
+
+    def save(self, symbol, features, window_size, watermark, model, scaler, metrics, variant='lstm'):
+        """Persist a newly trained model as the current version for its key and return the entry."""
+        key = self.make_key(symbol, features, window_size, variant)
+        trained_at = datetime.utcnow()
+        version = trained_at.strftime('%Y%m%dT%H%M%S%f')
+        key_dir = self._key_dir(key)
+        version_dir = os.path.join(key_dir, 'versions', version)
+
+        entry = RegistryEntry(model, scaler, metrics, str(watermark), trained_at, path=version_dir)
+        try:
+            os.makedirs(version_dir, exist_ok=True)
+            model.save(os.path.join(version_dir, 'model.keras'))
+            with open(os.path.join(version_dir, 'scaler.pkl'), 'wb') as fh:
+                pickle.dump(scaler, fh)
+            with open(os.path.join(version_dir, 'meta.json'), 'w') as fh:
+                json.dump({
+                    'symbol': symbol,
+                    'features': list(features),
+                    'window_size': window_size,
+                    'variant': variant,
+                    'watermark': str(watermark),
+                    'trained_at': trained_at.isoformat(),
+                    'metrics': metrics,
+                }, fh, indent=2)
+
+            with self._write_lock:
+                tmp_pointer = os.path.join(key_dir, f"latest.json.{version}.tmp")
+                with open(tmp_pointer, 'w') as fh:
+                    json.dump({'version': version}, fh)
+                os.replace(tmp_pointer, os.path.join(key_dir, 'latest.json'))
+                self._prune(key_dir)
+            print(f"[MODEL REGISTRY] Saved {key} trained through {watermark}.")
+        except Exception as e:
+            # A failed save still leaves the in-memory entry usable for this process
+            print(f"[MODEL REGISTRY ERROR] Could not save {key}: {e}")
+
+        self._memory.set(key, entry)
+        return entry
+
+    def evict(self, symbol, features, window_size, variant='lstm'):
+        """Forget the in-memory entry so the next load reads the current version from disk."""
+        self._memory.invalidate(self.make_key(symbol, features, window_size, variant))
+
+    def _prune(self, key_dir):
+        versions_dir = os.path.join(key_dir, 'versions')
+        versions = sorted(os.listdir(versions_dir))
+        for old in versions[:-MODEL_VERSIONS_KEPT]:
+            shutil.rmtree(os.path.join(versions_dir, old), ignore_errors=True)
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
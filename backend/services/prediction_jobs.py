@@ -0,0 +1,247 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from flask import current_app, has_app_context
+
+from services import fast_forecasters, prediction_service
+
+PREDICTION_JOB_WORKERS = int(os.environ.get('PREDICTION_JOB_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+JOB_RESULT_TTL = int(os.environ.get('PREDICTION_JOB_TTL', 60 * 60)) # Seconds finished jobs stay pollable
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# --- Worker process side ---
+_progress_queue = None
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+def _epoch_progress_callback(job_id):
+    from keras.callbacks import Callback
+
+    class EpochProgress(Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            _progress_queue.put(('progress', job_id, epoch + 1, self.params.get('epochs')))
+
+    return EpochProgress()
+
+def _run_prediction_job(job_id, symbol, df, horizon, model_type):
+    """Runs in a pool process: train/reuse the model and forecast, reporting epochs back to the parent."""
+    _progress_queue.put(('running', job_id, None, None))
+    # Only LSTMs train in epochs; the fast models must not pay for importing Keras
+    callbacks = None if model_type in fast_forecasters.FORECASTERS else [_epoch_progress_callback(job_id)]
+    return prediction_service.forecast_from_frame(symbol, df, horizon=horizon, callbacks=callbacks, model_type=model_type)
+
+# --- API process side ---
+class PredictionJobManager:
+    """
+    Background prediction jobs on a bounded process pool. Training never blocks a web thread;
+    requests that would train the same model share one job while it is queued or running.
+    The recursive LSTM is one model for every horizon, so an LSTM request for another horizon
+    waits for the running job and then forecasts with the model it registered.
+    """
+
+    def __init__(self, max_workers=PREDICTION_JOB_WORKERS):
+        self.max_workers = max_workers
+        self._jobs = {}
+        self._active_by_key = {}
+        self._waiting = {} # key -> job ids queued behind the active job, oldest first
+        self._args = {} # job id -> (symbol, df, horizon, model_type) until the job finishes
+        self._lock = threading.Lock()
+        self._app = None # Flask app of the submitting requests; finished jobs read stored backtests in its context
+        self._executor = None
+        self._progress_queue = None
+
+    def _ensure_executor(self):
+        if self._executor is None:
+            # spawn: TensorFlow state must never be forked from a process that has already imported it
+            context = multiprocessing.get_context('spawn')
+            self._progress_queue = context.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self._progress_queue,)
+            )
+            threading.Thread(target=self._drain_progress, args=(self._progress_queue,), daemon=True).start()
+        return self._executor
+
+    def _discard_executor(self, executor):
+        """Shut down a broken pool and end its progress drain thread. Caller holds the lock."""
+        if executor is None or executor is not self._executor:
+            return # Already replaced after an earlier failure
+        self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._progress_queue.put(None) # Sentinel for _drain_progress
+        self._progress_queue = None
+
+    def _drain_progress(self, progress_queue):
+        while True:
+            try:
+                message = progress_queue.get()
+            except (EOFError, OSError):
+                return
+            if message is None:
+                return
+            kind, job_id, epoch, epochs = message
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job['status'] not in ACTIVE_STATUSES:
+                    continue
+                if kind == 'running':
+                    job['status'] = 'running'
+                    job['started_at'] = datetime.utcnow().isoformat()
+                elif kind == 'progress':
+                    job['progress'] = {'epoch': epoch, 'epochs': epochs}
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RESULT_TTL
+        for job_id in [j for j, job in self._jobs.items() if job['finished_ts'] and job['finished_ts'] < cutoff]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _job_key(symbol, horizon, model_type):
+        """Jobs with the same key train the same model: per horizon, except for the recursive LSTM."""
+        return (symbol, None if model_type == 'lstm' else horizon.lower(), model_type)
+
+    def _start(self, job_id, symbol, df, horizon, model_type):
+        """Hand a job to the pool. Caller holds the lock. Returns (future, executor)."""
+        executor = self._ensure_executor()
+        try:
+            return executor.submit(_run_prediction_job, job_id, symbol, df, horizon, model_type), executor
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool for this and later jobs
+            self._discard_executor(executor)
+            executor = self._ensure_executor()
+            return executor.submit(_run_prediction_job, job_id, symbol, df, horizon, model_type), executor
+
+    def submit(self, symbol, horizon, df, model_type='lstm'):
+        """Queue a prediction for an already-loaded frame. Returns (job view, created)."""
+        key = self._job_key(symbol, horizon, model_type)
+        with self._lock:
+            if has_app_context():
+                self._app = current_app._get_current_object()
+            self._prune()
+            active_id = self._active_by_key.get(key)
+            if active_id is not None and self._jobs[active_id]['status'] not in ACTIVE_STATUSES:
+                active_id = None
+            if active_id is not None:
+                for shared_id in [active_id] + self._waiting.get(key, []):
+                    if self._jobs[shared_id]['horizon'].lower() == horizon.lower():
+                        return self._view(self._jobs[shared_id]), False
+
+            job_id = uuid.uuid4().hex
+            job = {
+                'job_id': job_id,
+                'symbol': symbol,
+                'horizon': horizon,
+                'model_type': model_type,
+                'status': 'queued',
+                'progress': {'epoch': 0, 'epochs': None},
+                'submitted_at': datetime.utcnow().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                'finished_ts': None,
+                'result': None,
+                'error': None,
+            }
+            self._jobs[job_id] = job
+            self._args[job_id] = (symbol, df, horizon, model_type)
+
+            if active_id is not None:
+                self._waiting.setdefault(key, []).append(job_id)
+                return self._view(job), True
+
+            self._active_by_key[key] = job_id
+            future, executor = self._start(job_id, symbol, df, horizon, model_type)
+            view = self._view(job)
+
+        self._track(job_id, key, future, executor)
+        return view, True
+
+    def _track(self, job_id, key, future, executor):
+        # Outside the lock: the callback runs right away if the future is already done
+        future.add_done_callback(lambda f: self._finish(job_id, key, f, executor))
+
+    def _finish(self, job_id, key, future, executor):
+        try:
+            result, error_message = future.result()
+        except BrokenProcessPool as e:
+            result, error_message = None, f"Prediction worker crashed: {e}"
+            with self._lock:
+                self._discard_executor(executor)
+        except Exception as e:
+            result, error_message = None, f"Prediction failed: {e}"
+
+        with self._lock:
+            args = self._args.pop(job_id, None)
+        if result and not error_message and args:
+            self._complete(result, *args)
+
+        next_job = None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['status'] = 'failed' if error_message or not result else 'done'
+            job['result'] = result
+            job['error'] = error_message or (None if result else "Prediction could not be generated.")
+            job['finished_at'] = datetime.utcnow().isoformat()
+            job['finished_ts'] = time.time()
+            if self._active_by_key.get(key) == job_id:
+                del self._active_by_key[key]
+                waiting = self._waiting.pop(key, [])
+                if waiting:
+                    # The next horizon reuses the model this job registered (or trains it, if this one failed)
+                    next_id = waiting.pop(0)
+                    if waiting:
+                        self._waiting[key] = waiting
+                    self._active_by_key[key] = next_id
+                    next_job = (next_id, *self._start(next_id, *self._args[next_id]))
+        print(f"[PREDICTION JOB] {job_id} for {job['symbol']} ({job['horizon']}, {job['model_type']}) finished: {job['status']}.")
+
+        if next_job:
+            next_id, next_future, next_executor = next_job
+            self._track(next_id, key, next_future, next_executor)
+
+    def _complete(self, result, symbol, df, horizon, model_type):
+        """API-side follow-up of a successful job, so it answers like a synchronous /stock/predict."""
+        if model_type not in fast_forecasters.FORECASTERS:
+            # The worker saved the model it trained to disk; don't keep serving this process's older copy
+            prediction_service.evict_registered_model(symbol, horizon, model_type)
+        if self._app is None:
+            return
+        try:
+            with self._app.app_context():
+                prediction_service.apply_backtest_confidence(
+                    result, symbol, model_type, prediction_service.HORIZON_STEPS.get(horizon.lower(), 1), df
+                )
+        except Exception as e:
+            print(f"[PREDICTION JOB] Backtest confidence for {symbol} not applied: {e}")
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._view(job) if job else None
+
+    @staticmethod
+    def _view(job):
+        return {k: v for k, v in job.items() if k != 'finished_ts'}
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_job_manager():
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = PredictionJobManager()
+    return _manager
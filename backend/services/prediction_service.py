@@ -1,22 +1,53 @@
 import numpy as np
 import pandas as pd
-from keras.models import Sequential
-from keras.layers import LSTM, Dense, Dropout
-from sklearn.preprocessing import MinMaxScaler
+import copy
+import math
+import os
+import threading
+import time
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime, timedelta
 from models.stock_data import StockData
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-
+from models.backtest_result import BacktestResult
+from services import fast_forecasters, indicators, model_registry, startup_timing
+from services import metrics as perf_metrics # 'metrics' is the evaluation dict throughout this module
+
+# TensorFlow/Keras and scikit-learn are imported inside the functions that use them, so importing this
+# module (and starting the web app) does not pay for the ML stack until the first LSTM prediction.
+_warm_up_thread = None
+
+def warm_up_ml_stack():
+    """Import the ML stack now instead of on the first LSTM prediction; records an 'ml stack' startup phase."""
+    started = time.perf_counter()
+    import tensorflow # noqa: F401
+    import keras.layers # noqa: F401
+    import keras.models # noqa: F401
+    import sklearn.metrics # noqa: F401
+    import sklearn.preprocessing # noqa: F401
+    startup_timing.record('ml stack (warm-up)', time.perf_counter() - started)
+    print(f"[WARM-UP] ML stack imported in {time.perf_counter() - started:.2f}s.")
+
+def start_warm_up():
+    """Import the ML stack on a daemon thread so the app can serve requests meanwhile."""
+    global _warm_up_thread
+    if _warm_up_thread is None:
+        _warm_up_thread = threading.Thread(target=warm_up_ml_stack, name='ml-warm-up', daemon=True)
+        _warm_up_thread.start()
+    return _warm_up_thread
+
+@perf_metrics.timed(perf_metrics.DB_READ)
 def get_data_from_db(symbol, lookback_days):
+    # Take the most recent `lookback_days` rows; stored history is no longer wiped on refresh
     records = (
         StockData.query
         .filter(StockData.company_symbol == symbol)
-        .order_by(StockData.date.asc())
+        .order_by(StockData.date.desc())
         .limit(lookback_days)
         .all()
     )
     if not records:
         return None
+    records.reverse() # Chronological order (oldest to newest)
 
     df = pd.DataFrame([{
         'date': r.date,
@@ -31,7 +62,56 @@ def get_data_from_db(symbol, lookback_days):
     df['date'] = pd.to_datetime(df['date'])
     return df.dropna()
 
-def prepare_data_multi_feature(df_full, features_to_scale, window_size=60, train_test_split_ratio=0.8):
+# Above this many training windows the windows are built per batch instead of held in memory
+LAZY_WINDOW_THRESHOLD = int(os.environ.get('LAZY_WINDOW_THRESHOLD', 20000))
+
+def make_window_dataset(scaled_data, targets, window_size, start, end, batch_size=16, shuffle=False):
+    """
+    tf.data pipeline of (scaled_data[i:i + window_size], targets[i]) batches for i in [start, end).
+    Only the series itself is held in memory; each batch's windows are gathered on the fly.
+    """
+    import tensorflow as tf
+
+    data = tf.constant(scaled_data, dtype=tf.float32)
+    target_values = tf.constant(targets, dtype=tf.float32)
+    offsets = tf.range(window_size, dtype=tf.int64)
+
+    ds = tf.data.Dataset.range(start, end)
+    if shuffle:
+        ds = ds.shuffle(end - start, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size).map(
+        lambda idx: (tf.gather(data, idx[:, None] + offsets[None, :]), tf.gather(target_values, idx)),
+        num_parallel_calls=tf.data.AUTOTUNE
+    )
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+def build_windows(scaled_data, window_size, close_feature_idx, horizon=1):
+    """
+    (X, y) as strided views over the scaled series: sample j is the window
+    scaled_data[j:j + window_size] and the `horizon` close(s) right after it.
+    """
+    n_samples = max(len(scaled_data) - window_size - horizon + 1, 0)
+    if not n_samples:
+        return np.empty((0, window_size, scaled_data.shape[1])), np.empty((0,) if horizon == 1 else (0, horizon))
+
+    X = sliding_window_view(scaled_data, window_size, axis=0)[:n_samples].transpose(0, 2, 1)
+    future_closes = scaled_data[window_size:, close_feature_idx]
+    if horizon == 1:
+        y = future_closes[:n_samples]
+    else:
+        y = sliding_window_view(future_closes, horizon)[:n_samples]
+    return X, y
+
+def prepare_data_multi_feature(df_full, features_to_scale, window_size=60, train_test_split_ratio=0.8, horizon=1,
+                               lazy=False, batch_size=16, validation_split=0.1):
+    """
+    Scale the features and cut them into (window -> target) samples. With horizon > 1 each
+    target is the next `horizon` scaled closes (for the direct multi-output model).
+
+    Windows are strided views over the scaled series (no per-window copies). With lazy=True the
+    train/validation/test sets come back as tf.data pipelines that build windows per batch:
+    (train_ds, val_ds, test_ds, y_test, scaler, scaled_data, df_processed).
+    """
     # Make a copy to avoid SettingWithCopyWarning
     df_processed = df_full.copy()
 
@@ -39,27 +119,33 @@ def prepare_data_multi_feature(df_full, features_to_scale, window_size=60, train
 
     data_to_scale = df_processed[features_to_scale].values
 
+    from sklearn.preprocessing import MinMaxScaler
+
     scaler = MinMaxScaler(feature_range=(0, 1))
     scaled_data = scaler.fit_transform(data_to_scale)
 
-    X, y = [], []
     close_feature_idx = features_to_scale.index('close')
+    X, y = build_windows(scaled_data, window_size, close_feature_idx, horizon)
+    n_samples = len(y)
 
-    for i in range(window_size, len(scaled_data)):
-        X.append(scaled_data[i - window_size:i])
-        y.append(scaled_data[i, close_feature_idx]) 
+    split_idx = int(n_samples * train_test_split_ratio)
 
-    X = np.array(X)
-    y = np.array(y)
+    if lazy:
+        val_idx = int(split_idx * (1 - validation_split))
+        train_ds = make_window_dataset(scaled_data, y, window_size, 0, val_idx, batch_size, shuffle=True)
+        val_ds = make_window_dataset(scaled_data, y, window_size, val_idx, split_idx, batch_size)
+        test_ds = make_window_dataset(scaled_data, y, window_size, split_idx, n_samples, batch_size)
+        return train_ds, val_ds, test_ds, np.asarray(y[split_idx:]), scaler, scaled_data, df_processed
 
-    split_idx = int(len(X) * train_test_split_ratio)
     X_train, X_test = X[:split_idx], X[split_idx:]
     y_train, y_test = y[:split_idx], y[split_idx:]
 
-
     return X_train, y_train, X_test, y_test, scaler, scaled_data, df_processed
 
 def build_model_improved(input_shape):
+    from keras.layers import LSTM, Dense, Dropout
+    from keras.models import Sequential
+
     model = Sequential([
         LSTM(128, return_sequences=True, input_shape=input_shape),
         Dropout(0.3),
@@ -70,70 +156,95 @@ def build_model_improved(input_shape):
     model.compile(optimizer='adam', loss='mean_squared_error')
     return model
 
-def predict_multiple_steps_multi_feature(model, input_seq, scaler, steps, num_features, close_feature_idx):
-    predictions = []
-    current_input = input_seq.copy() 
-
-    for _ in range(steps):
-        next_pred_scaled = model.predict(current_input, verbose=0)[0][0]
-        predictions.append(next_pred_scaled)
-
-        dummy_next_features = current_input[0, -1, :].copy().reshape(1, 1, num_features)
-        dummy_next_features[0, 0, close_feature_idx] = next_pred_scaled
+def build_model_direct(input_shape, horizon):
+    """Same LSTM body as build_model_improved, with a Dense head emitting all `horizon` closes at once."""
+    from keras.layers import LSTM, Dense, Dropout
+    from keras.models import Sequential
 
-        current_input = np.append(current_input[:, 1:, :], dummy_next_features, axis=1)
+    model = Sequential([
+        LSTM(128, return_sequences=True, input_shape=input_shape),
+        Dropout(0.3),
+        LSTM(64, return_sequences=False),
+        Dropout(0.3),
+        Dense(horizon)
+    ])
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
 
-    dummy_full_predictions_scaled = np.zeros((len(predictions), num_features))
-    dummy_full_predictions_scaled[:, close_feature_idx] = np.array(predictions)
+def _compiled_step(model):
+    """Graph-compiled forward pass for a model (one trace per model), skipping model.predict's per-call setup."""
+    # Kept on the model itself: the step references the model, so it is freed together with it
+    step = getattr(model, '_predict_step', None)
+    if step is None:
+        import tensorflow as tf
+        step = tf.function(lambda x: model(x, training=False), reduce_retracing=True)
+        model._predict_step = step
+    return step
+
+@perf_metrics.timed(perf_metrics.INFERENCE)
+def predict_multiple_steps_multi_feature(model, input_seq, scaler, steps, num_features, close_feature_idx):
+    """
+    Recursive multi-step forecast. `input_seq` has shape (batch, window, features); several
+    sequences sharing the same model and scaler (e.g. several forecast origins) are stepped
+    together as one tensor. Returns shape (steps,) for a single sequence, else (batch, steps).
+    """
+    batch, window_size = input_seq.shape[0], input_seq.shape[1]
+
+    # Preallocated buffer holding the input window plus every future step: the window for step i
+    # is the view buffer[:, i:i + window_size], so each prediction is written once and nothing is shifted
+    buffer = np.empty((batch, window_size + steps, num_features), dtype=np.float32)
+    buffer[:, :window_size] = input_seq
+    predictions = np.empty((batch, steps))
+    step_fn = _compiled_step(model)
+
+    for i in range(steps):
+        next_pred_scaled = step_fn(buffer[:, i:i + window_size]).numpy()[:, 0]
+        predictions[:, i] = next_pred_scaled
+
+        # Carry the last known features forward and replace only the close with the prediction
+        buffer[:, window_size + i] = buffer[:, window_size + i - 1]
+        buffer[:, window_size + i, close_feature_idx] = next_pred_scaled
+
+    dummy_full_predictions_scaled = np.zeros((batch * steps, num_features))
+    dummy_full_predictions_scaled[:, close_feature_idx] = predictions.ravel()
 
     predicted_prices_full_features = scaler.inverse_transform(dummy_full_predictions_scaled)
-    predicted_close_prices = predicted_prices_full_features[:, close_feature_idx]
+    predicted_close_prices = predicted_prices_full_features[:, close_feature_idx].reshape(batch, steps)
 
-    return predicted_close_prices
+    return predicted_close_prices[0] if batch == 1 else predicted_close_prices
 
-def lstm_predict_multiple(symbol, horizon='day', lookback_days=240):
-    features_to_scale = ['open', 'high', 'low', 'close', 'volume']
-    df = get_data_from_db(symbol, lookback_days + 120)
+@perf_metrics.timed(perf_metrics.INFERENCE)
+def predict_direct_multi_feature(model, input_seq, scaler, num_features, close_feature_idx):
+    """Whole-horizon forecast from a direct multi-output model: one forward pass regardless of horizon."""
+    predictions_scaled = _compiled_step(model)(input_seq.astype(np.float32)).numpy()
+    batch, steps = predictions_scaled.shape
 
-    if df is not None:
-        print(f"--- DB records fetched for prediction for {symbol}: {len(df)} days ---")
-    else:
-        print(f"--- No records fetched from DB for prediction for {symbol} ---")
+    dummy_full_predictions_scaled = np.zeros((batch * steps, num_features))
+    dummy_full_predictions_scaled[:, close_feature_idx] = predictions_scaled.ravel()
+    predicted_close_prices = scaler.inverse_transform(dummy_full_predictions_scaled)[:, close_feature_idx].reshape(batch, steps)
 
-    if df is None or df.empty or len(df) < 200:
-        return None, "Insufficient data to train model or generate features."
-    
-    df.loc[:, 'SMA_10'] = df['close'].rolling(window=10).mean()
-    df.loc[:, 'EMA_10'] = df['close'].ewm(span=10, adjust=False).mean()
-    df.loc[:, 'Daily_Return'] = df['close'].pct_change()
+    return predicted_close_prices[0] if batch == 1 else predicted_close_prices
 
-    features_to_scale.extend(['SMA_10', 'EMA_10', 'Daily_Return'])
-    
-    steps_map = {'day': 1, 'week': 7, 'month': 30, '3month': 90}
-    steps = steps_map.get(horizon.lower(), 1)
+def evaluate_model(model, X_test, y_test, scaler, num_features, close_feature_idx):
+    """
+    Hold-out error metrics in price units (RMSE, MAE, R-squared, MAPE) plus the scaled test loss.
+    X_test may be a window array or a tf.data pipeline that already carries its targets.
+    """
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
-    window_size = 60
-    close_feature_idx = features_to_scale.index('close')
-
-    # Pass the full df to prepare_data_multi_feature, which will handle dropping NaNs
-    X_train, y_train, X_test, y_test, scaler, scaled_data_full, df_processed = \
-        prepare_data_multi_feature(df, features_to_scale=features_to_scale, window_size=window_size)
-
-    if len(X_test) == 0:
-        return None, "Not enough data to create a test set for evaluation. Consider increasing lookback_days."
-
-    model = build_model_improved((X_train.shape[1], X_train.shape[2]))
-    history = model.fit(X_train, y_train, epochs=100, batch_size=16, verbose=1, validation_split=0.1)
-
-    test_loss = model.evaluate(X_test, y_test, verbose=0)
+    if isinstance(X_test, np.ndarray):
+        test_loss = model.evaluate(X_test, y_test, verbose=0)
+    else:
+        test_loss = model.evaluate(X_test, verbose=0)
     print(f"Test Loss (MSE): {test_loss}")
 
-    test_predictions_scaled = model.predict(X_test, verbose=0)
-    dummy_test_predictions_scaled = np.zeros((len(test_predictions_scaled), len(features_to_scale)))
-    dummy_test_predictions_scaled[:, close_feature_idx] = test_predictions_scaled.flatten()
+    # Flattened so single-step and multi-output (direct) models are scored the same way
+    test_predictions_scaled = model.predict(X_test, verbose=0).flatten()
+    dummy_test_predictions_scaled = np.zeros((len(test_predictions_scaled), num_features))
+    dummy_test_predictions_scaled[:, close_feature_idx] = test_predictions_scaled
     test_predictions = scaler.inverse_transform(dummy_test_predictions_scaled)[:, close_feature_idx]
 
-    dummy_actual_test_prices_scaled = np.zeros((len(y_test), len(features_to_scale)))
+    dummy_actual_test_prices_scaled = np.zeros((y_test.size, num_features))
     dummy_actual_test_prices_scaled[:, close_feature_idx] = y_test.flatten()
     actual_test_prices = scaler.inverse_transform(dummy_actual_test_prices_scaled)[:, close_feature_idx]
 
@@ -149,20 +260,297 @@ def lstm_predict_multiple(symbol, horizon='day', lookback_days=240):
     mape = np.mean(np.abs((actual_test_prices - test_predictions) / (actual_test_prices + epsilon))) * 100
     print(f"MAPE: {mape:.2f}%")
 
+    return {
+        'test_loss': float(test_loss),
+        'rmse': float(rmse),
+        'mae': float(mae),
+        'r2': float(r2),
+        'mape': float(mape)
+    }
+
+TRAINING_EPOCHS = 100
+
+# Engineered feature columns the models train on -> indicator engine spec producing them
+PREDICTION_FEATURES = {'SMA_10': 'sma_10', 'EMA_10': 'ema_10', 'Daily_Return': 'return'}
+MODEL_FEATURES = ['open', 'high', 'low', 'close', 'volume'] + list(PREDICTION_FEATURES) # LSTM inputs, in order
+LSTM_WINDOW_SIZE = 60
+
+def add_prediction_features(df):
+    """Compute PREDICTION_FEATURES on a frame that was not loaded through the indicator engine."""
+    columns = indicators.compute({key: df[key].to_numpy(dtype=float) for key in ('open', 'high', 'low', 'close', 'volume')},
+                                 list(PREDICTION_FEATURES.values()))
+    for feature, spec in PREDICTION_FEATURES.items():
+        df.loc[:, feature] = columns[spec]
+    return df
+
+def load_prediction_frame(symbol, lookback_days=240):
+    """
+    Stored bars a prediction trains on (lookback_days plus 120 days of history) with PREDICTION_FEATURES
+    from the indicator engine's feature store, so repeat predictions do not recompute them.
+    """
+    df = indicators.feature_frame(symbol, list(PREDICTION_FEATURES.values()), limit=lookback_days + 120)
+    if df is not None:
+        df = df.rename(columns={spec: feature for feature, spec in PREDICTION_FEATURES.items()})
+        df = df.dropna(subset=['open', 'high', 'low', 'close']).reset_index(drop=True)
+
+    if df is not None:
+        print(f"--- DB records fetched for prediction for {symbol}: {len(df)} days ---")
+    else:
+        print(f"--- No records fetched from DB for prediction for {symbol} ---")
+    return df
+
+# Full training stops once validation loss stops improving; TRAINING_EPOCHS is only the ceiling
+EARLY_STOPPING_PATIENCE = 10
+
+# Warm-start fine-tuning when new bars arrive for a symbol that already has a registered model
+FINE_TUNE_EPOCHS = 10
+FINE_TUNE_PATIENCE = 2
+FINE_TUNE_MIN_WINDOWS = 64 # Fine-tune on at least this many of the newest windows
+FINE_TUNE_LEARNING_RATE = 1e-4
+DRIFT_EVAL_WINDOWS = 20 # Newest windows the old model is scored on before fine-tuning
+DRIFT_THRESHOLD = float(os.environ.get('MODEL_DRIFT_THRESHOLD', 1.5)) # Full retrain when MAPE/RMSE exceed baseline by this factor
+MAX_WARM_STARTS = int(os.environ.get('MODEL_MAX_WARM_STARTS', 20)) # Consecutive fine-tunes before a forced full retrain
+
+def _early_stopping(patience):
+    from keras.callbacks import EarlyStopping
+    return EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True)
+
+def warm_start_model(entry, df, features_to_scale, window_size, close_feature_idx, horizon=1, callbacks=None):
+    """
+    Fine-tune a previously registered model on the newest windows (those that arrived since it was
+    trained, at least FINE_TUNE_MIN_WINDOWS). A hold-out as large as a full training's 20%, placed just
+    before them, is never tuned on: it drives early stopping and is what the returned metrics score.
+    Returns (model, scaler, scaled_data, df_processed, metrics), or None when a full retrain is due:
+    too many warm starts in a row, too little data, or the old model's error on the newest
+    windows has drifted past DRIFT_THRESHOLD times the error measured at its last full training.
+    """
+    from keras.models import clone_model
+    from keras.optimizers import Adam
+
+    warm_starts = entry.metrics.get('warm_starts', 0)
+    if warm_starts >= MAX_WARM_STARTS:
+        print(f"[WARM START] {warm_starts} consecutive fine-tunes, doing a full retrain.")
+        return None
+
+    df_processed = df.dropna().copy()
+    data = df_processed[features_to_scale].values
+    num_features = len(features_to_scale)
+
+    # Keep the registered scaling so the model's inputs mean the same thing; only widen it for out-of-range bars
+    scaler = copy.deepcopy(entry.scaler)
+    if (data.min(axis=0) < scaler.data_min_).any() or (data.max(axis=0) > scaler.data_max_).any():
+        scaler.partial_fit(data)
+    scaled_data = scaler.transform(data)
+
+    X, y = build_windows(scaled_data, window_size, close_feature_idx, horizon)
+    if len(y) < FINE_TUNE_MIN_WINDOWS:
+        return None
+
+    print(f"[WARM START] Drift check on the newest {DRIFT_EVAL_WINDOWS} windows:")
+    drift = evaluate_model(entry.model, X[-DRIFT_EVAL_WINDOWS:], y[-DRIFT_EVAL_WINDOWS:], scaler, num_features, close_feature_idx)
+    baseline_mape = entry.metrics.get('baseline_mape', entry.metrics.get('mape'))
+    baseline_rmse = entry.metrics.get('baseline_rmse', entry.metrics.get('rmse'))
+    if (baseline_mape and drift['mape'] > DRIFT_THRESHOLD * baseline_mape) or \
+            (baseline_rmse and drift['rmse'] > DRIFT_THRESHOLD * baseline_rmse):
+        print(f"[WARM START] Drift detected (MAPE {drift['mape']:.2f}% vs baseline {baseline_mape:.2f}%), doing a full retrain.")
+        return None
+
+    # The newest windows are tuned on; the windows just before them are held out to score the result
+    n_hold = len(y) - int(len(y) * 0.8)
+    new_bars = int((df_processed['date'] > pd.Timestamp(entry.watermark)).sum())
+    n_tune = min(max(new_bars, FINE_TUNE_MIN_WINDOWS), len(y) - n_hold)
+    if n_tune < FINE_TUNE_MIN_WINDOWS:
+        return None
+    hold = slice(len(y) - n_tune - n_hold, len(y) - n_tune)
+
+    model = clone_model(entry.model) # Never mutate the model other requests may be predicting with
+    model.set_weights(entry.model.get_weights())
+    model.compile(optimizer=Adam(learning_rate=FINE_TUNE_LEARNING_RATE), loss='mean_squared_error')
+    with perf_metrics.phase(perf_metrics.TRAINING):
+        model.fit(
+            X[-n_tune:], y[-n_tune:], epochs=FINE_TUNE_EPOCHS, batch_size=16, verbose=1,
+            validation_data=(X[hold], y[hold]), callbacks=[_early_stopping(FINE_TUNE_PATIENCE)] + list(callbacks or [])
+        )
+    print(f"[WARM START] Fine-tuned on the newest {n_tune} windows ({new_bars} new bars).")
+
+    metrics = evaluate_model(model, X[hold], y[hold], scaler, num_features, close_feature_idx)
+    metrics.update(
+        training='warm_start',
+        warm_starts=warm_starts + 1,
+        baseline_mape=baseline_mape,
+        baseline_rmse=baseline_rmse,
+        drift_mape=drift['mape'],
+        drift_rmse=drift['rmse']
+    )
+    return model, scaler, scaled_data, df_processed, metrics
+
+MODEL_TYPES = ('lstm', 'lstm_direct') + tuple(fast_forecasters.FORECASTERS)
+HORIZON_STEPS = {'day': 1, 'week': 7, 'month': 30, '3month': 90} # Trading days forecast per horizon
+
+# Confidence is the chance that the close at the end of the horizon lands within CONFIDENCE_TOLERANCE
+# (relative) of the forecast: the measured hit rate of the stored walk-forward backtest when there is
+# one (services/backtest.py) and it is recent, else an estimate from the model's one-step hold-out MAPE.
+CONFIDENCE_TOLERANCE = float(os.environ.get('PREDICTION_CONFIDENCE_TOLERANCE', 0.05))
+BACKTEST_MAX_STALE_BARS = int(os.environ.get('BACKTEST_MAX_STALE_BARS', 20)) # Newer stored bars before a backtest stops counting
+
+def confidence_from_mape(mape, steps):
+    """Hold-out estimate: normal errors with mean absolute size `mape`, spreading with sqrt(steps)."""
+    if mape is None or not math.isfinite(mape):
+        return None
+    if mape <= 0:
+        return 1.0
+    sigma = mape / 100 * math.sqrt(math.pi / 2) * math.sqrt(steps)
+    return math.erf(CONFIDENCE_TOLERANCE / (sigma * math.sqrt(2)))
+
+def apply_backtest_confidence(result, symbol, model_type, steps, df):
+    """
+    Replace the hold-out confidence with the stored backtest's hit rate for this model and horizon, if any.
+    A backtest that ends more than BACKTEST_MAX_STALE_BARS bars before the newest bar of `df` is ignored.
+    """
+    try:
+        row = BacktestResult.query.filter_by(company_symbol=symbol, model_type=model_type, horizon_steps=steps).first()
+    except Exception as e:
+        print(f"[DB READ ERROR] Backtest lookup for {symbol}: {e}")
+        return result
+    if row is None or row.hit_rate is None or row.data_through is None:
+        return result
+
+    newer_bars = int((df['date'] > pd.Timestamp(row.data_through)).sum())
+    if newer_bars > BACKTEST_MAX_STALE_BARS:
+        print(f"[BACKTEST] Stored backtest for {symbol} ({model_type}) is {newer_bars} bars old; using the hold-out confidence.")
+        return result
+
+    result['confidence'] = round(row.hit_rate, 4)
+    result['confidence_source'] = 'backtest'
+    result['backtest'] = {
+        'origins': row.origins,
+        'mape': row.mape,
+        'hit_rate': row.hit_rate,
+        'data_through': row.data_through.isoformat(),
+    }
+    return result
+
+def lstm_predict_multiple(symbol, horizon='day', lookback_days=240, model_type='lstm'):
+    df = load_prediction_frame(symbol, lookback_days)
+    result, error_message = forecast_from_frame(symbol, df, horizon=horizon, model_type=model_type)
+    if result is not None:
+        apply_backtest_confidence(result, symbol, model_type, HORIZON_STEPS.get(horizon.lower(), 1), df)
+    return result, error_message
+
+def registry_variant(model_type, steps):
+    """Model registry variant an LSTM is stored under. A direct model is only valid for its own horizon."""
+    return f"lstm_direct{steps}" if model_type == 'lstm_direct' else 'lstm'
+
+def evict_registered_model(symbol, horizon, model_type):
+    """Drop this process's in-memory copy of a registered LSTM, e.g. after a job's worker process saved a newer one."""
+    steps = HORIZON_STEPS.get(horizon.lower(), 1)
+    model_registry.get_registry().evict(symbol, MODEL_FEATURES, LSTM_WINDOW_SIZE, variant=registry_variant(model_type, steps))
+
+def forecast_from_frame(symbol, df, horizon='day', callbacks=None, model_type='lstm'):
+    """
+    Train (or reuse) the model for `symbol` on an already-loaded frame and forecast `horizon`.
+    Needs no database access, so it can run in a worker process. `callbacks` go to model.fit.
+
+    model_type 'lstm' predicts one step and feeds it back recursively; 'lstm_direct' trains a
+    multi-output head for the whole horizon and forecasts it in a single forward pass.
+    'ridge', 'ets' and 'drift' are the closed-form models in fast_forecasters: fitted per request
+    in milliseconds and never registered.
+    """
+    if model_type not in MODEL_TYPES:
+        return None, f"Unknown model type '{model_type}'. Choose one of: {', '.join(MODEL_TYPES)}."
+
+    features_to_scale = list(MODEL_FEATURES)
+
+    if df is None or df.empty or len(df) < 200:
+        return None, "Insufficient data to train model or generate features."
+    
+    if any(feature not in df.columns for feature in PREDICTION_FEATURES):
+        df = add_prediction_features(df) # Frames from load_prediction_frame already carry them
+
+    steps = HORIZON_STEPS.get(horizon.lower(), 1)
+
+    if model_type in fast_forecasters.FORECASTERS:
+        df_processed = df.dropna().copy()
+        with perf_metrics.phase(perf_metrics.INFERENCE): # Fit and forecast together take milliseconds
+            predicted_close_prices, metrics = fast_forecasters.forecast(model_type, df_processed, steps)
+        return build_forecast_result(predicted_close_prices, df_processed['date'].iloc[-1], steps, metrics, model_type, datetime.utcnow()), None
+
+    window_size = LSTM_WINDOW_SIZE
+    close_feature_idx = features_to_scale.index('close')
+
+    # Reuse the registered model while it was trained on the same latest bar and is within the staleness policy
+    registry = model_registry.get_registry()
+    watermark = df['date'].iloc[-1].date()
+    direct = model_type == 'lstm_direct'
+    variant = registry_variant(model_type, steps)
+    entry = registry.load(symbol, features_to_scale, window_size, variant=variant)
+
+    if entry is not None and entry.is_fresh(watermark):
+        print(f"--- Reusing registered model for {symbol} trained through {entry.watermark} ---")
+        model, scaler, metrics = entry.model, entry.scaler, entry.metrics
+        df_processed = df.dropna().copy()
+        scaled_data_full = scaler.transform(df_processed[features_to_scale].values)
+    else:
+        warm = None
+        if entry is not None:
+            # New bars since the registered model was trained: fine-tune it unless drift calls for a full retrain
+            warm = warm_start_model(entry, df, features_to_scale, window_size, close_feature_idx,
+                                    horizon=steps if direct else 1, callbacks=callbacks)
+
+        if warm is not None:
+            model, scaler, scaled_data_full, df_processed, metrics = warm
+        else:
+            # Long lookbacks build their windows per batch instead of materializing every window
+            lazy = len(df) - window_size > LAZY_WINDOW_THRESHOLD
+
+            # Pass the full df to prepare_data_multi_feature, which will handle dropping NaNs
+            train_data, train_targets, X_test, y_test, scaler, scaled_data_full, df_processed = \
+                prepare_data_multi_feature(df, features_to_scale=features_to_scale, window_size=window_size,
+                                           horizon=steps if direct else 1, lazy=lazy)
+
+            if len(y_test) == 0:
+                return None, "Not enough data to create a test set for evaluation. Consider increasing lookback_days."
+
+            input_shape = (window_size, len(features_to_scale))
+            if direct:
+                model = build_model_direct(input_shape, steps)
+            else:
+                model = build_model_improved(input_shape)
+
+            fit_callbacks = [_early_stopping(EARLY_STOPPING_PATIENCE)] + list(callbacks or [])
+            with perf_metrics.phase(perf_metrics.TRAINING):
+                if lazy:
+                    # train_targets is the validation pipeline in lazy mode
+                    history = model.fit(train_data, epochs=TRAINING_EPOCHS, verbose=1, validation_data=train_targets, callbacks=fit_callbacks)
+                else:
+                    history = model.fit(train_data, train_targets, epochs=TRAINING_EPOCHS, batch_size=16, verbose=1, validation_split=0.1, callbacks=fit_callbacks)
+
+            metrics = evaluate_model(model, X_test, y_test, scaler, len(features_to_scale), close_feature_idx)
+            metrics.update(training='full', warm_starts=0, baseline_mape=metrics['mape'], baseline_rmse=metrics['rmse'])
+
+        entry = registry.save(symbol, features_to_scale, window_size, watermark, model, scaler, metrics, variant=variant)
+
     if len(scaled_data_full) < window_size:
         return None, "Not enough data for generating future predictions (window_size too large for available data)."
 
     last_input_sequence = scaled_data_full[-window_size:].reshape(1, window_size, len(features_to_scale))
 
-    predicted_close_prices = predict_multiple_steps_multi_feature(
-        model, last_input_sequence, scaler, steps, len(features_to_scale), close_feature_idx
-    )
+    if direct:
+        predicted_close_prices = predict_direct_multi_feature(
+            model, last_input_sequence, scaler, len(features_to_scale), close_feature_idx
+        )
+    else:
+        predicted_close_prices = predict_multiple_steps_multi_feature(
+            model, last_input_sequence, scaler, steps, len(features_to_scale), close_feature_idx
+        )
 
     # Use df_processed (which has 'date' column and is cleaned) for last_date
-    last_date = df_processed['date'].iloc[-1]
+    return build_forecast_result(predicted_close_prices, df_processed['date'].iloc[-1], steps, metrics, model_type, entry.trained_at), None
+
+def build_forecast_result(predicted_close_prices, last_date, steps, metrics, model_type, trained_at):
+    """Forecast response shared by every model type: per-day series over the next `steps` trading days plus metrics."""
     future_dates = []
     current = last_date
-
     while len(future_dates) < steps:
         current += timedelta(days=1)
         if current.weekday() < 5:
@@ -173,6 +561,7 @@ def lstm_predict_multiple(symbol, horizon='day', lookback_days=240):
     elif len(predicted_close_prices) < len(future_dates):
           future_dates = future_dates[:len(predicted_close_prices)]
 
+    confidence = confidence_from_mape(metrics.get('mape'), steps)
     first_predicted_close = round(float(predicted_close_prices[0]), 2) if len(predicted_close_prices) > 0 else None
 
     result = {
@@ -196,7 +585,11 @@ def lstm_predict_multiple(symbol, horizon='day', lookback_days=240):
             {'date': d.strftime('%Y-%m-%d'), 'low': round(float(p), 2), 'predicted': True}
             for d, p in zip(future_dates, predicted_close_prices)
         ],
-        'confidence': 0.85
+        'metrics': {k: round(v, 4) if isinstance(v, float) else v for k, v in metrics.items()},
+        'model_type': model_type,
+        'model_trained_at': trained_at.isoformat(),
+        'confidence': None if confidence is None else round(confidence, 4),
+        'confidence_source': 'hold_out'
     }
 
-    return result, None
\ No newline at end of file
+    return result
\ No newline at end of file
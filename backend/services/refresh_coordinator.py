@@ -0,0 +1,78 @@
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from database import db
+from services import data_services, metrics, response_cache
+from services.cache import SingleFlight
+
+# Coalesces "not enough stored history" refreshes: concurrent requests for the same symbol share one
+# sync (one upstream fetch, one write). With REFRESH_ADVISORY_LOCK=1 on Postgres, a per-symbol advisory
+# lock extends this across worker processes; whoever waited re-checks before fetching again.
+REFRESH_ADVISORY_LOCK = os.environ.get('REFRESH_ADVISORY_LOCK', '').lower() in ('1', 'true', 'yes')
+REFRESH_LOCK_TIMEOUT = float(os.environ.get('REFRESH_LOCK_TIMEOUT', 60)) # Seconds to wait before refreshing anyway
+REFRESH_LOCK_POLL = 0.2
+
+_flight = SingleFlight()
+
+def _advisory_key(symbol):
+    """Signed 64-bit lock id for the symbol (pg_advisory_lock takes a bigint)."""
+    return int.from_bytes(hashlib.sha1(f"stock_refresh:{symbol}".encode()).digest()[:8], 'big', signed=True)
+
+@contextmanager
+def _advisory_lock(symbol):
+    """Hold a Postgres advisory lock for the symbol on a dedicated connection. Yields True if we had to wait."""
+    if not REFRESH_ADVISORY_LOCK or db.engine.dialect.name != 'postgresql':
+        yield False
+        return
+
+    key = _advisory_key(symbol)
+    with db.engine.connect() as conn:
+        waited = False
+        deadline = time.monotonic() + REFRESH_LOCK_TIMEOUT
+        acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {'key': key}).scalar()
+        while not acquired and time.monotonic() < deadline:
+            waited = True
+            time.sleep(REFRESH_LOCK_POLL)
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {'key': key}).scalar()
+        if not acquired:
+            print(f"[REFRESH LOCK] Timed out waiting for {symbol} after {REFRESH_LOCK_TIMEOUT}s, refreshing anyway.")
+        try:
+            yield waited
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': key})
+                conn.commit()
+
+def _refresh(symbol, months, market, still_needed):
+    with _advisory_lock(symbol) as waited:
+        if waited:
+            # Another worker held the lock, so it probably just stored this symbol
+            response_cache.invalidate_watermark(symbol)
+            if still_needed is not None and not still_needed():
+                print(f"[REFRESH] {symbol} was refreshed by another worker, skipping fetch.")
+                return {'symbol': symbol, 'success': True, 'message': f"{symbol} was refreshed by another worker.",
+                        'inserted': 0, 'updated': 0, 'mode': 'skipped'}
+        return data_services.sync_stock(symbol, months=months, market=market)
+
+def refresh_stock(formatted_symbol, months=18, market='US', still_needed=None):
+    """
+    Incremental sync of `formatted_symbol` for at least `months`, shared by every concurrent caller.
+    `still_needed()` (optional) is re-checked after waiting on another process's lock; returning
+    False skips the fetch. Returns the sync_stock result dict plus 'coalesced' (True for waiters).
+    """
+    def run():
+        return months, _refresh(formatted_symbol, months, market, still_needed)
+
+    (leader_months, result), shared = _flight.do((formatted_symbol, market), run)
+    if shared and leader_months < months:
+        # The refresh we waited on covered a shorter window; ours now only fetches what is still missing
+        (leader_months, result), shared = _flight.do((formatted_symbol, market), run)
+
+    if shared:
+        metrics.increment('stockwave_refresh_coalesced_total')
+        print(f"[REFRESH] Joined in-flight refresh of {formatted_symbol}.")
+    return {**result, 'coalesced': shared}
@@ -0,0 +1,167 @@
+import gzip
+import hashlib
+import os
+import threading
+from datetime import datetime, timezone
+
+from flask import Response
+from sqlalchemy import func
+
+from database import db
+from models.stock_data import StockData
+from services import metrics
+from services.cache import TTLCache
+
+try:
+    import brotli # Optional: 'br' is only offered when the package is installed
+except ImportError:
+    brotli = None
+
+# Stored history changes at most when a sync writes new bars, so serialized /stock/data bodies are cached
+# per (symbol, request params, data watermark, day). The watermark itself is cached briefly and dropped
+# on every write in this process; other processes see new bars within WATERMARK_TTL.
+WATERMARK_TTL = int(os.environ.get('DATA_WATERMARK_TTL', 60))
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 256)) # Serialized bodies kept (LRU)
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_watermarks = TTLCache('data_watermarks', maxsize=4096, ttl=WATERMARK_TTL)
+_bodies = TTLCache('data_responses', maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+# --- Data watermark ---
+@metrics.timed(metrics.DB_READ)
+def _load_watermark(symbol):
+    updated_at, latest_date, count = db.session.query(
+        func.max(StockData.updated_at), func.max(StockData.date), func.count(StockData.id)
+    ).filter(StockData.company_symbol == symbol).one()
+    if not count:
+        return None
+    return {'updated_at': updated_at, 'latest_date': latest_date, 'count': count}
+
+def get_data_watermark(symbol):
+    """Latest updated_at, latest bar date and row count for the symbol's stored bars (None if none)."""
+    return _watermarks.get_or_load(symbol, lambda: _load_watermark(symbol))
+
+def invalidate_watermark(symbol):
+    _watermarks.invalidate(symbol)
+
+# --- Cached bodies ---
+class CachedResponse:
+    """A serialized JSON body with its validators and lazily built compressed variants."""
+
+    def __init__(self, body, etag, last_modified):
+        self.body = body
+        self.etag = etag # Opaque tag without quotes; each content-coding gets its own suffix
+        self.last_modified = last_modified
+        self._encoded = {'identity': body}
+        self._lock = threading.Lock()
+
+    def encoded(self, coding):
+        with self._lock:
+            if coding not in self._encoded:
+                with metrics.phase(metrics.SERIALIZATION):
+                    self._encoded[coding] = self._compress(coding)
+            return self._encoded[coding]
+
+    def _compress(self, coding):
+        if coding == 'br':
+            return brotli.compress(self.body, quality=BROTLI_QUALITY)
+        return gzip.compress(self.body, compresslevel=GZIP_LEVEL)
+
+def _last_modified(watermark):
+    # Statistics windows end "today", so a body is never older than the start of the current day
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    updated_at = watermark['updated_at']
+    if updated_at is None:
+        return today
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc) # Stored with datetime.utcnow
+    return max(updated_at, today).replace(microsecond=0)
+
+def _etag(key, watermark):
+    stamp = f"{key}|{watermark['updated_at']}|{watermark['latest_date']}|{watermark['count']}|{datetime.now(timezone.utc).date()}"
+    return hashlib.sha1(stamp.encode()).hexdigest()
+
+def lookup(key, watermark):
+    """Cached body for these request params at this watermark, or None."""
+    if watermark is None:
+        return None
+    entry = _bodies.get(key)
+    if entry is None or entry.etag != _etag(key, watermark):
+        return None
+    return entry
+
+def store(key, watermark, body):
+    """Cache a freshly serialized body; returns the entry (or None when there is no watermark to key it on)."""
+    if watermark is None:
+        return None
+    entry = CachedResponse(body, _etag(key, watermark), _last_modified(watermark))
+    _bodies.set(key, entry)
+    return entry
+
+def validators(key, watermark):
+    """(etag, last_modified) a response for these params at this watermark would carry, without building it."""
+    if watermark is None:
+        return None, None
+    return _etag(key, watermark), _last_modified(watermark)
+
+# --- HTTP ---
+def _choose_coding(accept_encoding, size):
+    if size < COMPRESS_MIN_BYTES:
+        return 'identity'
+    accepted = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return 'identity'
+
+def _tag(etag, coding):
+    return f'"{etag}"' if coding == 'identity' else f'"{etag}-{coding}"'
+
+def _matching_tag(request, etag):
+    """The If-None-Match tag naming one of our coding variants (or '*'), else None."""
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return None
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    if '*' in tags:
+        return _tag(etag, 'identity')
+    return next((_tag(etag, coding) for coding in ('identity', 'gzip', 'br') if _tag(etag, coding) in tags), None)
+
+def is_not_modified(request, etag, last_modified):
+    """If-None-Match takes precedence over If-Modified-Since, as in RFC 9110."""
+    if etag is None:
+        return False
+    if request.headers.get('If-None-Match'):
+        return _matching_tag(request, etag) is not None
+    if_modified_since = request.if_modified_since
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+def _headers(response, tag, last_modified):
+    response.headers['ETag'] = tag
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache' # Always revalidate; unchanged data costs a 304
+    response.vary.add('Accept-Encoding')
+    return response
+
+def not_modified_response(request, etag, last_modified):
+    metrics.increment('stockwave_http_not_modified_total')
+    tag = _matching_tag(request, etag) or _tag(etag, _choose_coding(request.headers.get('Accept-Encoding'), COMPRESS_MIN_BYTES))
+    return _headers(Response(status=304), tag, last_modified)
+
+def make_response(request, entry):
+    """200 with the cached body in the best content-coding the client accepts, or 304 if it is current."""
+    if is_not_modified(request, entry.etag, entry.last_modified):
+        return not_modified_response(request, entry.etag, entry.last_modified)
+
+    coding = _choose_coding(request.headers.get('Accept-Encoding'), len(entry.body))
+    response = Response(entry.encoded(coding), status=200, mimetype='application/json')
+    if coding != 'identity':
+        response.headers['Content-Encoding'] = coding
+    return _headers(response, _tag(entry.etag, coding), entry.last_modified)
+
+def stats():
+    return {'watermarks': _watermarks.stats(), 'responses': _bodies.stats()}
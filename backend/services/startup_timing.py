@@ -0,0 +1,30 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Wall-clock phases of process start-up (imports, table creation, background warm-up), in the order they finished
+_phases = []
+_lock = threading.Lock()
+_started = time.perf_counter()
+
+def record(name, seconds):
+    with _lock:
+        _phases.append({'phase': name, 'seconds': round(seconds, 3)})
+
+@contextmanager
+def phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+def report(label='STARTUP'):
+    """Print every recorded phase and the total since this module was imported; returns the same data."""
+    with _lock:
+        phases = list(_phases)
+    total = time.perf_counter() - _started
+    for entry in phases:
+        print(f"[{label}] {entry['phase']:<32} {entry['seconds']:>8.3f}s")
+    print(f"[{label}] {'total':<32} {total:>8.3f}s")
+    return {'phases': phases, 'total_seconds': round(total, 3)}
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+# Column-oriented OHLCV bundle shared by the stats engine and its callers:
+# {'date': datetime64[D] array, 'open'/'high'/'low'/'close': float arrays, 'volume': float array}, oldest first.
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+def ohlcv_from_rows(rows):
+    """Build an OHLCV bundle from (date, open, high, low, close, volume) tuples in chronological order."""
+    if not rows:
+        return None
+    dates, opens, highs, lows, closes, volumes = zip(*rows)
+    return {
+        'date': np.array(dates, dtype='datetime64[D]'),
+        'open': np.array(opens, dtype=float),
+        'high': np.array(highs, dtype=float),
+        'low': np.array(lows, dtype=float),
+        'close': np.array(closes, dtype=float),
+        'volume': np.nan_to_num(np.array(volumes, dtype=float)),
+    }
+
+def ohlcv_from_frame(df):
+    """Build an OHLCV bundle from a yfinance history DataFrame."""
+    if df is None or df.empty:
+        return None
+    df = df.sort_index()
+    return {
+        'date': np.array(pd.DatetimeIndex(df.index).date, dtype='datetime64[D]'),
+        'open': df['Open'].to_numpy(dtype=float),
+        'high': df['High'].to_numpy(dtype=float),
+        'low': df['Low'].to_numpy(dtype=float),
+        'close': df['Close'].to_numpy(dtype=float),
+        'volume': np.nan_to_num(df['Volume'].to_numpy(dtype=float)),
+    }
+
+def _daily_changes(closes):
+    """Close-to-close % change for bars 1..n-1; a zero previous close counts as a 0% change."""
+    prev = closes[:-1]
+    diff = closes[1:] - prev
+    with np.errstate(divide='ignore', invalid='ignore'):
+        changes = np.where(prev != 0, diff / prev * 100, 0.0)
+    return changes
+
+def _summarize(ohlcv, lo, hi, changes):
+    """Statistics for bars [lo, hi) given the full-series daily changes (changes[i] is bar i+1 vs bar i)."""
+    count = hi - lo
+    if count <= 0:
+        return None
+
+    current_price = float(ohlcv['close'][hi - 1])
+    opening_price = float(ohlcv['open'][hi - 1])
+    volumes = ohlcv['volume'][lo:hi]
+    window_changes = changes[lo:hi - 1] # Only changes between bars that are both inside the window
+    n_changes = len(window_changes)
+    positive_days = int(np.count_nonzero(window_changes > 0))
+    negative_days = int(np.count_nonzero(window_changes < 0))
+
+    price_stats = {}
+    if not np.isnan(current_price):
+        has_open = not np.isnan(opening_price)
+        price_stats = {
+            'open': opening_price if has_open else None,
+            'current': current_price,
+            'highest': float(np.nanmax(ohlcv['high'][lo:hi])),
+            'lowest': float(np.nanmin(ohlcv['low'][lo:hi])),
+            'change_value': round(current_price - opening_price, 2) if has_open else 0,
+            'change_percent': round(((current_price - opening_price) / opening_price) * 100, 2) if has_open and opening_price != 0 else 0
+        }
+    else:
+        current_price = None
+
+    return {
+        'period_days': int(count), # Actual number of days for which stats are calculated
+        'current_price': current_price,
+        'opening_price': opening_price if not np.isnan(opening_price) else None,
+        'price_stats': price_stats,
+        'volume_stats': {
+            'average': int(volumes.sum() / count),
+            'highest': int(volumes.max()),
+            'total': int(volumes.sum())
+        },
+        'performance_stats': {
+            'positive_days': positive_days,
+            'negative_days': negative_days,
+            'positive_ratio': round(positive_days / n_changes * 100, 1) if n_changes else 0,
+            'avg_daily_change': round(float(window_changes.sum()) / n_changes, 2) if n_changes else 0
+        }
+    }
+
+def compute_statistics(ohlcv):
+    """Statistics over every bar in the bundle (same keys as data_services.get_stock_statistics)."""
+    if not ohlcv or len(ohlcv['close']) == 0:
+        return None
+    changes = _daily_changes(ohlcv['close'])
+    return _summarize(ohlcv, 0, len(ohlcv['close']), changes)
+
+def compute_window_statistics(ohlcv, windows, end_date):
+    """
+    Statistics for several trailing calendar windows in one pass over the bundle.
+    Window `w` covers bars dated in [end_date - w days, end_date], like get_stock_statistics(days=w).
+    Returns {w: stats or None}.
+    """
+    if not ohlcv or len(ohlcv['close']) == 0:
+        return {w: None for w in windows}
+
+    dates = ohlcv['date']
+    changes = _daily_changes(ohlcv['close']) # Computed once, sliced per window
+    end = np.datetime64(end_date, 'D')
+    hi = int(np.searchsorted(dates, end, side='right'))
+    starts = np.array([end_date - timedelta(days=w) for w in windows], dtype='datetime64[D]')
+    los = np.searchsorted(dates, starts, side='left')
+
+    return {w: _summarize(ohlcv, int(lo), hi, changes) for w, lo in zip(windows, los)}
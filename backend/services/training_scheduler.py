@@ -0,0 +1,145 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from services import batch_ingest
+
+# Each worker trains one model at a time with a fixed TensorFlow thread budget; workers = cores // threads,
+# so a many-core box is filled without the pools oversubscribing each other.
+TRAINING_THREADS_PER_WORKER = int(os.environ.get('TRAINING_THREADS_PER_WORKER', 2))
+TRAINING_INTER_OP_THREADS = 1
+
+def default_worker_count(threads_per_worker=TRAINING_THREADS_PER_WORKER):
+    return max(1, (os.cpu_count() or 1) // max(1, threads_per_worker))
+
+# --- Worker process side ---
+def _init_worker(threads_per_worker):
+    """Pin this worker's thread pools before TensorFlow starts its runtime."""
+    for var in ('OMP_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads_per_worker)
+    os.environ['TF_NUM_INTEROP_THREADS'] = str(TRAINING_INTER_OP_THREADS)
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads_per_worker)
+    tf.config.threading.set_inter_op_parallelism_threads(TRAINING_INTER_OP_THREADS)
+
+def _train_symbol(symbol, df, horizon, model_type):
+    """Runs in a pool process: train (or warm-start) and register the model for one symbol."""
+    from services import prediction_service
+
+    started = time.perf_counter()
+    result, error_message = prediction_service.forecast_from_frame(symbol, df, horizon=horizon, model_type=model_type)
+    summary = {
+        'symbol': symbol,
+        'success': error_message is None and result is not None,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    if summary['success']:
+        summary['metrics'] = result['metrics']
+        summary['trained_at'] = result['model_trained_at']
+    else:
+        summary['message'] = error_message or "Prediction could not be generated."
+    return summary
+
+# --- Scheduler ---
+def train_batch(symbols, market='US', horizon='month', model_type='lstm', max_workers=None,
+                threads_per_worker=TRAINING_THREADS_PER_WORKER):
+    """
+    Pre-train prediction models for many symbols on a process pool. Frames are loaded from the
+    database on the calling thread (must be inside an app context); symbols with the most bars
+    are scheduled first so the slowest jobs do not start last. Returns a throughput report.
+    """
+    from services import prediction_service
+
+    if model_type not in prediction_service.MODEL_TYPES:
+        raise ValueError(f"Unknown model type '{model_type}'. Choose one of: {', '.join(prediction_service.MODEL_TYPES)}.")
+
+    batch_started = time.perf_counter()
+    threads_per_worker = max(1, threads_per_worker)
+    max_workers = max(1, max_workers or default_worker_count(threads_per_worker))
+    targets = batch_ingest._normalize_targets(symbols, market)
+    results = {}
+
+    # 1. Load every training frame (DB reads only) on the calling thread
+    frames = []
+    for symbol, _ in targets:
+        df = prediction_service.load_prediction_frame(symbol)
+        if df is None or df.empty:
+            results[symbol] = {'symbol': symbol, 'success': False, 'message': "No stored history; sync the symbol first."}
+            continue
+        frames.append((symbol, df))
+    frames.sort(key=lambda item: len(item[1]), reverse=True)
+
+    # 2. Train across the pool, collecting reports as models finish
+    if frames:
+        # spawn: TensorFlow state must never be forked from a process that has already imported it
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(frames)), mp_context=context,
+                                 initializer=_init_worker, initargs=(threads_per_worker,)) as pool:
+            futures = {pool.submit(_train_symbol, symbol, df, horizon, model_type): symbol for symbol, df in frames}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    print(f"[TRAINING SCHEDULER ERROR] Training failed for {symbol}: {e}")
+                    results[symbol] = {'symbol': symbol, 'success': False, 'message': f"Training failed: {e}"}
+                    continue
+                print(f"[TRAINING SCHEDULER] {symbol} done in {results[symbol]['seconds']}s "
+                      f"({sum(1 for r in results.values() if 'seconds' in r)}/{len(frames)}).")
+
+    ordered = [results[symbol] for symbol, _ in targets if symbol in results]
+    succeeded = sum(1 for r in ordered if r.get('success'))
+    elapsed = time.perf_counter() - batch_started
+    models_per_hour = succeeded / elapsed * 3600 if elapsed > 0 else 0
+    print(f"[TRAINING SCHEDULER] {succeeded}/{len(ordered)} models trained in {elapsed:.2f}s "
+          f"with {max_workers} workers x {threads_per_worker} threads ({models_per_hour:.1f} models/hour).")
+
+    return {
+        'requested': len(targets),
+        'succeeded': succeeded,
+        'failed': len(ordered) - succeeded,
+        'max_workers': max_workers,
+        'threads_per_worker': threads_per_worker,
+        'elapsed_seconds': round(elapsed, 3),
+        'models_per_hour': round(models_per_hour, 1),
+        'train_seconds_total': round(sum(r.get('seconds', 0) for r in ordered), 3),
+        'results': ordered
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-train prediction models for many symbols across CPU cores.")
+    parser.add_argument('symbols', nargs='*', help="Ticker symbols, e.g. AAPL MSFT or RELIANCE TCS with --market IN")
+    parser.add_argument('--file', help="Text file with one symbol per line (optionally 'SYMBOL,MARKET')")
+    parser.add_argument('--market', default='US', help="Default market for symbols without one (US or IN)")
+    parser.add_argument('--horizon', default='month', help="Forecast horizon (matters for direct models)")
+    parser.add_argument('--model', default='lstm', help="Model type: lstm or lstm_direct")
+    parser.add_argument('--threads', type=int, default=TRAINING_THREADS_PER_WORKER, help="TensorFlow threads per worker")
+    parser.add_argument('--workers', type=int, default=None, help="Training processes (default: cores // threads)")
+    parser.add_argument('--sync', action='store_true', help="Sync stored history for every symbol before training")
+    args = parser.parse_args(argv)
+
+    symbols = list(args.symbols)
+    if args.file:
+        with open(args.file) as fh:
+            for line in fh:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    symbols.append(tuple(part.strip() for part in line.split(',')))
+    if not symbols:
+        parser.error("No symbols given.")
+
+    from app import app # Imported lazily so the module can be used without creating the Flask app
+    with app.app_context():
+        if args.sync:
+            batch_ingest.ingest_batch(symbols, market=args.market)
+        report = train_batch(symbols, market=args.market, horizon=args.horizon, model_type=args.model,
+                             max_workers=args.workers, threads_per_worker=args.threads)
+    print(json.dumps(report, indent=2, default=str))
+    return 0 if report['failed'] == 0 else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
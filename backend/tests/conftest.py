@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Offline, throwaway environment for the whole run; set before the app and its config are imported
+_workdir = tempfile.mkdtemp(prefix='stockwave-tests-')
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(_workdir, 'test.db')}",
+    'MARKET_DATA_PROVIDER': 'local',
+    'MARKET_DATA_SEED': '0',
+    'MARKET_DATA_END_DATE': '2024-06-28',
+    'MODEL_REGISTRY_DIR': os.path.join(_workdir, 'models'),
+    'REQUEST_LOG': '0',
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app # noqa: E402
+from database import db # noqa: E402
+from services import market_data # noqa: E402
+
+# Tests share one database, so each test uses its own symbols
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        yield flask_app
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def provider():
+    """The local provider the services are using (synthetic bars through 2024-06-28)."""
+    return market_data.get_provider()
+
+def history(symbol, end_date, period='3mo'):
+    """Synthetic bars for `symbol` as the local provider would return them on `end_date`."""
+    return market_data.LocalProvider(end_date=end_date).get_history(symbol, period=period)
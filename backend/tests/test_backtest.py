@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from conftest import history
+from models.backtest_result import BacktestResult
+from services import backtest, data_services, fast_forecasters
+
+STEPS = 7
+
+@pytest.fixture
+def frame(app):
+    data_services.store_stock_frame('BTA', history('BTA', '2024-06-28', period='48mo'))
+    return backtest.load_backtest_frame('BTA')
+
+def _scrambled(df, k, seed=1):
+    """`df` with every numeric value from row `k` on replaced, as if the future had gone differently."""
+    shocked = df.copy()
+    numeric = shocked.columns.drop('date')
+    rng = np.random.default_rng(seed)
+    shocked.loc[k:, numeric] = shocked.loc[k:, numeric].to_numpy() * rng.uniform(0.7, 1.3, (len(df) - k, len(numeric)))
+    return shocked
+
+def test_forecast_origins():
+    origins = backtest.forecast_origins(400, STEPS, train_window=360, origin_step=5)
+    np.testing.assert_array_equal(origins, [360, 365, 370, 375, 380, 385, 390])
+    assert origins[-1] + STEPS <= 400 # Every origin has all of its actual bars
+    assert len(backtest.forecast_origins(360 + STEPS - 1, STEPS, train_window=360)) == 0
+
+def test_walk_forward_lines_up_with_the_bars(frame):
+    origins, predicted, actual = backtest.walk_forward(frame, 'ridge', STEPS)
+    closes = frame['close'].to_numpy()
+    assert predicted.shape == actual.shape == (len(origins), STEPS)
+    for i, o in enumerate(origins):
+        np.testing.assert_array_equal(actual[i], closes[o:o + STEPS])
+
+    # Each forecast is the forecaster run on exactly the train window before its origin
+    split_idx = int(backtest.BACKTEST_TRAIN_WINDOW * fast_forecasters.FAST_TRAIN_SPLIT)
+    for i in (0, len(origins) // 2, len(origins) - 1):
+        o = origins[i]
+        expected = fast_forecasters.FORECASTERS['ridge'](frame.iloc[o - backtest.BACKTEST_TRAIN_WINDOW:o], STEPS, split_idx)[0]
+        np.testing.assert_allclose(predicted[i], expected)
+
+@pytest.mark.parametrize('model_type', list(fast_forecasters.FORECASTERS))
+def test_walk_forward_has_no_lookahead(frame, model_type):
+    origins, predicted, _ = backtest.walk_forward(frame, model_type, STEPS)
+    k = int(origins[len(origins) // 2])
+    shocked_origins, shocked, _ = backtest.walk_forward(_scrambled(frame, k), model_type, STEPS)
+    np.testing.assert_array_equal(shocked_origins, origins)
+    np.testing.assert_allclose(shocked[origins <= k], predicted[origins <= k])
+    assert not np.allclose(shocked[origins > k], predicted[origins > k])
+
+def test_positions_are_decided_on_earlier_bars(frame):
+    origins, predicted, _ = backtest.walk_forward(frame, 'ridge', STEPS)
+    positions = backtest.strategy_positions(frame, predicted, origins, STEPS, backtest.BACKTEST_ORIGIN_STEP, 'ridge')
+
+    k = int(origins[len(origins) // 2]) + 2
+    shocked_frame = _scrambled(frame, k)
+    shocked_origins, shocked_predicted, _ = backtest.walk_forward(shocked_frame, 'ridge', STEPS)
+    shocked = backtest.strategy_positions(shocked_frame, shocked_predicted, shocked_origins, STEPS,
+                                          backtest.BACKTEST_ORIGIN_STEP, 'ridge')
+    for name, position in positions.items():
+        # The position held over bar k's return was taken at bar k - 1's close
+        np.testing.assert_array_equal(shocked[name][:k + 1], position[:k + 1], err_msg=name)
+
+def test_forecast_position_follows_each_forecast(frame):
+    origins, predicted, _ = backtest.walk_forward(frame, 'ridge', STEPS)
+    step = backtest.BACKTEST_ORIGIN_STEP
+    position = backtest.strategy_positions(frame, predicted, origins, STEPS, step, 'ridge')['forecast_ridge']
+    closes = frame['close'].to_numpy()
+
+    assert not position[:origins[0]].any()
+    for i, o in enumerate(origins):
+        up = predicted[i, step - 1] > closes[o - 1]
+        assert (position[o:o + step] == up).all()
+
+def test_equity_curve():
+    closes = np.array([100.0, 100.0, 110.0, 99.0, 99.0])
+    flat, flat_stats = backtest.equity_curve(closes, np.zeros(5), 1)
+    np.testing.assert_array_equal(flat, np.ones(4))
+    assert flat_stats['trades'] == 0 and flat_stats['total_return'] == 0
+
+    equity, stats = backtest.equity_curve(closes, np.array([0.0, 0.0, 1.0, 1.0, 0.0]), 1)
+    cost = backtest.TRANSACTION_COST
+    np.testing.assert_allclose(equity, np.cumprod([1.0, 1 + 0.1 - cost, 1 - 0.1, 1 - cost]))
+    assert stats['trades'] == 2
+    assert stats['exposure'] == 0.5
+    assert stats['max_drawdown'] == pytest.approx(equity[3] / equity[1] - 1)
+
+def test_required_history_covers_min_origins():
+    for steps in (1, 7, 30, 90):
+        bars, months = backtest.required_history(steps)
+        frame_bars = bars - backtest.WARMUP_BARS
+        assert len(backtest.forecast_origins(frame_bars, steps)) == backtest.BACKTEST_MIN_ORIGINS
+        assert months * backtest.TRADING_DAYS_PER_MONTH > bars
+
+@pytest.mark.parametrize('horizon', ['day', 'week', 'month'])
+def test_route_fetches_enough_history_from_an_empty_db(client, horizon):
+    symbol = f'BTE{horizon.upper()}'
+    assert data_services.get_stored_stock_data(company_symbol=symbol, limit=1) == []
+    response = client.get(f'/stock/backtest/{symbol}?model=ridge&horizon={horizon}&curves=0')
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['backtest']['metrics']['origins'] >= backtest.BACKTEST_MIN_ORIGINS
+
+def test_route_reports_on_get_and_stores_on_post(client):
+    assert client.get('/stock/backtest/BTR?model=lstm').status_code == 400
+    assert client.get('/stock/backtest/BTR?horizon=decade').status_code == 400
+
+    response = client.get('/stock/backtest/BTR?model=drift&horizon=week&curves=0')
+    assert response.status_code == 200
+    body = response.get_json()['backtest']
+    assert body['steps'] == STEPS and 'equity_curves' not in body
+    assert BacktestResult.query.filter_by(company_symbol='BTR').count() == 0
+
+    assert client.post('/stock/backtest/BTR?model=drift&horizon=week').status_code == 200
+    row = BacktestResult.query.filter_by(company_symbol='BTR').one()
+    assert (row.model_type, row.horizon_steps, row.hit_rate) == ('drift', STEPS, body['metrics']['hit_rate'])
+
+def test_stored_backtest_becomes_prediction_confidence(client):
+    assert client.post('/stock/backtest/BTC?model=ridge&horizon=week').status_code == 200
+    prediction = client.get('/stock/predict/BTC?model=ridge&horizon=week').get_json()['prediction']
+    row = BacktestResult.query.filter_by(company_symbol='BTC', model_type='ridge').one()
+    assert prediction['confidence_source'] == 'backtest'
+    assert prediction['confidence'] == round(row.hit_rate, 4)
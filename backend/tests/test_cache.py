@@ -0,0 +1,98 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services import cache
+
+def _fake_clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+def _run_concurrently(target, n):
+    results, errors = [None] * n, [None] * n
+    def call(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+def test_lru_evicts_the_least_recently_used():
+    c = cache.TTLCache('test_lru', maxsize=3)
+    for key in 'abc':
+        c.set(key, key.upper())
+    assert c.get('a') == 'A' # 'b' is now the least recently used
+    c.set('d', 'D')
+    assert c.get('b') is None
+    assert [c.get(key) for key in 'acd'] == ['A', 'C', 'D']
+    c.set('c', 'C2') # Overwriting refreshes recency too
+    c.set('e', 'E')
+    assert c.get('a') is None and c.get('c') == 'C2'
+    assert len(c) == 3 and c.stats()['evictions'] == 2
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = _fake_clock(monkeypatch)
+    c = cache.TTLCache('test_ttl', ttl=60)
+    c.set('default', 1)
+    c.set('short', 2, ttl=5)
+    now[0] += 5
+    assert c.get('short') is None
+    assert c.get('default') == 1
+    now[0] += 55
+    assert c.get('default', 'gone') == 'gone'
+    assert len(c) == 0
+    assert (c.stats()['hits'], c.stats()['misses']) == (1, 2)
+
+def test_concurrent_misses_share_one_load():
+    c = cache.TTLCache('test_flight')
+    release, calls = threading.Event(), []
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+
+    threads, results, errors = _run_concurrently(lambda: c.get_or_load('k', loader), 8)
+    time.sleep(0.1) # Every caller is now waiting on the first one's load
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == ['value'] * 8 and errors == [None] * 8
+    assert c.get_or_load('k', loader) == 'value' and calls == [1] # Cached afterwards
+
+def test_loader_error_reaches_every_waiter_and_is_not_cached():
+    c = cache.TTLCache('test_flight_error')
+    release, calls = threading.Event(), []
+    def failing():
+        calls.append(1)
+        release.wait(5)
+        raise ValueError('upstream down')
+
+    threads, results, errors = _run_concurrently(lambda: c.get_or_load('k', failing), 5)
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert all(isinstance(e, ValueError) and str(e) == 'upstream down' for e in errors)
+    assert len(c) == 0
+    assert c.get_or_load('k', lambda: 'recovered') == 'recovered' # The next miss loads again
+
+def test_single_flight_reports_shared_callers():
+    flight = cache.SingleFlight()
+    release = threading.Event()
+    threads, results, _ = _run_concurrently(lambda: flight.do('k', lambda: release.wait(5) and 42), 4)
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert {value for value, _ in results} == {42}
+    with pytest.raises(KeyError):
+        flight.do('k', lambda: {}['missing']) # Runs again once the first call has finished
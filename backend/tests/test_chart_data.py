@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import history
+from services import chart_data, stats_engine
+
+def _ohlcv(period='2y'):
+    return stats_engine.ohlcv_from_frame(history('CHARTA', '2024-06-28', period=period))
+
+# --- Formats ---
+def test_columnar_and_records_hold_the_same_bars():
+    ohlcv = _ohlcv('3mo')
+    columns = chart_data.to_columnar(ohlcv)
+    records = chart_data.to_records(ohlcv)
+    assert len(records) == len(columns['dates']) == chart_data.bar_count(ohlcv)
+    assert records[-1] == {key: columns[name][-1] for key, name in (
+        ('date', 'dates'), ('open', 'open'), ('high', 'high'), ('low', 'low'), ('close', 'close'), ('volume', 'volume'))}
+    assert columns['dates'][-1] == '2024-06-28'
+
+def test_epoch_day_dates():
+    dates = chart_data.to_columnar(_ohlcv('1mo'), date_format='epoch_day')['dates']
+    assert dates[-1] == (pd.Timestamp('2024-06-28') - pd.Timestamp('1970-01-01')).days
+
+def test_missing_prices_become_null():
+    ohlcv = _ohlcv('1mo')
+    ohlcv['open'][0] = np.nan
+    assert chart_data.to_columnar(ohlcv)['open'][0] is None
+
+def test_stock_data_formats(client):
+    records = client.get('/stock/data/CHARTB?limit=60').get_json()['data']['records']
+    columns = client.get('/stock/data/CHARTB?limit=60&format=columnar').get_json()['data']['columns']
+    assert [r['close'] for r in records] == columns['close']
+    assert client.get('/stock/data/CHARTB?format=csv').status_code == 400
+
+# --- Candles ---
+def test_short_ranges_are_not_aggregated():
+    ohlcv = _ohlcv('1mo')
+    assert chart_data.aggregate_candles(ohlcv, 100) is ohlcv
+
+def test_weekly_candles_match_a_pandas_resample():
+    ohlcv = _ohlcv('1y')
+    candles = chart_data.aggregate_candles(ohlcv, 60)
+    frame = pd.DataFrame({k: v for k, v in ohlcv.items() if k != 'date'}, index=pd.DatetimeIndex(ohlcv['date']))
+    weekly = frame.resample('W-SUN').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}).dropna()
+
+    assert chart_data.bar_count(candles) == len(weekly) <= 60
+    for key in ('open', 'high', 'low', 'close', 'volume'):
+        np.testing.assert_allclose(candles[key], weekly[key].to_numpy())
+    # Each candle is dated by its first bar, the Monday-or-later trading day of its week
+    assert (pd.DatetimeIndex(candles['date']).to_period('W-SUN') == weekly.index.to_period('W-SUN')).all()
+
+def test_candles_coarsen_until_they_fit():
+    ohlcv = _ohlcv('max')
+    for max_points in (200, 40, 12):
+        candles = chart_data.aggregate_candles(ohlcv, max_points)
+        assert chart_data.bar_count(candles) <= max_points
+        assert candles['high'].max() == ohlcv['high'].max()
+        assert candles['volume'].sum() == ohlcv['volume'].sum()
+
+@pytest.mark.parametrize('max_points', [9, 5, 3, 1])
+def test_candles_never_exceed_small_max_points(max_points):
+    ohlcv = _ohlcv('max') # Over 9 years, more than 12-month candles can fit
+    candles = chart_data.aggregate_candles(ohlcv, max_points)
+    assert 1 <= chart_data.bar_count(candles) <= max_points
+    assert candles['volume'].sum() == ohlcv['volume'].sum()
+    assert candles['close'][-1] == ohlcv['close'][-1]
+
+# --- LTTB ---
+def _reference_lttb(y, threshold):
+    """Textbook Largest-Triangle-Three-Buckets (Steinarsson, 2013) over x = 0..n-1."""
+    n = len(y)
+    every = (n - 2) / (threshold - 2)
+    selected, a = [0], 0
+    for i in range(threshold - 2):
+        next_start, next_end = int((i + 1) * every) + 1, min(int((i + 2) * every) + 1, n)
+        if i == threshold - 3:
+            avg_x, avg_y = n - 1, y[-1]
+        else:
+            avg_x, avg_y = np.arange(next_start, next_end).mean(), y[next_start:next_end].mean()
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        area = [abs((a - avg_x) * (y[j] - y[a]) - (a - j) * (avg_y - y[a])) for j in range(start, end)]
+        a = start + int(np.argmax(area))
+        selected.append(a)
+    return selected + [n - 1]
+
+@pytest.mark.parametrize('n, threshold', [(500, 50), (1000, 3), (257, 100), (5000, 700)])
+def test_lttb_matches_the_reference(n, threshold):
+    y = np.cumsum(np.random.default_rng(n).normal(size=n))
+    np.testing.assert_array_equal(chart_data.lttb_indices(y, threshold), _reference_lttb(y, threshold))
+
+def test_lttb_keeps_short_series():
+    np.testing.assert_array_equal(chart_data.lttb_indices(np.arange(10.0), 20), np.arange(10))
+
+def test_selected_points_include_the_extremes():
+    ohlcv = _ohlcv('2y')
+    points = chart_data.select_points(ohlcv, 50)
+    assert chart_data.bar_count(points) <= 50
+    assert points['date'][0] == ohlcv['date'][0] and points['date'][-1] == ohlcv['date'][-1]
+    assert points['high'].max() == ohlcv['high'].max()
+    assert points['low'].min() == ohlcv['low'].min()
+    assert (np.diff(points['date'].astype('int64')) > 0).all()
+
+@pytest.mark.parametrize('max_points', [3, 4, 5, 10])
+def test_selected_points_never_exceed_small_max_points(max_points):
+    ohlcv = _ohlcv('2y')
+    points = chart_data.select_points(ohlcv, max_points)
+    assert chart_data.bar_count(points) <= max_points
+    assert points['date'][0] == ohlcv['date'][0] and points['date'][-1] == ohlcv['date'][-1]
+    assert points['high'].max() == ohlcv['high'].max()
+    if max_points >= 4:
+        assert points['low'].min() == ohlcv['low'].min()
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from conftest import history
+from services import fast_forecasters, prediction_service
+
+def _raw(symbol):
+    df = history(symbol, '2024-06-28', period='18mo').reset_index()
+    df.columns = [c.lower() for c in df.columns]
+    return df
+
+def _frame(symbol='FASTA', raw=None):
+    raw = _raw(symbol) if raw is None else raw
+    return prediction_service.add_prediction_features(raw.copy()).dropna().reset_index(drop=True)
+
+@pytest.mark.parametrize('model_type', list(fast_forecasters.FORECASTERS))
+def test_hold_out_lines_up_with_the_test_bars(model_type):
+    df = _frame()
+    split_idx = int(len(df) * fast_forecasters.FAST_TRAIN_SPLIT)
+    forecast, hold_out = fast_forecasters.FORECASTERS[model_type](df, 7, split_idx)
+    assert forecast.shape == (7,)
+    assert hold_out.shape == (len(df) - split_idx,)
+    # Each hold-out value predicts the bar at the same position, so errors stay small relative to price
+    closes = df['close'].to_numpy()[split_idx:]
+    assert np.mean(np.abs(hold_out - closes) / closes) < 0.05
+
+@pytest.mark.parametrize('model_type', list(fast_forecasters.FORECASTERS))
+def test_hold_out_only_sees_earlier_bars(model_type):
+    df = _frame()
+    split_idx = int(len(df) * fast_forecasters.FAST_TRAIN_SPLIT)
+    _, hold_out = fast_forecasters.FORECASTERS[model_type](df, 7, split_idx)
+
+    # Moving bar `changed` must not change any hold-out prediction up to and including the one for that bar
+    changed = split_idx + 10
+    raw = _raw('FASTA')
+    raw.loc[raw['date'] >= df['date'].iloc[changed], ['open', 'high', 'low', 'close']] *= 1.3
+    shocked = _frame(raw=raw)
+    _, shocked_hold_out = fast_forecasters.FORECASTERS[model_type](shocked, 7, split_idx)
+    np.testing.assert_allclose(shocked_hold_out[:changed - split_idx + 1], hold_out[:changed - split_idx + 1])
+    assert not np.allclose(shocked_hold_out, hold_out)
+
+def test_drift_forecast_continues_from_the_last_close():
+    df = _frame('FASTB')
+    closes = df['close'].to_numpy()
+    forecast, _ = fast_forecasters.forecast_drift(df, 3, int(len(df) * 0.8))
+    slope = (closes[-1] - closes[0]) / (len(closes) - 1)
+    np.testing.assert_allclose(forecast, closes[-1] + slope * np.arange(1, 4))
+
+@pytest.mark.parametrize('model_type', list(fast_forecasters.FORECASTERS))
+def test_forecast_result_schema(model_type):
+    df = _frame('FASTC')
+    result, error = prediction_service.forecast_from_frame('FASTC', df, horizon='week', model_type=model_type)
+    assert error is None
+    assert len(result['close_series']) == prediction_service.HORIZON_STEPS['week']
+    assert {'rmse', 'mae', 'r2', 'mape'} <= set(result['metrics'])
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from conftest import history
+from services import chart_data, data_services, indicators, market_data
+
+SPECS = ['sma_20', 'ema_50', 'rsi_14', 'macd', 'bb_20', 'atr_14', 'vwap_20', 'return']
+
+def _bars(symbol, end_date, since=None):
+    df = history(symbol, end_date, period='12mo')
+    return df if since is None else df[df.index >= pd.Timestamp(since)]
+
+def _assert_matches_full_recompute(symbol, ohlcv, columns):
+    full = chart_data.load_chart_ohlcv(symbol)
+    np.testing.assert_array_equal(ohlcv['date'], full['date'])
+    expected = indicators.compute(full, SPECS)
+    for name in indicators.output_columns(SPECS):
+        np.testing.assert_allclose(columns[name], expected[name], rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=name)
+
+def test_incremental_sync_extends_the_cached_set(app, monkeypatch):
+    data_services.store_stock_frame('INDA', history('INDA', '2024-03-28', period='24mo'))
+    indicators.get_indicators('INDA', SPECS)
+    feature_set = indicators._features.get('INDA')
+
+    rebuilds = []
+    rebuild = indicators.FeatureSet._rebuild
+    monkeypatch.setattr(indicators.FeatureSet, '_rebuild', lambda self, wm: rebuilds.append(wm) or rebuild(self, wm))
+    for end_date in ('2024-04-05', '2024-04-08', '2024-05-17'):
+        bars = chart_data.bar_count(feature_set.ohlcv)
+        monkeypatch.setattr(market_data, '_provider', market_data.LocalProvider(end_date=end_date))
+        result = data_services.sync_stock('INDA', months=18)
+        # The real overlap: SYNC_OVERLAP_DAYS stored bars are fetched and upserted again
+        assert result['mode'] == 'incremental'
+        assert result['updated'] == data_services.SYNC_OVERLAP_DAYS
+
+        ohlcv, columns = indicators.get_indicators('INDA', SPECS)
+        assert indicators._features.get('INDA') is feature_set
+        assert chart_data.bar_count(feature_set.ohlcv) == bars + result['inserted']
+        _assert_matches_full_recompute('INDA', ohlcv, columns)
+    assert rebuilds == []
+
+def test_revised_history_is_recomputed(app):
+    data_services.store_stock_frame('INDB', _bars('INDB', '2024-04-26'))
+    indicators.get_indicators('INDB', SPECS)
+
+    revised = _bars('INDB', '2024-05-10').iloc[-30:].copy()
+    revised['Close'] *= 1.02
+    result = data_services.store_stock_frame('INDB', revised)
+    assert result['updated'] > 1
+    ohlcv, columns = indicators.get_indicators('INDB', SPECS)
+    _assert_matches_full_recompute('INDB', ohlcv, columns)
+
+def test_specs_added_later_and_limit(app):
+    data_services.store_stock_frame('INDC', _bars('INDC', '2024-04-26'))
+    indicators.get_indicators('INDC', ['sma_20'])
+    ohlcv, columns = indicators.get_indicators('INDC', SPECS, limit=30)
+
+    full = chart_data.load_chart_ohlcv('INDC')
+    expected = indicators.compute(full, SPECS)
+    assert len(ohlcv['date']) == 30
+    assert list(columns) == indicators.output_columns(SPECS)
+    for name, values in columns.items():
+        np.testing.assert_allclose(values, expected[name][-30:], rtol=1e-9, equal_nan=True, err_msg=name)
+        assert not np.isnan(values).any() # Warmed up on the bars before the window
+
+def test_parse_indicators():
+    assert indicators.parse_indicators('sma_20,ema,sma_20,macd') == (['sma_20', 'ema_20', 'macd'], None)
+    assert indicators.parse_indicators('nope_3')[0] is None
+    assert indicators.parse_indicators('sma_0')[0] is None
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from services import data_services, market_data
+
+def test_bars_do_not_depend_on_the_end_date():
+    early = market_data.LocalProvider(end_date='2024-06-28').get_history('DETA', period='max')
+    late = market_data.LocalProvider(end_date='2025-03-31').get_history('DETA', period='max')
+    pd.testing.assert_frame_equal(early, late.loc[:early.index[-1]])
+
+def test_same_seed_same_bars_other_seed_other_bars():
+    a = market_data.LocalProvider(seed=1, end_date='2024-06-28').get_history('DETB', period='1y')
+    b = market_data.LocalProvider(seed=1, end_date='2024-06-28').get_history('DETB', period='1y')
+    c = market_data.LocalProvider(seed=2, end_date='2024-06-28').get_history('DETB', period='1y')
+    pd.testing.assert_frame_equal(a, b)
+    assert not a['Close'].equals(c['Close'])
+
+def test_history_honours_period_start_and_end():
+    provider = market_data.LocalProvider(end_date='2024-06-28')
+    frame = provider.get_history('DETC', period='1mo')
+    assert frame.index[-1] == pd.Timestamp('2024-06-28')
+    assert frame.index[0] >= pd.Timestamp('2024-05-28')
+    assert provider.get_history('DETC', start='2024-06-24').index[0] == pd.Timestamp('2024-06-24')
+
+def test_synthetic_bars_are_consistent():
+    frame = market_data.LocalProvider(end_date='2024-06-28').get_history('DETD', period='2y')
+    assert (frame['High'] >= frame[['Open', 'Close']].max(axis=1)).all()
+    assert (frame['Low'] <= frame[['Open', 'Close']].min(axis=1)).all()
+    assert (frame['Volume'] > 0).all()
+
+def test_provider_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        market_data.MarketDataProvider()
+
+class _NoHistoryProvider(market_data.MarketDataProvider):
+    """No fast_info and no 2-day history, like a thinly covered ticker."""
+
+    def get_history(self, symbol, period=None, start=None, interval='1d'):
+        if interval == '1m':
+            return market_data.LocalProvider(end_date='2024-06-28').get_history(symbol, period=period, interval=interval)
+        return None
+
+def test_quote_without_two_day_history(monkeypatch):
+    monkeypatch.setattr(market_data, '_provider', _NoHistoryProvider())
+    quote = data_services._load_quote('DETE')
+    assert quote['current_price'] is not None
+    assert quote['previous_close'] is None
@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+from database import db
+from models.stock_statistics import StockStatistics
+from services import data_services, market_data
+
+def _recent_history(symbol, months=14):
+    # Trailing windows end today, so these bars must end today as well
+    return market_data.LocalProvider(end_date=date.today().isoformat()).get_history(symbol, period=f'{months}mo')
+
+def _rows(symbol):
+    return {r.window_days: r for r in StockStatistics.query.filter_by(company_symbol=symbol)}
+
+def test_store_materializes_every_window(app):
+    data_services.store_stock_frame('MATA', _recent_history('MATA'))
+    rows = _rows('MATA')
+    assert sorted(rows) == list(data_services.STANDARD_STAT_WINDOWS)
+    assert all(row.as_of == date.today() for row in rows.values())
+    assert data_services.get_stock_statistics('MATA', 30) == rows[30].stats
+
+def test_rewriting_old_bars_refreshes_only_the_windows_holding_them(app, monkeypatch):
+    df = _recent_history('MATB')
+    data_services.store_stock_frame('MATB', df)
+
+    recomputed = []
+    compute = data_services.stats_engine.compute_window_statistics
+    monkeypatch.setattr(data_services.stats_engine, 'compute_window_statistics',
+                        lambda ohlcv, windows, end_date: recomputed.append(list(windows)) or compute(ohlcv, windows, end_date))
+    old = df[df.index < pd.Timestamp(date.today() - timedelta(days=100))].iloc[-5:]
+    data_services.store_stock_frame('MATB', old)
+    assert recomputed == [[180, 365]]
+
+def test_reads_never_write(app):
+    data_services.store_stock_frame('MATC', _recent_history('MATC'))
+    StockStatistics.query.filter_by(company_symbol='MATC').update({'as_of': date.today() - timedelta(days=1)})
+    db.session.commit()
+
+    assert data_services.get_materialized_statistics('MATC', 7) == (False, None)
+    assert data_services.get_stock_statistics('MATC', 7)['period_days'] > 0 # Computed from stored bars instead
+    assert all(row.as_of == date.today() - timedelta(days=1) for row in _rows('MATC').values())
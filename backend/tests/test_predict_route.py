@@ -0,0 +1,16 @@
+from services import refresh_coordinator
+
+def test_unknown_model_is_rejected_before_any_fetch(client, monkeypatch):
+    fetches = []
+    monkeypatch.setattr(refresh_coordinator, 'refresh_stock', lambda *args, **kwargs: fetches.append(args))
+    response = client.get('/stock/predict/PRDA?model=transformer&horizon=week')
+    assert response.status_code == 400
+    assert 'transformer' in response.get_json()['message']
+    assert fetches == []
+
+def test_fast_model_prediction(client):
+    response = client.get('/stock/predict/PRDB?model=drift&horizon=week')
+    assert response.status_code == 200
+    prediction = response.get_json()['prediction']
+    assert prediction['model_type'] == 'drift'
+    assert len(prediction['close_series']) == 7
@@ -0,0 +1,61 @@
+import threading
+import time
+
+from services import data_services, refresh_coordinator
+
+def _fake_sync(calls, delay=0.2):
+    def sync_stock(symbol, months=18, market='US'):
+        calls.append(months)
+        time.sleep(delay) # Long enough for every caller to join the in-flight refresh
+        return {'symbol': symbol, 'success': True, 'message': 'ok', 'inserted': 1, 'updated': 0, 'mode': 'incremental'}
+    return sync_stock
+
+def _run_concurrently(targets):
+    results = [None] * len(targets)
+    def call(i, target):
+        results[i] = target()
+    threads = [threading.Thread(target=call, args=(i, t)) for i, t in enumerate(targets)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_refreshes_share_one_sync(monkeypatch):
+    calls = []
+    monkeypatch.setattr(data_services, 'sync_stock', _fake_sync(calls))
+    results = _run_concurrently([lambda: refresh_coordinator.refresh_stock('COALA', months=18)] * 6)
+
+    assert calls == [18]
+    assert all(r['success'] for r in results)
+    assert sorted(r['coalesced'] for r in results) == [False] + [True] * 5
+
+def test_symbols_refresh_independently(monkeypatch):
+    calls = []
+    monkeypatch.setattr(data_services, 'sync_stock', _fake_sync(calls))
+    _run_concurrently([lambda: refresh_coordinator.refresh_stock('COALB'), lambda: refresh_coordinator.refresh_stock('COALC')])
+    assert len(calls) == 2
+
+def test_longer_window_runs_again_after_a_shorter_one(monkeypatch):
+    calls = []
+    monkeypatch.setattr(data_services, 'sync_stock', _fake_sync(calls))
+    started = threading.Event()
+
+    def short():
+        started.set()
+        return refresh_coordinator.refresh_stock('COALD', months=2)
+
+    def long():
+        started.wait()
+        time.sleep(0.05) # Join while the 2-month refresh is in flight
+        return refresh_coordinator.refresh_stock('COALD', months=18)
+
+    _run_concurrently([short, long])
+    assert calls == [2, 18]
+
+def test_sequential_refreshes_are_not_coalesced(monkeypatch):
+    calls = []
+    monkeypatch.setattr(data_services, 'sync_stock', _fake_sync(calls, delay=0))
+    assert not refresh_coordinator.refresh_stock('COALE')['coalesced']
+    assert not refresh_coordinator.refresh_stock('COALE')['coalesced']
+    assert len(calls) == 2
@@ -0,0 +1,56 @@
+import gzip
+import json
+
+import pytest
+
+from conftest import history
+from services import data_services
+
+URL = '/stock/data/{}?limit=100'
+
+def test_revalidation_with_the_etag_gets_a_304(client):
+    first = client.get(URL.format('ETGA'))
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    again = client.get(URL.format('ETGA'), headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+
+def test_if_modified_since_gets_a_304(client):
+    first = client.get(URL.format('ETGB'))
+    again = client.get(URL.format('ETGB'), headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert again.status_code == 304
+
+def test_other_params_and_stale_tags_get_the_body(client):
+    etag = client.get(URL.format('ETGC')).headers['ETag']
+    other = client.get(URL.format('ETGC') + '&format=columnar', headers={'If-None-Match': etag})
+    assert other.status_code == 200
+    assert other.headers['ETag'] != etag
+    assert client.get(URL.format('ETGC'), headers={'If-None-Match': '"stale"'}).status_code == 200
+
+def test_storing_new_bars_changes_the_etag(client):
+    first = client.get(URL.format('ETGD'))
+    etag = first.headers['ETag']
+
+    df = history('ETGD', '2024-06-28', period='1mo')
+    df['Close'] *= 1.01 # Revised closes: same bars, new values
+    data_services.store_stock_frame('ETGD', df)
+
+    fresh = client.get(URL.format('ETGD'), headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert fresh.headers['ETag'] != etag
+    assert fresh.get_json()['data']['records'][-1]['close'] == pytest.approx(df['Close'].iloc[-1])
+
+def test_gzip_body_and_tag(client):
+    plain = client.get(URL.format('ETGE'))
+    zipped = client.get(URL.format('ETGE'), headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert json.loads(gzip.decompress(zipped.data)) == plain.get_json()
+    assert zipped.headers['ETag'] != plain.headers['ETag'] # Each content-coding has its own tag
+
+    revalidated = client.get(URL.format('ETGE'), headers={'Accept-Encoding': 'gzip', 'If-None-Match': zipped.headers['ETag']})
+    assert revalidated.status_code == 304
@@ -0,0 +1,84 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from services import stats_engine
+
+def _reference_statistics(rows):
+    """The original per-record get_stock_statistics loop, kept as the parity reference."""
+    prices = [r[4] for r in rows]
+    volumes = [r[5] for r in rows]
+    current_price, opening_price = rows[-1][4], rows[-1][1]
+    daily_changes = [
+        (prices[i] - prices[i - 1]) / prices[i - 1] * 100 if prices[i - 1] != 0 else 0
+        for i in range(1, len(prices))
+    ]
+    return {
+        'period_days': len(rows),
+        'current_price': current_price,
+        'opening_price': opening_price,
+        'price_stats': {
+            'open': opening_price,
+            'current': current_price,
+            'highest': max(r[2] for r in rows),
+            'lowest': min(r[3] for r in rows),
+            'change_value': round(current_price - opening_price, 2),
+            'change_percent': round((current_price - opening_price) / opening_price * 100, 2) if opening_price != 0 else 0,
+        },
+        'volume_stats': {
+            'average': int(sum(volumes) / len(volumes)),
+            'highest': max(volumes),
+            'total': sum(volumes),
+        },
+        'performance_stats': {
+            'positive_days': sum(1 for x in daily_changes if x > 0),
+            'negative_days': sum(1 for x in daily_changes if x < 0),
+            'positive_ratio': round(sum(1 for x in daily_changes if x > 0) / len(daily_changes) * 100, 1) if daily_changes else 0,
+            'avg_daily_change': round(sum(daily_changes) / len(daily_changes), 2) if daily_changes else 0,
+        },
+    }
+
+def _rows(n, seed=0, start=date(2024, 1, 1)):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    rows = []
+    for i, close in enumerate(closes):
+        open_ = close * (1 + rng.normal(0, 0.01))
+        rows.append((start + timedelta(days=i), float(open_), float(max(open_, close) * 1.01),
+                     float(min(open_, close) * 0.99), float(close), int(rng.integers(1_000, 1_000_000))))
+    return rows
+
+def _assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, dict):
+            _assert_same(actual[key], value)
+        else:
+            assert actual[key] == pytest.approx(value), key
+
+@pytest.mark.parametrize('n', [1, 2, 30, 365])
+def test_compute_statistics_matches_the_record_loop(n):
+    rows = _rows(n, seed=n)
+    _assert_same(stats_engine.compute_statistics(stats_engine.ohlcv_from_rows(rows)), _reference_statistics(rows))
+
+def test_zero_previous_close_counts_as_no_change():
+    rows = _rows(10)
+    rows[4] = rows[4][:4] + (0.0,) + rows[4][5:]
+    _assert_same(stats_engine.compute_statistics(stats_engine.ohlcv_from_rows(rows)), _reference_statistics(rows))
+
+def test_windows_match_separate_reads():
+    rows = _rows(400)
+    ohlcv = stats_engine.ohlcv_from_rows(rows)
+    end_date = rows[-1][0]
+    windows = (1, 7, 30, 90, 365)
+    computed = stats_engine.compute_window_statistics(ohlcv, windows, end_date)
+    for days in windows:
+        inside = [r for r in rows if end_date - timedelta(days=days) <= r[0] <= end_date]
+        _assert_same(computed[days], _reference_statistics(inside))
+
+def test_window_without_bars_is_none():
+    rows = _rows(30, start=date(2023, 1, 1))
+    computed = stats_engine.compute_window_statistics(stats_engine.ohlcv_from_rows(rows), (7,), date(2024, 1, 1))
+    assert computed[7] is None
+    assert stats_engine.compute_statistics(None) is None
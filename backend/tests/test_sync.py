@@ -0,0 +1,69 @@
+from datetime import date
+
+from conftest import history
+from services import data_services
+
+def _store(symbol, end_date, period='24mo'):
+    data_services.store_stock_frame(symbol, history(symbol, end_date, period=period))
+
+def test_nothing_stored_plans_a_full_fetch(app):
+    plan = data_services.plan_sync('SYNA', months=18)
+    assert plan['mode'] == 'full'
+    assert plan['overlap'] == {}
+
+def test_incremental_plan_starts_at_the_overlap(app):
+    _store('SYNB', '2024-05-31')
+    plan = data_services.plan_sync('SYNB', months=18)
+    assert plan['mode'] == 'incremental'
+    assert len(plan['overlap']) == data_services.SYNC_OVERLAP_DAYS
+    assert plan['start'] == min(plan['overlap'])
+    assert max(plan['overlap']).isoformat() == '2024-05-31'
+
+def test_short_stored_history_falls_back_to_full(app):
+    _store('SYNC', '2024-05-31', period='1mo')
+    months = (date.today() - date(2024, 1, 1)).days // 30 # A window starting before the first stored bar
+    assert data_services.plan_sync('SYNC', months=months)['mode'] == 'full'
+
+def test_replace_and_full_modes_skip_the_overlap(app):
+    _store('SYND', '2024-05-31')
+    assert data_services.plan_sync('SYND', mode='replace')['mode'] == 'replace'
+    assert data_services.plan_sync('SYND', mode='full')['mode'] == 'full'
+
+def test_unchanged_overlap_is_not_a_revision(app):
+    _store('SYNE', '2024-05-31')
+    plan = data_services.plan_sync('SYNE', months=18)
+    assert not data_services._history_revised(plan, history('SYNE', '2024-06-28'))
+
+def test_changed_newest_bar_is_not_a_revision(app):
+    _store('SYNF', '2024-05-31')
+    plan = data_services.plan_sync('SYNF', months=18)
+    df = history('SYNF', '2024-06-28')
+    df.loc['2024-05-31', 'Close'] *= 1.02 # A partial intraday bar that has since closed
+    assert not data_services._history_revised(plan, df)
+
+def test_changed_older_overlap_bar_is_a_revision(app):
+    _store('SYNG', '2024-05-31')
+    plan = data_services.plan_sync('SYNG', months=18)
+    df = history('SYNG', '2024-06-28')
+    df.loc[min(plan['overlap']).isoformat(), 'Close'] *= 0.5 # e.g. a split adjustment
+    assert data_services._history_revised(plan, df)
+
+def test_missing_overlap_bar_is_a_revision(app):
+    _store('SYNH', '2024-05-31')
+    plan = data_services.plan_sync('SYNH', months=18)
+    df = history('SYNH', '2024-06-28')
+    assert data_services._history_revised(plan, df.drop(min(plan['overlap']).isoformat()))
+
+def test_incremental_sync_stores_only_new_bars(app):
+    _store('SYNI', '2024-05-31')
+    result = data_services.sync_stock('SYNI', months=18) # The provider is pinned to 2024-06-28
+    assert result['mode'] == 'incremental'
+    assert result['inserted'] == 20
+    assert result['updated'] == data_services.SYNC_OVERLAP_DAYS
+
+def test_revised_history_is_refetched_in_full(app):
+    _store('SYNJ', '2024-05-31')
+    plan = data_services.plan_sync('SYNJ', months=18)
+    df = history('SYNJ', '2024-06-28')
+    df.loc[min(plan['overlap']).isoformat(), 'Close'] *= 0.5
+    assert data_services.store_for_plan(plan, df)['mode'] == 'full_after_revision'
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from conftest import history
+from models.stock_data import StockData
+from services import data_services
+
+def test_first_store_inserts_every_bar(app):
+    df = history('UPSA', '2024-03-28')
+    result = data_services.store_stock_frame('UPSA', df)
+    assert result['success']
+    assert (result['inserted'], result['updated']) == (len(df), 0)
+    assert StockData.query.filter_by(company_symbol='UPSA').count() == len(df)
+
+def test_overlapping_store_counts_updates_and_inserts(app):
+    data_services.store_stock_frame('UPSB', history('UPSB', '2024-03-28'))
+    stored = StockData.query.filter_by(company_symbol='UPSB').count()
+
+    df = history('UPSB', '2024-04-05', period='1mo') # Overlaps the stored bars and adds 6 new ones
+    new_bars = int((df.index > '2024-03-28').sum())
+    result = data_services.store_stock_frame('UPSB', df)
+    assert (result['inserted'], result['updated']) == (new_bars, len(df) - new_bars)
+    assert StockData.query.filter_by(company_symbol='UPSB').count() == stored + new_bars
+
+def test_upsert_overwrites_stored_values(app):
+    df = history('UPSC', '2024-03-28', period='1mo')
+    data_services.store_stock_frame('UPSC', df)
+
+    revised = df.copy()
+    revised['Close'] *= 1.5
+    result = data_services.store_stock_frame('UPSC', revised)
+    assert (result['inserted'], result['updated']) == (0, len(df))
+    newest = StockData.query.filter_by(company_symbol='UPSC').order_by(StockData.date.desc()).first()
+    assert newest.close_price == revised['Close'].iloc[-1]
+
+def test_replace_deletes_bars_missing_from_the_new_frame(app):
+    data_services.store_stock_frame('UPSD', history('UPSD', '2024-03-28'))
+    df = history('UPSD', '2024-03-28', period='5d')
+    result = data_services.store_stock_frame('UPSD', df, replace=True)
+    assert result['inserted'] == len(df)
+    assert StockData.query.filter_by(company_symbol='UPSD').count() == len(df)
+
+def test_empty_frame_is_reported(app):
+    result = data_services.store_stock_frame('UPSE', history('UPSE', '2024-03-28').iloc[:0])
+    assert not result['success']
+    assert (result['inserted'], result['updated']) == (0, 0)
+
+def test_repeated_dates_keep_the_last_bar(app):
+    df = history('UPSF', '2024-03-28', period='1mo')
+    intraday = df.iloc[[-1]].copy()
+    intraday.index = intraday.index + pd.Timedelta(hours=15, minutes=30) # yfinance's duplicate current-day row
+    intraday['Close'] *= 1.01
+    result = data_services.store_stock_frame('UPSF', pd.concat([df, intraday]))
+    assert result['success']
+    assert (result['inserted'], result['updated']) == (len(df), 0)
+    newest = StockData.query.filter_by(company_symbol='UPSF').order_by(StockData.date.desc()).first()
+    assert newest.close_price == intraday['Close'].iloc[0]
@@ -97,25 +97,33 @@ export default function Dashboard() {
     }
   }, []);
 
+  // Fetch details for a list of tickers in one batch request
+  const fetchTickerDetails = async (tickers) => {
+    const response = await axios.post(`${backendUrl}/api/stock_info/batch`, { symbols: tickers });
+    if (!response.data.success) {
+      console.error(`Failed to fetch ticker info: ${response.data.message}`);
+      return [];
+    }
+    const fetchedData = [];
+    for (const result of response.data.data) {
+      if (result.success) {
+        fetchedData.push(result.data);
+      } else {
+        console.error(`Failed to fetch info for ${result.symbol}: ${result.message}`);
+      }
+    }
+    return fetchedData;
+  };
+
   // Fetch details for watchlist tickers
   useEffect(() => {
     const fetchWatchlistDetails = async () => {
       setLoadingWatchlist(true);
-      const fetchedData = [];
-      for (const ticker of watchlistTickers) {
-        try {
-          // Assuming /api/stock_info gives comprehensive details
-          const response = await axios.get(`${backendUrl}/${ticker}`);
-          if (response.data.success) {
-            fetchedData.push(response.data.data);
-          } else {
-            console.error(`Failed to fetch info for ${ticker}: ${response.data.message}`);
-          }
-        } catch (error) {
-          console.error(`Error fetching info for ${ticker}:`, error);
-        }
+      try {
+        setWatchlistData(await fetchTickerDetails(watchlistTickers));
+      } catch (error) {
+        console.error("Error fetching watchlist info:", error);
       }
-      setWatchlistData(fetchedData);
       setLoadingWatchlist(false);
     };
 
@@ -130,20 +138,11 @@ export default function Dashboard() {
   useEffect(() => {
     const fetchWishlistDetails = async () => {
       setLoadingWishlist(true);
-      const fetchedData = [];
-      for (const ticker of wishlistTickers) {
-        try {
-          const response = await axios.get(`${backendUrl}/${ticker}`);
-          if (response.data.success) {
-            fetchedData.push(response.data.data);
-          } else {
-            console.error(`Failed to fetch info for ${ticker}: ${response.data.message}`);
-          }
-        } catch (error) {
-          console.error(`Error fetching info for ${ticker}:`, error);
-        }
+      try {
+        setWishlistData(await fetchTickerDetails(wishlistTickers));
+      } catch (error) {
+        console.error("Error fetching wishlist info:", error);
       }
-      setWishlistData(fetchedData);
       setLoadingWishlist(false);
     };
 